@@ -0,0 +1,56 @@
+"""Store template and run variables as JSONB with GIN indexes."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "20261019_000005"
+down_revision = "20250604_000004"
+branch_labels = None
+depends_on = None
+
+
+TABLES = ("templates", "runs")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for table in TABLES:
+        op.alter_column(
+            table,
+            "variables",
+            type_=postgresql.JSONB(astext_type=sa.Text()),
+            existing_type=postgresql.JSON(astext_type=sa.Text()),
+            existing_nullable=True,
+            postgresql_using="variables::jsonb",
+        )
+        # jsonb_path_ops only supports @>, which is all the variable filters use,
+        # and is considerably smaller than the default jsonb_ops
+        op.create_index(
+            f"idx_{table}_variables_gin",
+            table,
+            ["variables"],
+            postgresql_using="gin",
+            postgresql_ops={"variables": "jsonb_path_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    for table in TABLES:
+        op.drop_index(f"idx_{table}_variables_gin", table_name=table)
+        op.alter_column(
+            table,
+            "variables",
+            type_=postgresql.JSON(astext_type=sa.Text()),
+            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+            existing_nullable=True,
+            postgresql_using="variables::json",
+        )
@@ -0,0 +1,213 @@
+"""Full-text search: templates tsvector + GIN, run name trigram index, SQLite FTS5."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000006"
+down_revision = "20261019_000005"
+branch_labels = None
+depends_on = None
+
+
+# DDL as of this revision, copied from app.models.search so later edits there
+# do not change what this migration creates.
+TS_CONFIG = "english"
+
+# FTS5 rowids are derived from the source row so triggers can update in place.
+TEMPLATE_ROWID = "{id} * 2"
+RUN_ROWID = "{id} * 2 + 1"
+
+
+POSTGRES_DDL = [
+    "ALTER TABLE templates ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS idx_templates_search_vector ON templates USING gin (search_vector)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_runs_name_trgm ON runs USING gin (name gin_trgm_ops)",
+    f"""
+    CREATE OR REPLACE FUNCTION templates_search_vector_refresh() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{TS_CONFIG}', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('{TS_CONFIG}', coalesce(NEW.description, '')), 'B')
+            || coalesce((
+                SELECT setweight(to_tsvector('{TS_CONFIG}', string_agg(title, ' ')), 'C')
+                    || setweight(
+                        to_tsvector('{TS_CONFIG}', string_agg(coalesce(description, ''), ' ')),
+                        'D'
+                    )
+                FROM template_steps
+                WHERE template_id = NEW.id
+            ), ''::tsvector);
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION template_steps_search_vector_touch() RETURNS trigger AS $$
+    BEGIN
+        -- Any write to templates re-runs templates_search_vector_refresh()
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE templates SET search_vector = NULL WHERE id = OLD.template_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE templates SET search_vector = NULL WHERE id = NEW.template_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS templates_search_vector ON templates",
+    """
+    CREATE TRIGGER templates_search_vector BEFORE INSERT OR UPDATE ON templates
+    FOR EACH ROW EXECUTE FUNCTION templates_search_vector_refresh()
+    """,
+    "DROP TRIGGER IF EXISTS template_steps_search_vector ON template_steps",
+    """
+    CREATE TRIGGER template_steps_search_vector
+    AFTER INSERT OR UPDATE OF title, description, template_id OR DELETE ON template_steps
+    FOR EACH ROW EXECUTE FUNCTION template_steps_search_vector_touch()
+    """,
+]
+
+
+def _sqlite_template_refresh(template_id: str) -> str:
+    rowid = TEMPLATE_ROWID.format(id=template_id)
+    return f"""
+        DELETE FROM search_index WHERE rowid = {rowid};
+        INSERT INTO search_index (rowid, kind, ref_id, title, body)
+        SELECT {TEMPLATE_ROWID.format(id="t.id")}, 'template', t.id, t.name,
+               coalesce(t.description, '') || ' ' || coalesce((
+                   SELECT group_concat(s.title || ' ' || coalesce(s.description, ''), ' ')
+                   FROM template_steps s WHERE s.template_id = t.id
+               ), '')
+        FROM templates t WHERE t.id = {template_id};
+    """
+
+
+def _sqlite_run_refresh(run_id: str) -> str:
+    return f"""
+        DELETE FROM search_index WHERE rowid = {RUN_ROWID.format(id=run_id)};
+        INSERT INTO search_index (rowid, kind, ref_id, title, body)
+        SELECT {RUN_ROWID.format(id="r.id")}, 'run', r.id, r.name, ''
+        FROM runs r WHERE r.id = {run_id};
+    """
+
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS templates_search_ai AFTER INSERT ON templates BEGIN
+        {_sqlite_template_refresh("NEW.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS templates_search_au AFTER UPDATE OF name, description ON templates
+    BEGIN
+        {_sqlite_template_refresh("NEW.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS templates_search_ad AFTER DELETE ON templates BEGIN
+        DELETE FROM search_index WHERE rowid = {TEMPLATE_ROWID.format(id="OLD.id")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS template_steps_search_ai AFTER INSERT ON template_steps BEGIN
+        {_sqlite_template_refresh("NEW.template_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS template_steps_search_au
+    AFTER UPDATE OF title, description, template_id ON template_steps BEGIN
+        {_sqlite_template_refresh("OLD.template_id")}
+        {_sqlite_template_refresh("NEW.template_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS template_steps_search_ad AFTER DELETE ON template_steps BEGIN
+        {_sqlite_template_refresh("OLD.template_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS runs_search_ai AFTER INSERT ON runs BEGIN
+        {_sqlite_run_refresh("NEW.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS runs_search_au AFTER UPDATE OF name ON runs BEGIN
+        {_sqlite_run_refresh("NEW.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS runs_search_ad AFTER DELETE ON runs BEGIN
+        DELETE FROM search_index WHERE rowid = {RUN_ROWID.format(id="OLD.id")};
+    END
+    """,
+]
+
+
+def _install_search(bind) -> None:
+    statements = {"postgresql": POSTGRES_DDL, "sqlite": SQLITE_DDL}.get(bind.dialect.name, [])
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    _install_search(bind)
+
+    # Backfill rows written before the triggers existed
+    if bind.dialect.name == "postgresql":
+        op.execute("UPDATE templates SET search_vector = NULL")
+    elif bind.dialect.name == "sqlite":
+        op.execute("DELETE FROM search_index")
+        op.execute(
+            f"""
+            INSERT INTO search_index (rowid, kind, ref_id, title, body)
+            SELECT {TEMPLATE_ROWID.format(id="t.id")}, 'template', t.id, t.name,
+                   coalesce(t.description, '') || ' ' || coalesce((
+                       SELECT group_concat(s.title || ' ' || coalesce(s.description, ''), ' ')
+                       FROM template_steps s WHERE s.template_id = t.id
+                   ), '')
+            FROM templates t
+            """
+        )
+        op.execute(
+            f"""
+            INSERT INTO search_index (rowid, kind, ref_id, title, body)
+            SELECT {RUN_ROWID.format(id="r.id")}, 'run', r.id, r.name, '' FROM runs r
+            """
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS template_steps_search_vector ON template_steps")
+        op.execute("DROP TRIGGER IF EXISTS templates_search_vector ON templates")
+        op.execute("DROP FUNCTION IF EXISTS template_steps_search_vector_touch()")
+        op.execute("DROP FUNCTION IF EXISTS templates_search_vector_refresh()")
+        op.drop_index("idx_runs_name_trgm", table_name="runs")
+        op.drop_index("idx_templates_search_vector", table_name="templates")
+        op.drop_column("templates", "search_vector")
+    elif bind.dialect.name == "sqlite":
+        for trigger in (
+            "templates_search_ai",
+            "templates_search_au",
+            "templates_search_ad",
+            "template_steps_search_ai",
+            "template_steps_search_au",
+            "template_steps_search_ad",
+            "runs_search_ai",
+            "runs_search_au",
+            "runs_search_ad",
+        ):
+            op.execute(sa.text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        op.execute("DROP TABLE IF EXISTS search_index")
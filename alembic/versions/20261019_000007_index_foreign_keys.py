@@ -0,0 +1,36 @@
+"""Index run_steps.template_step_id and step_field_values.field_def_id.
+
+Without these, deleting a template step or field definition scans the two
+largest tables to check/cascade the foreign key. Built CONCURRENTLY on
+Postgres so writes are not blocked while the indexes build.
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261019_000007"
+down_revision = "20261019_000006"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ("idx_run_steps_template_step_id", "run_steps", ["template_step_id"]),
+    ("idx_step_field_values_field_def_id", "step_field_values", ["field_def_id"]),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
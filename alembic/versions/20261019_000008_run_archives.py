@@ -0,0 +1,50 @@
+"""Add run_archives cold-storage table for finished runs."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "20261019_000008"
+down_revision = "20261019_000007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    is_postgres = op.get_bind().dialect.name == "postgresql"
+    variables_type = postgresql.JSONB(astext_type=sa.Text()) if is_postgres else sa.JSON()
+    op.create_table(
+        "run_archives",
+        sa.Column("run_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("template_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.Column("variables", variables_type, nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("document", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index(
+        "idx_run_archives_template_status", "run_archives", ["template_id", "status"]
+    )
+    op.create_index("idx_run_archives_created_at", "run_archives", ["created_at"])
+    if is_postgres:
+        op.create_index(
+            "idx_run_archives_variables_gin",
+            "run_archives",
+            ["variables"],
+            postgresql_using="gin",
+            postgresql_ops={"variables": "jsonb_path_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("idx_run_archives_variables_gin", table_name="run_archives")
+    op.drop_index("idx_run_archives_created_at", table_name="run_archives")
+    op.drop_index("idx_run_archives_template_status", table_name="run_archives")
+    op.drop_table("run_archives")
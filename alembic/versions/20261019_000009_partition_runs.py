@@ -0,0 +1,213 @@
+"""Optionally partition runs and run_steps by created_at month (Postgres).
+
+Only converts when DB_PARTITION_RUNS=true; otherwise this revision is a no-op
+and the conversion can be done later with scripts/partition_runs.py convert.
+The conversion is a copy of app.services.partitions as of this revision, so
+later edits there do not change what this migration does.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from alembic import op
+
+revision = "20261019_000009"
+down_revision = "20261019_000008"
+branch_labels = None
+depends_on = None
+
+
+PARTITIONED_TABLES = ("runs", "run_steps")
+
+# Composite foreign keys into the partitioned tables:
+# (table, constraint, column holding the parent's created_at, column holding its id, parent)
+INCOMING_FOREIGN_KEYS = (
+    ("run_steps", "run_steps_run_id_fkey", "run_created_at", "run_id", "runs"),
+    (
+        "step_field_values",
+        "step_field_values_run_step_id_fkey",
+        "run_step_created_at",
+        "run_step_id",
+        "run_steps",
+    ),
+)
+
+# Unique constraints enforced per partition without created_at: table -> columns
+PARTITION_UNIQUE = {"run_steps": ("run_id", "order_index")}
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(connection: Connection, table: str = "runs") -> bool:
+    relkind = connection.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    )
+    return relkind == "p"
+
+
+def _add_partition_indexes(connection: Connection, table: str, name: str) -> None:
+    if table in PARTITION_UNIQUE:
+        columns = ", ".join(PARTITION_UNIQUE[table])
+        connection.execute(
+            text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_unique ON {name} ({columns})")
+        )
+
+
+def _add_foreign_keys(connection: Connection, foreign_keys) -> None:
+    for table, constraint, created_column, id_column, parent in foreign_keys:
+        connection.execute(
+            text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+                f"FOREIGN KEY ({id_column}, {created_column}) "
+                f"REFERENCES {parent} (id, created_at) ON DELETE CASCADE"
+            )
+        )
+
+
+def create_month_partition(connection: Connection, table: str, month: date) -> str:
+    name = partition_name(table, month)
+    connection.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+    )
+    _add_partition_indexes(connection, table, name)
+    return name
+
+
+def _rebuild_partitioned(
+    connection: Connection, table: str, *, months_ahead: int, now: datetime | None
+) -> None:
+    # Capture secondary indexes and unique/foreign-key constraints before the rename,
+    # so their definitions already point at the final table name.
+    indexes = connection.scalars(
+        text(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = :table AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table))"
+        ),
+        {"table": table},
+    ).all()
+    constraints = connection.execute(
+        text(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table) AND contype IN ('u', 'f')"
+        ),
+        {"table": table},
+    ).all()
+    sequence = connection.scalar(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+    )
+    oldest = connection.scalar(text(f"SELECT min(created_at) FROM {table}"))
+
+    legacy = f"{table}_unpartitioned"
+    connection.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    connection.execute(
+        text(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+            "INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (created_at)"
+        )
+    )
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    current = month_start((now or datetime.utcnow()).date())
+    month = month_start(oldest.date()) if oldest else current
+    while month <= add_months(current, months_ahead):
+        create_month_partition(connection, table, month)
+        month = add_months(month, 1)
+    default = f"{table}_default"
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    _add_partition_indexes(connection, table, default)
+
+    connection.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+    connection.execute(text(f"DROP TABLE {legacy}"))
+
+    connection.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)"))
+    for name, kind, definition in constraints:
+        if kind == "u":
+            definition = re.sub(r"\)$", ", created_at)", definition)
+        connection.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+    for definition in indexes:
+        connection.execute(text(definition))
+
+
+def _add_parent_created_at(
+    connection: Connection, table: str, created_column: str, id_column: str, parent: str
+) -> None:
+    """Add and backfill ``table.created_column``, kept filled from ``parent`` by a trigger."""
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {created_column} timestamp"))
+    connection.execute(
+        text(
+            f"UPDATE {table} SET {created_column} = {parent}.created_at "
+            f"FROM {parent} WHERE {parent}.id = {table}.{id_column}"
+        )
+    )
+    connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {created_column} SET NOT NULL"))
+    connection.execute(
+        text(
+            f"""
+            CREATE OR REPLACE FUNCTION {table}_fill_{created_column}() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.{created_column} IS NULL THEN
+                    SELECT created_at INTO NEW.{created_column}
+                    FROM {parent} WHERE id = NEW.{id_column};
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+    )
+
+
+def _add_fill_trigger(connection: Connection, table: str, created_column: str) -> None:
+    connection.execute(
+        text(
+            f"CREATE TRIGGER {table}_fill_{created_column} BEFORE INSERT ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_fill_{created_column}()"
+        )
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    if os.getenv("DB_PARTITION_RUNS", "false").lower() != "true" or is_partitioned(bind, "runs"):
+        return
+    months_ahead = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+    for table, constraint, created_column, id_column, parent in INCOMING_FOREIGN_KEYS:
+        _add_parent_created_at(bind, table, created_column, id_column, parent)
+        bind.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}"))
+    for table in PARTITIONED_TABLES:
+        _rebuild_partitioned(bind, table, months_ahead=months_ahead, now=None)
+    for table, _, created_column, _, _ in INCOMING_FOREIGN_KEYS:
+        _add_fill_trigger(bind, table, created_column)
+    _add_foreign_keys(bind, INCOMING_FOREIGN_KEYS)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and is_partitioned(bind, "runs"):
+        raise NotImplementedError(
+            "runs/run_steps are partitioned; restore from backup to go below this revision"
+        )
@@ -0,0 +1,35 @@
+"""Add templates.deleted_at and the jobs table for background purges."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000010"
+down_revision = "20261019_000009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("templates", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.Text(), nullable=False),
+        sa.Column("status", sa.Text(), nullable=False, server_default="queued"),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("progress", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("jobs")
+    op.drop_column("templates", "deleted_at")
@@ -0,0 +1,37 @@
+"""Add recurring_schedules and runs.scheduled_for for the recurring run scheduler."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000011"
+down_revision = "20261019_000010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("runs", sa.Column("scheduled_for", sa.DateTime(), nullable=True))
+    op.create_table(
+        "recurring_schedules",
+        sa.Column(
+            "template_id",
+            sa.Integer(),
+            sa.ForeignKey("templates.id", ondelete="CASCADE"),
+            primary_key=True,
+            autoincrement=False,
+        ),
+        sa.Column("next_due_at", sa.DateTime(), nullable=False),
+        sa.Column("last_run_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "idx_recurring_schedules_next_due_at", "recurring_schedules", ["next_due_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_recurring_schedules_next_due_at", table_name="recurring_schedules")
+    op.drop_table("recurring_schedules")
+    op.drop_column("runs", "scheduled_for")
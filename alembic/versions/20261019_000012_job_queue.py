@@ -0,0 +1,32 @@
+"""Add retry and claiming columns to jobs for the background job queue."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000012"
+down_revision = "20261019_000011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("jobs", sa.Column("result", sa.JSON(), nullable=True))
+    op.add_column("jobs", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column(
+        "jobs", sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3")
+    )
+    op.add_column(
+        "jobs",
+        sa.Column("run_after", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.add_column("jobs", sa.Column("locked_by", sa.Text(), nullable=True))
+    op.create_index("idx_jobs_status_run_after", "jobs", ["status", "run_after"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_jobs_status_run_after", table_name="jobs")
+    for column in ("locked_by", "run_after", "max_attempts", "attempts", "result"):
+        op.drop_column("jobs", column)
@@ -0,0 +1,74 @@
+"""Add immutable template_versions snapshots referenced by runs.
+
+Run steps now outlive their template step: deleting it sets
+``run_steps.template_step_id`` to NULL, and the run's version still renders it.
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000013"
+down_revision = "20261019_000012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "template_versions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "template_id",
+            sa.Integer(),
+            sa.ForeignKey("templates.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("content_hash", sa.Text(), nullable=False),
+        sa.Column("document", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint("template_id", "content_hash", name="template_version_content_unique"),
+    )
+    op.add_column("templates", sa.Column("current_version_id", sa.Integer(), nullable=True))
+    # Existing runs keep NULL and are rendered from the live template, as before
+    op.add_column(
+        "runs",
+        sa.Column(
+            "template_version_id",
+            sa.Integer(),
+            sa.ForeignKey("template_versions.id", name="runs_template_version_id_fkey"),
+            nullable=True,
+        ),
+    )
+    op.create_index("idx_runs_template_version_id", "runs", ["template_version_id"])
+    op.drop_constraint("run_steps_template_step_id_fkey", "run_steps", type_="foreignkey")
+    op.alter_column("run_steps", "template_step_id", existing_type=sa.Integer(), nullable=True)
+    op.create_foreign_key(
+        "run_steps_template_step_id_fkey",
+        "run_steps",
+        "template_steps",
+        ["template_step_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+
+def downgrade() -> None:
+    # Detached run steps have no template step to point back to
+    op.execute("DELETE FROM run_steps WHERE template_step_id IS NULL")
+    op.drop_constraint("run_steps_template_step_id_fkey", "run_steps", type_="foreignkey")
+    op.alter_column("run_steps", "template_step_id", existing_type=sa.Integer(), nullable=False)
+    op.create_foreign_key(
+        "run_steps_template_step_id_fkey",
+        "run_steps",
+        "template_steps",
+        ["template_step_id"],
+        ["id"],
+    )
+    op.drop_index("idx_runs_template_version_id", table_name="runs")
+    op.drop_constraint("runs_template_version_id_fkey", "runs", type_="foreignkey")
+    op.drop_column("runs", "template_version_id")
+    op.drop_column("templates", "current_version_id")
+    op.drop_table("template_versions")
@@ -0,0 +1,26 @@
+"""Add run_documents, the shared cache of serialized run details."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000014"
+down_revision = "20261019_000013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No foreign key: partitioned runs cannot be referenced by id alone
+    op.create_table(
+        "run_documents",
+        sa.Column("run_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("document", sa.LargeBinary(), nullable=False),
+        sa.Column("rendered_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("run_documents")
@@ -0,0 +1,158 @@
+"""Add the sync_changes log and its triggers for GET /sync."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000015"
+down_revision = "20261019_000014"
+branch_labels = None
+depends_on = None
+
+
+# DDL as of this revision, copied from app.models.sync so later edits there
+# do not change what this migration creates.
+
+# Table -> kind recorded in sync_changes
+SYNCED_TABLES = {
+    "templates": "template",
+    "template_steps": "template_step",
+    "step_field_defs": "field_def",
+    "runs": "run",
+    "run_steps": "run_step",
+    "step_field_values": "field_value",
+}
+
+
+POSTGRES_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS sync_change_seq",
+    """
+    CREATE OR REPLACE FUNCTION sync_record_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO sync_changes (kind, row_id, xid, seq)
+            SELECT TG_ARGV[0], id, pg_current_xact_id()::text::bigint, nextval('sync_change_seq')
+            FROM old_rows
+            ON CONFLICT (kind, row_id) DO UPDATE SET xid = excluded.xid, seq = excluded.seq;
+        ELSE
+            INSERT INTO sync_changes (kind, row_id, xid, seq)
+            SELECT TG_ARGV[0], id, pg_current_xact_id()::text::bigint, nextval('sync_change_seq')
+            FROM new_rows
+            ON CONFLICT (kind, row_id) DO UPDATE SET xid = excluded.xid, seq = excluded.seq;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+
+# Transition tables allow one event per trigger
+_POSTGRES_EVENTS = {"insert": "NEW", "update": "NEW", "delete": "OLD"}
+
+
+def postgres_triggers(table: str) -> list[str]:
+    kind = SYNCED_TABLES[table]
+    statements = []
+    for event_name, transition in _POSTGRES_EVENTS.items():
+        name = f"{table}_sync_{event_name}"
+        rows = f"{transition.lower()}_rows"
+        statements += [
+            f"DROP TRIGGER IF EXISTS {name} ON {table}",
+            f"""
+            CREATE TRIGGER {name} AFTER {event_name.upper()} ON {table}
+            REFERENCING {transition} TABLE AS {rows}
+            FOR EACH STATEMENT EXECUTE FUNCTION sync_record_changes('{kind}')
+            """,
+        ]
+    return statements
+
+
+def _sqlite_record(kind: str, row: str) -> str:
+    # An upsert: triggers fired by foreign-key actions ignore OR REPLACE
+    return f"""
+        UPDATE sync_sequence SET value = value + 1;
+        INSERT INTO sync_changes (kind, row_id, xid, seq)
+        SELECT '{kind}', {row}.id, 0, value FROM sync_sequence WHERE true
+        ON CONFLICT (kind, row_id) DO UPDATE SET seq = excluded.seq;
+    """
+
+
+SQLITE_DDL = [
+    "CREATE TABLE IF NOT EXISTS sync_sequence (value INTEGER NOT NULL)",
+    "INSERT INTO sync_sequence (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM sync_sequence)",
+]
+
+
+def sqlite_triggers(table: str) -> list[str]:
+    kind = SYNCED_TABLES[table]
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sync_{suffix} AFTER {event_name} ON {table} BEGIN
+            {_sqlite_record(kind, row)}
+        END
+        """
+        for suffix, event_name, row in (
+            ("ai", "INSERT", "NEW"),
+            ("au", "UPDATE", "NEW"),
+            ("ad", "DELETE", "OLD"),
+        )
+    ]
+
+
+def _install_sync(bind) -> None:
+    if bind.dialect.name == "postgresql":
+        statements = [*POSTGRES_DDL, *(s for t in SYNCED_TABLES for s in postgres_triggers(t))]
+    elif bind.dialect.name == "sqlite":
+        statements = [*SQLITE_DDL, *(s for t in SYNCED_TABLES for s in sqlite_triggers(t))]
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_changes",
+        sa.Column("kind", sa.Text(), primary_key=True),
+        sa.Column("row_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("xid", sa.BigInteger(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+    )
+    op.create_index("idx_sync_changes_xid_seq", "sync_changes", ["xid", "seq"])
+    bind = op.get_bind()
+    _install_sync(bind)
+
+    # Existing rows are logged once, as if just written, so a first sync returns them
+    for table, kind in SYNCED_TABLES.items():
+        if bind.dialect.name == "postgresql":
+            seq = "nextval('sync_change_seq')"
+        else:
+            seq = "(SELECT value FROM sync_sequence) + row_number() OVER (ORDER BY id)"
+        op.execute(
+            "INSERT INTO sync_changes (kind, row_id, xid, seq) "
+            f"SELECT '{kind}', id, 0, {seq} FROM {table}"
+        )
+        if bind.dialect.name == "sqlite":
+            op.execute(
+                "UPDATE sync_sequence SET value = (SELECT coalesce(max(seq), 0) FROM sync_changes)"
+            )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    for table in SYNCED_TABLES:
+        if bind.dialect.name == "postgresql":
+            for event_name in ("insert", "update", "delete"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_{event_name} ON {table}")
+        elif bind.dialect.name == "sqlite":
+            for suffix in ("ai", "au", "ad"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_{suffix}")
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS sync_record_changes()")
+        op.execute("DROP SEQUENCE IF EXISTS sync_change_seq")
+    elif bind.dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS sync_sequence")
+    op.drop_index("idx_sync_changes_xid_seq", table_name="sync_changes")
+    op.drop_table("sync_changes")
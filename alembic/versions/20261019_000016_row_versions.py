@@ -0,0 +1,25 @@
+"""Add version counters to runs and run_steps for If-Match updates."""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "20261019_000016"
+down_revision = "20261019_000015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    for table in ("runs", "run_steps"):
+        op.add_column(
+            table,
+            sa.Column("version", sa.Integer(), nullable=False, server_default=sa.text("1")),
+        )
+
+
+def downgrade() -> None:
+    for table in ("run_steps", "runs"):
+        op.drop_column(table, "version")
@@ -0,0 +1,204 @@
+"""Admission control: at most as many API requests at once as the pool has connections.
+
+Sync routes run on Starlette's threadpool (40 threads), which would happily
+start more requests than the engine has connections; the surplus then waits
+inside ``pool.checkout`` for up to ``DB_POOL_TIMEOUT`` while holding a thread.
+Instead, every request under the API prefix takes a slot of its route class
+before anything else runs:
+
+* ``heavy``: ``POST /runs:bulk``, ``POST /batch`` and ``GET /sync``
+* ``write``: other ``POST``/``PUT``/``PATCH``/``DELETE`` requests
+* ``read``: everything else
+
+By default the classes share ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` slots, less one
+connection per in-process periodic task and one for the jobs requests start after
+responding, so a burst of one class cannot take every connection
+(``ADMISSION_LIMITS`` overrides, e.g. ``read=10,write=4,heavy=1``). Behind
+transaction pooling (``DB_POOLING_MODE=transaction``, NullPool) there is no pool
+size to split, so ``ADMISSION_LIMITS`` must name every class. When a class is
+full, up to ``ADMISSION_QUEUE_SIZE`` requests wait for a slot, each for at most
+``ADMISSION_QUEUE_TIMEOUT_SECONDS`` and never past its deadline (see
+:mod:`app.api.deadlines`); the rest are answered ``503`` with ``Retry-After`` at
+once. Counts per class are served by ``GET /metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from typing import Any
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.api import deadlines
+from app.config import Settings
+
+ROUTE_CLASSES = ("read", "write", "heavy")
+
+# Paths below the API prefix that hold a connection for many statements
+HEAVY_PATHS = frozenset({"/runs:bulk", "/batch", "/sync"})
+
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def default_limits(connections: int) -> dict[str, int]:
+    """Split ``connections`` slots: an eighth for heavy, 30% for writes, the rest for reads."""
+    heavy = max(1, connections // 8)
+    write = max(1, connections * 3 // 10)
+    return {"read": max(1, connections - heavy - write), "write": write, "heavy": heavy}
+
+
+def reserved_connections(settings: Settings) -> int:
+    """Connections kept from requests: one per in-process periodic task, one for started jobs."""
+    intervals = (
+        settings.archive_interval_seconds,
+        settings.scheduler_interval_seconds,
+        settings.job_worker_interval_seconds,
+        settings.idempotency_purge_interval_seconds,
+    )
+    return 1 + sum(1 for interval in intervals if interval > 0)
+
+
+def parse_limits(value: str) -> dict[str, int]:
+    """``read=10,write=4`` as a dict; raises ``ValueError`` on unknown classes or bad numbers."""
+    limits = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, _, number = item.partition("=")
+        name = name.strip()
+        if name not in ROUTE_CLASSES:
+            raise ValueError(f"Unknown route class in ADMISSION_LIMITS: {name!r}")
+        limits[name] = int(number)
+        if limits[name] < 1:
+            raise ValueError(f"ADMISSION_LIMITS needs at least 1 slot for {name}")
+    return limits
+
+
+class Gate:
+    """Slots of one route class and a bounded queue in front of them."""
+
+    def __init__(self, limit: int, queue_size: int) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self._slots = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    async def enter(self, timeout: float) -> bool:
+        """Take a slot, waiting up to ``timeout`` seconds in the queue; ``False`` if shed."""
+        if self._slots.locked():
+            if self.queued >= self.queue_size:
+                self.shed_queue_full += 1
+                return False
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout)
+            except TimeoutError:
+                self.shed_timeout += 1
+                return False
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    def snapshot(self) -> dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+class AdmissionController:
+    """The gates of one app; kept on ``app.state.admission``."""
+
+    def __init__(
+        self, limits: dict[str, int], *, queue_size: int, queue_timeout: float, api_prefix: str
+    ) -> None:
+        self.gates = {name: Gate(limits[name], queue_size) for name in ROUTE_CLASSES}
+        self.queue_timeout = queue_timeout
+        self.api_prefix = api_prefix
+        self.retry_after = max(1, math.ceil(queue_timeout))
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> AdmissionController:
+        """Limits from ``settings``; raises ``ValueError`` when they cannot be derived."""
+        configured = parse_limits(settings.admission_limits or "")
+        if (
+            settings.admission_control
+            and settings.db_pooling_mode == "transaction"
+            and set(configured) != set(ROUTE_CLASSES)
+        ):
+            raise ValueError(
+                "DB_POOLING_MODE=transaction needs ADMISSION_LIMITS for read, write and heavy"
+            )
+        connections = settings.db_pool_size + settings.db_max_overflow
+        limits = default_limits(max(1, connections - reserved_connections(settings)))
+        limits.update(configured)
+        return cls(
+            limits,
+            queue_size=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout_seconds,
+            api_prefix=settings.api_prefix,
+        )
+
+    def route_class(self, method: str, path: str) -> str | None:
+        """The class of a request, ``None`` outside the API (health checks, docs)."""
+        if not path.startswith(self.api_prefix + "/"):
+            return None
+        if path[len(self.api_prefix) :] in HEAVY_PATHS:
+            return "heavy"
+        return "read" if method in _READ_METHODS else "write"
+
+    def snapshot(self) -> dict[str, Any]:
+        return {name: gate.snapshot() for name, gate in self.gates.items()}
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware; holds the slot until the response and its background tasks end."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = None
+        if scope["type"] == "http":
+            route_class = self.controller.route_class(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.controller.gates[route_class]
+        timeout = self.controller.queue_timeout
+        deadline = scope.get(deadlines.SCOPE_KEY)
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - time.monotonic()))
+        if not await gate.enter(timeout):
+            response = JSONResponse(
+                {"detail": "Server is busy; retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(self.controller.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.leave()
@@ -0,0 +1,125 @@
+"""Request deadlines and per-route statement timeouts.
+
+Every API request gets a deadline ``REQUEST_TIMEOUT_SECONDS`` after it
+arrives (``HEAVY_REQUEST_TIMEOUT_SECONDS`` for the heavy paths of
+:mod:`app.api.admission`), time spent waiting for admission included. Its
+session carries the deadline and the route's statement timeout
+(``STATEMENT_TIMEOUT_MS``, or the route's entry in ``STATEMENT_TIMEOUTS``, keyed
+by route name such as ``list_templates``); see :func:`app.database.set_time_limits`. A statement
+cut short by either ends the request with ``504``, counted per reason and
+route under ``timeouts`` in ``GET /metrics``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Collection
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Request, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import get_settings
+from app.database import DeadlineExceeded
+
+# Scope key of the request's deadline, a ``time.monotonic()`` value
+SCOPE_KEY = "process_ave.deadline"
+
+_MESSAGES = {
+    "statement_timeout": "A database query took too long and was cancelled",
+    "request_deadline": "The request ran past its deadline and was cancelled",
+}
+
+
+@lru_cache(maxsize=8)
+def parse_timeouts(value: str) -> dict[str, int]:
+    """``list_templates=2000,sync=15000`` as a dict of route name to milliseconds."""
+    timeouts = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, milliseconds = item.partition("=")
+            timeouts[name.strip()] = int(milliseconds)
+    return timeouts
+
+
+def time_limits(request: Request) -> dict[str, Any]:
+    """Keyword arguments for :func:`app.database.set_time_limits` for ``request``'s route."""
+    settings = get_settings()
+    statement_timeout_ms = settings.statement_timeout_ms
+    route = request.scope.get("route")
+    if settings.statement_timeouts and route is not None:
+        statement_timeout_ms = parse_timeouts(settings.statement_timeouts).get(
+            route.name, statement_timeout_ms
+        )
+    return {
+        "statement_timeout_ms": statement_timeout_ms or None,
+        "deadline": request.scope.get(SCOPE_KEY),
+    }
+
+
+class TimeoutCounters:
+    """Thread-safe counts of ``504`` answers by reason and by route; on ``app.state.timeouts``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reasons: Counter[str] = Counter()
+        self._routes: Counter[str] = Counter()
+
+    def record(self, reason: str, route: str | None) -> None:
+        with self._lock:
+            self._reasons[reason] += 1
+            self._routes[route or "unknown"] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "statement_timeout": self._reasons["statement_timeout"],
+                "request_deadline": self._reasons["request_deadline"],
+                "routes": dict(self._routes),
+            }
+
+
+def deadline_response(scope: Scope, exc: DeadlineExceeded) -> JSONResponse:
+    """The ``504`` for ``exc``, counted against the request's route."""
+    route = scope.get("route")
+    scope["app"].state.timeouts.record(exc.reason, getattr(route, "name", None))
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": _MESSAGES[exc.reason], "reason": exc.reason},
+    )
+
+
+class DeadlineMiddleware:
+    """Stamps API requests with their deadline; pure ASGI, nothing is buffered."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        timeout_seconds: float,
+        api_prefix: str,
+        heavy_paths: Collection[str] = (),
+        heavy_timeout_seconds: float = 0,
+    ) -> None:
+        self.app = app
+        self.timeout_seconds = timeout_seconds
+        self.api_prefix = api_prefix
+        self.heavy_paths = heavy_paths  # Below the API prefix
+        self.heavy_timeout_seconds = heavy_timeout_seconds  # 0: no deadline
+
+    def timeout(self, path: str) -> float | None:
+        """Seconds an API request for ``path`` may take; ``None`` outside the API or unlimited."""
+        if not path.startswith(self.api_prefix + "/"):
+            return None
+        if path[len(self.api_prefix) :] in self.heavy_paths:
+            return self.heavy_timeout_seconds or None
+        return self.timeout_seconds or None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        timeout = self.timeout(scope["path"]) if scope["type"] == "http" else None
+        if timeout is not None:
+            scope = {**scope, SCOPE_KEY: time.monotonic() + timeout}
+        await self.app(scope, receive, send)
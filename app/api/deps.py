@@ -2,13 +2,71 @@
 
 from __future__ import annotations
 
-from typing import Generator
+from collections.abc import Callable, Generator
 
+from fastapi import Header, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
-from app.database import get_session
+from app.api.deadlines import time_limits
+from app.api.transactions import shared_transaction
+from app.database import get_session, set_time_limits
+from app.services.fieldsets import Resource, Selection, parse_selection
 
 
-def db_session() -> Generator[Session, None, None]:
-    yield from get_session()
+def db_session(request: Request) -> Generator[Session, None, None]:
+    """A session bounded by the request's deadline and the route's statement timeout."""
+    limits = time_limits(request)
+    transaction = shared_transaction(request)
+    if transaction is not None:
+        set_time_limits(transaction.session, **limits)
+        yield transaction.session  # Closed by the transaction's owner
+        return
+    yield from get_session(**limits)
 
+
+def if_match(
+    if_match: str | None = Header(
+        None, description='Versions the update applies to, e.g. "3" (the `version` field)'
+    ),
+) -> list[int] | None:
+    """Versions listed in ``If-Match``; ``None`` when absent or ``*`` (any version)."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return [
+            int(tag.strip().removeprefix("W/").strip('"'))
+            for tag in if_match.split(",")
+            if tag.strip()
+        ]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid If-Match header"
+        ) from None
+
+
+def etag(version: int) -> str:
+    """``ETag`` value for a row ``version``, as accepted back by :func:`if_match`."""
+    return f'"{version}"'
+
+
+def fieldsets(
+    resource: Resource, *, default_include: tuple[str, ...] = ()
+) -> Callable[..., Selection | None]:
+    """Dependency parsing ``?fields=``/``?include=``; ``None`` when neither is given."""
+
+    include_help = f"Relations to expand (default: {','.join(default_include) or 'none'})"
+
+    def dependency(
+        fields: str | None = Query(None, description="Fields to return, dotted for relations"),
+        include: str | None = Query(None, description=include_help),
+    ) -> Selection | None:
+        if fields is None and include is None:
+            return None
+        try:
+            return parse_selection(
+                resource, fields=fields, include=include, default_include=default_include
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+    return dependency
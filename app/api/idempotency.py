@@ -0,0 +1,136 @@
+"""``Idempotency-Key`` support for every ``POST`` route.
+
+A ``POST`` carrying the header runs in a :class:`~app.api.transactions.SharedTransaction`
+that first claims the key (see :mod:`app.services.idempotency`). A successful
+(``2xx``) response is stored with the key and committed together with the
+route's writes; any other response rolls both back, so the request can be
+retried as new. A retry with the same key and the same method, path, query
+and body gets the stored response with ``Idempotent-Replayed: true`` and
+writes nothing; reusing a key for a different request is a ``422``.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api import deadlines
+from app.api.negotiation import read_body, replay_body
+from app.api.transactions import SCOPE_KEY, SharedTransaction
+from app.config import get_settings
+from app.database import DeadlineExceeded, get_sessionmaker, set_time_limits
+from app.services.idempotency import (
+    StoredResponse,
+    claim_key,
+    record_response,
+    request_hash,
+    stored_response,
+)
+
+MAX_KEY_LENGTH = 255
+
+
+def _response(stored: StoredResponse, *, replayed: bool = False) -> Response:
+    response = Response(content=stored.body, status_code=stored.status_code)
+    response.raw_headers = [
+        *((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers),
+        (b"content-length", str(len(stored.body)).encode()),
+    ]
+    if replayed:
+        response.raw_headers.append((b"idempotent-replayed", b"true"))
+    return response
+
+
+def _reused() -> Response:
+    return JSONResponse(
+        {"detail": "Idempotency-Key was already used for a different request"},
+        status_code=422,
+    )
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; only ``POST`` requests with the header are buffered."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        key = Headers(scope=scope).get("idempotency-key") if scope["type"] == "http" else None
+        if key is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": "Invalid Idempotency-Key header"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        hashed = request_hash(scope["method"], scope["path"], scope["query_string"], body)
+        db = get_sessionmaker()()
+        # The route narrows the statement timeout once it runs
+        set_time_limits(
+            db,
+            statement_timeout_ms=get_settings().statement_timeout_ms or None,
+            deadline=scope.get(deadlines.SCOPE_KEY),
+        )
+        try:
+            response = await self._run(db, key, hashed, scope, replay_body(body, receive))
+        except DeadlineExceeded as exc:
+            # Claiming the key runs before routing, outside the app's exception handlers
+            response = deadlines.deadline_response(scope, exc)
+        finally:
+            await run_in_threadpool(db.close)
+        await response(scope, receive, send)
+
+    async def _run(
+        self, db: Session, key: str, hashed: str, scope: Scope, receive: Receive
+    ) -> Response:
+        stored = await run_in_threadpool(stored_response, db, key)
+        row = None if stored is not None else await run_in_threadpool(claim_key, db, key, hashed)
+        if row is None:
+            if stored is None:
+                # Lost the race for the key to a request that has committed since
+                stored = await run_in_threadpool(stored_response, db, key)
+            if stored is None:
+                return JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is in progress"},
+                    status_code=409,
+                )
+            return _response(stored, replayed=True) if stored.request_hash == hashed else _reused()
+
+        transaction = await run_in_threadpool(SharedTransaction.begin, db)
+        start: dict[str, Any] = {}
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self.app({**scope, SCOPE_KEY: transaction}, receive, capture)
+            status_code = start["status"]
+            headers = [
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in start.get("headers", [])
+                if name.lower() != b"content-length"
+            ]
+            content = b"".join(chunks)
+            if 200 <= status_code < 300:
+                record_response(row, status_code, headers, content)
+                await run_in_threadpool(transaction.commit)
+            else:
+                await run_in_threadpool(transaction.rollback)
+        except BaseException:
+            await run_in_threadpool(transaction.rollback)
+            raise
+        response = _response(StoredResponse(hashed, status_code, headers, content))
+        # Jobs the route queued start once the response is sent, as usual
+        response.background = transaction.background
+        return response
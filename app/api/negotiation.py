@@ -0,0 +1,175 @@
+"""MessagePack content negotiation for every route.
+
+Clients that rank ``application/msgpack`` at least as high as JSON in
+``Accept`` get JSON responses re-encoded as MessagePack, and request bodies
+sent as ``Content-Type: application/msgpack`` are decoded before validation.
+Routes keep producing JSON, so JSON clients still get FastAPI's direct
+pydantic-core serialization; the MessagePack path transcodes from it.
+Timestamps stay ISO-8601 strings, as in JSON. MessagePack timestamps in
+request bodies are accepted.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+import msgpack
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset(
+    {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+)
+_JSON_RANGES = frozenset({"application/json", "application/*", "*/*"})
+
+
+def _media_type(content_type: str) -> str:
+    return content_type.partition(";")[0].strip().lower()
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """Whether an ``Accept`` header ranks MessagePack at least as high as JSON."""
+    msgpack_q = json_q = 0.0
+    for media_range in accept.split(","):
+        media, *params = media_range.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media = media.strip().lower()
+        if media in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media in _JSON_RANGES:
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def msgpack_to_json(body: bytes) -> bytes:
+    """Re-encode a MessagePack document as JSON; raises ``ValueError`` if it is not one."""
+    try:
+        document = msgpack.unpackb(body, timestamp=3)
+        return json.dumps(document, default=_json_default, separators=(",", ":")).encode()
+    except (msgpack.UnpackException, TypeError, ValueError) as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def json_to_msgpack(body: bytes) -> bytes:
+    return msgpack.packb(json.loads(body))
+
+
+class MsgPackMiddleware:
+    """Pure ASGI middleware, so responses are buffered only when they are transcoded."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if accepts_msgpack(headers.get("accept", "")):
+            send = _TranscodingSend(send)
+        else:
+            send = _vary_on_accept(send)
+
+        if _media_type(headers.get("content-type", "")) in MSGPACK_MEDIA_TYPES:
+            try:
+                body = msgpack_to_json(await read_body(receive))
+            except ValueError:
+                response = JSONResponse({"detail": "Malformed MessagePack body"}, status_code=400)
+                await response(scope, receive, send)
+                return
+            scope = dict(scope)
+            request_headers = MutableHeaders(scope=scope)
+            request_headers["content-type"] = "application/json"
+            request_headers["content-length"] = str(len(body))
+            receive = replay_body(body, receive)
+
+        await self.app(scope, receive, send)
+
+
+async def read_body(receive: Receive) -> bytes:
+    """The whole request body."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def replay_body(body: bytes, receive: Receive) -> Receive:
+    """A ``receive`` handing out ``body`` first, as if it had not been read."""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Later calls wait for the disconnect, as they would on the real stream
+        return await receive()
+
+    return replay
+
+
+def _is_json(message: Message) -> bool:
+    content_type = Headers(raw=message.get("headers", [])).get("content-type", "")
+    return _media_type(content_type) == "application/json"
+
+
+def _vary_on_accept(send: Send) -> Send:
+    async def vary(message: Message) -> None:
+        if message["type"] == "http.response.start" and _is_json(message):
+            MutableHeaders(scope=message).add_vary_header("Accept")
+        await send(message)
+
+    return vary
+
+
+class _TranscodingSend:
+    """Buffers a JSON response and sends it re-encoded; other responses pass through."""
+
+    def __init__(self, send: Send) -> None:
+        self.send = send
+        self.start: Message | None = None
+        self.chunks: list[bytes] = []
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            if _is_json(message):
+                self.start = message
+                return
+        elif message["type"] == "http.response.body" and self.start is not None:
+            self.chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(self.chunks)
+            headers = MutableHeaders(scope=self.start)
+            if body:
+                body = json_to_msgpack(body)
+                headers["content-type"] = MSGPACK_MEDIA_TYPE
+                headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept")
+            await self.send(self.start)
+            message = {"type": "http.response.body", "body": body, "more_body": False}
+        await self.send(message)
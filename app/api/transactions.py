@@ -0,0 +1,55 @@
+"""Transactions owned by the caller of a route rather than the route itself.
+
+``POST /batch`` runs many operations, and an idempotent ``POST`` runs its
+route and records its response, in one transaction. Routes still commit as
+usual: :func:`app.api.deps.db_session` hands them a session joined to the
+owner's transaction with ``join_transaction_mode="rollback_only"``, so their
+commits only flush and their rollbacks abort the whole transaction. The owner
+commits or rolls back once; jobs the routes queue and the run documents they
+re-render wait for that (see :func:`app.services.run_documents.defer_writes`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from fastapi import BackgroundTasks, Request
+from sqlalchemy.orm import Session
+
+from app.database import get_sessionmaker
+from app.services.run_documents import defer_writes, release_writes, writes_deferred
+
+# Scope key of the :class:`SharedTransaction` a request runs in
+SCOPE_KEY = "process_ave.transaction"
+
+
+@dataclass
+class SharedTransaction:
+    owner: Session  # Holds the transaction; only it commits
+    session: Session  # Given to the routes
+    background: BackgroundTasks = field(default_factory=BackgroundTasks)  # Run after commit
+
+    @classmethod
+    def begin(
+        cls, owner: Session, background: BackgroundTasks | None = None
+    ) -> SharedTransaction:
+        session = get_sessionmaker()(bind=owner.connection(), join_transaction_mode="rollback_only")
+        session.info.update(owner.info)  # Time limits (app.database.set_time_limits)
+        defer_writes(session)
+        return cls(owner, session, background if background is not None else BackgroundTasks())
+
+    def commit(self) -> None:
+        self.session.close()
+        self.owner.commit()
+        # Inside another shared transaction the runs stay noted until that one commits
+        if not writes_deferred(self.owner):
+            release_writes(self.session)
+
+    def rollback(self) -> None:
+        self.session.close()
+        self.owner.rollback()
+
+
+def shared_transaction(request: Request) -> SharedTransaction | None:
+    """The transaction ``request`` runs in, if its caller owns one."""
+    return request.scope.get(SCOPE_KEY)
@@ -1,6 +1,6 @@
 """Versioned API routers."""
 
-from app.api.v1 import runs, templates
+from app.api.v1 import jobs, runs, search, templates
 
-__all__ = ["runs", "templates"]
+__all__ = ["jobs", "runs", "search", "templates"]
 
@@ -0,0 +1,208 @@
+"""Several API calls in one request and one transaction."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Annotated, Any
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import db_session
+from app.api.transactions import SCOPE_KEY, SharedTransaction, shared_transaction
+from app.config import get_settings
+from app.schemas import batch as schema
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+# ``${name.field}``; fields may be nested, list items picked by index (``${tpl.steps.0.id}``)
+_REFERENCE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_-]*)((?:\.[A-Za-z0-9_-]+)*)\}")
+
+# Scope entries sub-requests take over from the batch request
+_SHARED_SCOPE = (
+    "type",
+    "asgi",
+    "http_version",
+    "scheme",
+    "server",
+    "client",
+    "root_path",
+    "app",
+    "state",
+    "starlette.exception_handlers",
+)
+
+# Response headers worth passing back per operation
+_RESULT_HEADERS = ("location", "etag")
+
+
+def _lookup(named: dict[str, Any], name: str, fields: str) -> Any:
+    if name not in named:
+        raise ValueError(f"Unknown reference: {name}")
+    value = named[name]
+    for part in fields.split(".")[1:]:
+        if isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            raise ValueError(f"Cannot resolve ${{{name}{fields}}}")
+    return value
+
+
+def _resolve(value: Any, named: dict[str, Any]) -> Any:
+    """``value`` with references replaced; a string that is one reference takes its value's type."""
+    if isinstance(value, str):
+        whole = _REFERENCE.fullmatch(value)
+        if whole is not None:
+            return _lookup(named, *whole.groups())
+        return _REFERENCE.sub(lambda match: str(_lookup(named, *match.groups())), value)
+    if isinstance(value, list):
+        return [_resolve(item, named) for item in value]
+    if isinstance(value, dict):
+        return {key: _resolve(item, named) for key, item in value.items()}
+    return value
+
+
+def _resolve_path(path: str, named: dict[str, Any]) -> str:
+    return _REFERENCE.sub(lambda match: quote(str(_lookup(named, *match.groups())), safe=""), path)
+
+
+async def _call(
+    request: Request,
+    transaction: SharedTransaction,
+    method: str,
+    path: str,
+    body: Any,
+    headers: dict[str, str],
+) -> tuple[int, dict[str, str], Any]:
+    """Run one operation through the app's routes; its status, headers and decoded body.
+
+    Middleware is skipped: the batch request already went through it.
+    """
+    path, _, query = path.partition("?")
+    path = get_settings().api_prefix + path
+    content = b"" if body is None else json.dumps(body).encode()
+    raw_headers = [
+        (b"content-type", b"application/json"),
+        (b"accept", b"application/json"),
+        (b"content-length", str(len(content)).encode()),
+        *(
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers.items()
+        ),
+    ]
+    scope = {key: request.scope[key] for key in _SHARED_SCOPE if key in request.scope}
+    scope.update(
+        method=method,
+        path=path,
+        raw_path=path.encode(),
+        query_string=query.encode(),
+        headers=raw_headers,
+    )
+    scope[SCOPE_KEY] = transaction
+
+    pending = [{"type": "http.request", "body": content, "more_body": False}]
+
+    async def receive() -> dict[str, Any]:
+        return pending.pop() if pending else {"type": "http.disconnect"}
+
+    start: dict[str, Any] = {}
+    chunks: list[bytes] = []
+
+    async def send(message: dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await AsyncExitStackMiddleware(request.app.router)(scope, receive, send)
+    except HTTPException as exc:
+        # Unknown path or method: raised by the router itself, outside any route
+        return exc.status_code, {}, {"detail": exc.detail}
+
+    response_headers = {
+        name.decode("latin-1").lower(): value.decode("latin-1")
+        for name, value in start.get("headers", [])
+    }
+    payload = b"".join(chunks)
+    decoded: Any = None
+    if payload:
+        if response_headers.get("content-type", "").startswith("application/json"):
+            decoded = json.loads(payload)
+        else:
+            decoded = payload.decode()
+    kept = {name: response_headers[name] for name in _RESULT_HEADERS if name in response_headers}
+    return start["status"], kept, decoded
+
+
+@router.post("", response_model=schema.BatchResponse)
+async def run_batch(
+    payload: schema.BatchRequest,
+    request: Request,
+    db: Annotated[Session, Depends(db_session)],
+):
+    """Run ``operations`` in order, in one transaction, and return every result.
+
+    Each operation is an API call (``method``, ``path`` below the API prefix,
+    JSON ``body``, extra ``headers`` such as ``If-Match``) and may be named by
+    ``id``. Later paths, bodies and headers refer to a named result as
+    ``${name.field}``; a body string that is just one reference is replaced by
+    the value itself, keeping its type. The first operation answering with an
+    error status stops the batch: nothing is applied, and the batch answers
+    with that status, the operation's ``index`` and its ``result``. Jobs an
+    operation queues start once the batch has committed.
+    """
+    # Inside an idempotent request, jobs wait for its commit instead
+    outer = shared_transaction(request)
+    transaction = await run_in_threadpool(
+        SharedTransaction.begin, db, outer.background if outer is not None else None
+    )
+    named: dict[str, Any] = {}
+    results: list[schema.BatchResult] = []
+    try:
+        for index, operation in enumerate(payload.operations):
+            try:
+                path = _resolve_path(operation.path, named)
+                body = _resolve(operation.body, named)
+                headers = {
+                    name: str(_resolve(value, named)) for name, value in operation.headers.items()
+                }
+            except ValueError as exc:
+                result = schema.BatchResult(id=operation.id, status=422, body={"detail": str(exc)})
+            else:
+                code, headers, decoded = await _call(
+                    request, transaction, operation.method, path, body, headers
+                )
+                result = schema.BatchResult(
+                    id=operation.id, status=code, headers=headers, body=decoded
+                )
+            if result.status >= 400:
+                await run_in_threadpool(transaction.rollback)
+                return JSONResponse(
+                    status_code=result.status,
+                    content={
+                        "detail": f"Operation {index} failed; nothing was applied",
+                        "index": index,
+                        "result": jsonable_encoder(result),
+                    },
+                )
+            results.append(result)
+            if operation.id is not None:
+                named[operation.id] = result.body
+        await run_in_threadpool(transaction.commit)
+    except BaseException:
+        await run_in_threadpool(transaction.rollback)
+        raise
+    return JSONResponse(
+        content=jsonable_encoder(schema.BatchResponse(results=results)),
+        background=None if outer is not None else transaction.background,
+    )
+
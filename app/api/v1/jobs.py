@@ -0,0 +1,51 @@
+"""Background job status endpoint and helpers for endpoints that queue jobs."""
+
+from __future__ import annotations
+
+from typing import Annotated, Any
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import db_session
+from app.api.transactions import shared_transaction
+from app.models import Job
+from app.schemas import jobs as schema
+from app.services.jobs import create_job, run_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=schema.JobRead)
+def get_job(job_id: int, db: Annotated[Session, Depends(db_session)]):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+def accept_job(
+    db: Session,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    kind: str,
+    payload: dict[str, Any] | None = None,
+) -> JSONResponse:
+    """Queue a job, commit, and answer ``202`` pointing at ``GET /jobs/{id}``.
+
+    The first attempt starts right after the response is sent (or once a
+    shared transaction commits, see :mod:`app.api.transactions`); retries are
+    left to the job workers.
+    """
+    job = create_job(db, kind, payload)
+    db.commit()
+    transaction = shared_transaction(request)
+    tasks = transaction.background if transaction is not None else background_tasks
+    tasks.add_task(run_job, job.id)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder(schema.JobRead.model_validate(job)),
+        headers={"Location": str(request.url_for("get_job", job_id=job.id))},
+    )
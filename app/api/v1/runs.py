@@ -3,106 +3,280 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
-from sqlalchemy.orm import Session, selectinload
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
 
-from app.api.deps import db_session
-from app.models import Run, RunStep, StepFieldDef, StepFieldValue, TemplateStep
+from app.api.deps import db_session, etag, fieldsets, if_match
+from app.api.v1.jobs import accept_job
+from app.models import Run, RunArchive, RunStep, StepFieldDef, StepFieldValue, Template
+from app.schemas import jobs as job_schema
 from app.schemas import runs as schema
-from app.services.run_loader import load_run_detail, load_runs
-
+from app.services import run_bulk
+from app.services.archive import list_archived_runs, load_archived_document
+from app.services.fieldsets import RUN, RUN_DETAIL, Selection, build, dump_json
+from app.services.run_actions import apply_bulk_request
+from app.services.run_documents import (
+    get_document,
+    invalidate,
+    refresh_detail,
+    refresh_document,
+)
+from app.services.run_loader import (
+    get_sparse_run_detail,
+    load_runs,
+    load_sparse_runs,
+    variable_filter,
+)
+from app.services.run_variables import patch_variables
+from app.services.run_writes import (
+    VersionConflict,
+    update_run_fields,
+    update_run_step_fields,
+    update_run_steps,
+)
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
-
-def _get_run_or_404(run_id: int, db: Session) -> Run:
-    run = db.get(Run, run_id)
-    if not run:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
-    return run
-
-
-def _get_run_step_or_404(run_step_id: int, db: Session) -> RunStep:
-    run_step = (
-        db.execute(
-            select(RunStep)
-            .options(
-                selectinload(RunStep.template_step).selectinload(TemplateStep.field_defs),
-                selectinload(RunStep.field_values),
-            )
-            .where(RunStep.id == run_step_id)
-        )
-        .scalars()
-        .first()
-    )
-    if not run_step:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run step not found")
-    return run_step
+VARIABLE_PARAM_PREFIX = "var."
 
 
 @router.get("", response_model=list[schema.RunWithTemplate])
 def list_runs(
-    template_id: Optional[int] = None,
+    request: Request,
+    selection: Annotated[
+        Selection | None, Depends(fieldsets(RUN, default_include=("template",)))
+    ],
+    db: Annotated[Session, Depends(db_session)],
+    template_id: int | None = None,
     status_filter: Annotated[
-        Optional[str], Query(alias="status", pattern=schema.STATUS_REGEX)
+        str | None, Query(alias="status", pattern=schema.STATUS_REGEX)
     ] = None,
-    db: Session = Depends(db_session),
+    include_archived: bool = False,
+    archived_after: int | None = None,
+    archived_limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
 ):
-    filters = []
+    # Runs of templates pending purge are already gone for clients
+    deleted = select(Template.id).where(Template.deleted_at.is_not(None))
+    filters = [Run.template_id.not_in(deleted)]
     if template_id is not None:
         filters.append(Run.template_id == template_id)
+    # created_at bounds also prune month partitions when runs is partitioned
+    if created_after is not None:
+        filters.append(Run.created_at >= created_after)
+    if created_before is not None:
+        filters.append(Run.created_at < created_before)
     if status_filter is not None:
         filters.append(Run.status == status_filter)
-    return load_runs(db, *filters)
+    # ``?var.clientName=Acme`` matches runs whose variables include that key/value pair
+    variables = {
+        param[len(VARIABLE_PARAM_PREFIX):]: value
+        for param, value in request.query_params.multi_items()
+        if param.startswith(VARIABLE_PARAM_PREFIX)
+    }
+    for key, value in variables.items():
+        filters.append(variable_filter(db, key, value))
+    if selection is None:
+        runs = load_runs(db, *filters)
+    else:
+        runs = load_sparse_runs(db, selection, *filters)
+    if include_archived:
+        # Archived runs come after the hot ones, a page of ``archived_limit`` at a
+        # time; pass the last archived id as ``archived_after`` for the next page
+        archived = list_archived_runs(
+            db,
+            template_id=template_id,
+            status=status_filter,
+            variables=variables,
+            created_after=created_after,
+            created_before=created_before,
+            after_id=archived_after,
+            limit=archived_limit,
+        )
+        runs = [*runs, *archived]
+    if selection is not None:
+        runs = [build(RUN, run, selection) for run in runs]
+        return Response(dump_json(runs, schema.RunWithTemplate), media_type="application/json")
+    return runs
+
+
+@router.post(
+    ":bulk",
+    response_model=schema.RunBulkResult,
+    responses={status.HTTP_202_ACCEPTED: {"model": job_schema.JobRead}},
+)
+def bulk_update_runs(
+    payload: schema.RunBulkRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Annotated[Session, Depends(db_session)],
+    prefer: Annotated[str | None, Header()] = None,
+):
+    """Archive, delete or re-status many runs in committed chunks.
+
+    With ``Prefer: respond-async`` the work is queued as a job and the answer
+    is ``202`` with the job; its ``result`` holds the affected count.
+    """
+    if prefer and "respond-async" in prefer.lower():
+        return accept_job(db, request, background_tasks, "bulk_runs", payload.model_dump())
+    affected = apply_bulk_request(db, payload)
+    return schema.RunBulkResult(action=payload.action, affected=affected)
+
+
+run_detail_fieldsets = fieldsets(
+    RUN_DETAIL, default_include=("steps", "steps.template_step", "steps.field_values")
+)
 
 
 @router.get("/{run_id}", response_model=schema.RunDetail)
-def get_run(run_id: int, db: Session = Depends(db_session)):
-    run = load_run_detail(db, run_id)
-    if not run:
+def get_run(
+    run_id: int,
+    selection: Annotated[Selection | None, Depends(run_detail_fieldsets)],
+    db: Annotated[Session, Depends(db_session)],
+):
+    if selection is not None:
+        detail = get_sparse_run_detail(db, run_id, selection)
+        if detail is None:
+            archived = load_archived_document(db, run_id)
+            if archived is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+            detail = build(RUN_DETAIL, schema.RunDetail.model_validate_json(archived), selection)
+        return Response(dump_json(detail, schema.RunDetail), media_type="application/json")
+
+    # Served as pre-serialized bytes, from the document cache when possible
+    document = get_document(db, run_id)
+    if document is None:
+        # Finished runs moved to cold storage are served from their snapshot as-is
+        document = load_archived_document(db, run_id)
+    if document is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
-    return run
+    return Response(content=document, media_type="application/json")
 
 
 @router.patch("/{run_id}", response_model=schema.RunDetail)
-def update_run(run_id: int, payload: schema.RunUpdate, db: Session = Depends(db_session)):
-    run = _get_run_or_404(run_id, db)
-    for field, value in payload.model_dump(exclude_unset=True).items():
-        setattr(run, field, value)
+def update_run(
+    run_id: int,
+    payload: schema.RunUpdate,
+    versions: Annotated[list[int] | None, Depends(if_match)],
+    db: Annotated[Session, Depends(db_session)],
+):
+    changes = payload.model_dump(exclude_unset=True)
+    version = update_run_fields(db, run_id, changes, versions=versions)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    db.commit()
+    return Response(
+        content=refresh_document(db, run_id),
+        media_type="application/json",
+        headers={"ETag": etag(version)},
+    )
+
+
+@router.patch("/{run_id}/variables", response_model=schema.RunDetail)
+def patch_run_variables(
+    run_id: int,
+    payload: schema.RunVariablesPatch,
+    versions: Annotated[list[int] | None, Depends(if_match)],
+    db: Annotated[Session, Depends(db_session)],
+):
+    """Set or remove individual variables without resending the list.
+
+    Applied in one ``UPDATE``, so concurrent patches to different keys all land.
+    """
+    version = patch_variables(db, run_id, payload.set, payload.unset, versions=versions)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     db.commit()
-    return get_run(run_id, db)
+    return Response(
+        content=refresh_document(db, run_id),
+        media_type="application/json",
+        headers={"ETag": etag(version)},
+    )
 
 
 @router.delete("/{run_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_run(run_id: int, db: Session = Depends(db_session)):
-    run = _get_run_or_404(run_id, db)
-    db.delete(run)
+def delete_run(run_id: int, db: Annotated[Session, Depends(db_session)]):
+    deleted = run_bulk.delete_runs(db, [run_id])
+    if not deleted:
+        deleted = db.execute(delete(RunArchive).where(RunArchive.run_id == run_id)).rowcount
+    if not deleted:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
     db.commit()
 
 
+@router.patch("/{run_id}/steps", response_model=schema.RunDetail)
+def update_run_steps_batch(
+    run_id: int,
+    payload: Annotated[list[schema.RunStepBatchUpdate], Body(min_length=1, max_length=500)],
+    db: Annotated[Session, Depends(db_session)],
+):
+    """Update many steps of a run at once, e.g. to complete a whole section.
+
+    All or nothing: a step outside the run is a ``404``, a step past the
+    ``version`` given for it a ``409``. Returns the run.
+    """
+    changes = [step.model_dump(exclude_unset=True) for step in payload]
+    ids = [change["run_step_id"] for change in changes]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail="Duplicate run_step_id"
+        )
+    try:
+        stray = update_run_steps(db, run_id, changes)
+    except VersionConflict:
+        db.rollback()  # Other steps of the batch may already be written
+        raise
+    if stray:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Steps not in run: {', '.join(map(str, stray))}",
+        )
+    db.commit()
+    return Response(content=refresh_document(db, run_id), media_type="application/json")
+
+
+def _refreshed_step(db: Session, run_id: int, run_step_id: int) -> schema.RunStepRead:
+    """The step as rendered into the run's refreshed document, so it is not loaded twice."""
+    refreshed = refresh_detail(db, run_id)
+    step = next((s for s in refreshed[0].steps if s.id == run_step_id), None) if refreshed else None
+    if step is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run step not found")
+    return step
+
+
 @router.patch("/{run_id}/steps/{run_step_id}", response_model=schema.RunStepRead)
 def update_run_step(
     run_id: int,
     run_step_id: int,
     payload: schema.RunStepUpdate,
-    db: Session = Depends(db_session),
+    response: Response,
+    versions: Annotated[list[int] | None, Depends(if_match)],
+    db: Annotated[Session, Depends(db_session)],
 ):
-    run_step = _get_run_step_or_404(run_step_id, db)
-    if run_step.run_id != run_id:
+    changes = payload.model_dump(exclude_unset=True)
+    version = update_run_step_fields(db, run_id, run_step_id, changes, versions=versions)
+    if version is None:
+        if db.scalar(select(RunStep.id).where(RunStep.id == run_step_id)) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run step not found")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not in run")
-
-    updates = payload.model_dump(exclude_unset=True)
-    for field, value in updates.items():
-        setattr(run_step, field, value)
-
-    if updates.get("status") == "done" and not updates.get("completed_at") and not run_step.completed_at:
-        run_step.completed_at = datetime.utcnow()
-
     db.commit()
-    return _get_run_step_or_404(run_step_id, db)
+    response.headers["ETag"] = etag(version)
+    return _refreshed_step(db, run_id, run_step_id)
 
 
 @router.post(
@@ -113,9 +287,13 @@ def upsert_field_values(
     run_id: int,
     run_step_id: int,
     payload: schema.FieldValueUpsertRequest,
-    db: Session = Depends(db_session),
+    db: Annotated[Session, Depends(db_session)],
 ):
-    run_step = _get_run_step_or_404(run_step_id, db)
+    run_step = db.execute(
+        select(RunStep.run_id, RunStep.template_step_id).where(RunStep.id == run_step_id)
+    ).first()
+    if run_step is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run step not found")
     if run_step.run_id != run_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not in run")
 
@@ -144,5 +322,6 @@ def upsert_field_values(
                 )
             )
 
+    invalidate(db, [run_id])
     db.commit()
-    return _get_run_step_or_404(run_step_id, db)
+    return _refreshed_step(db, run_id, run_step_id)
@@ -0,0 +1,32 @@
+"""Full-text search endpoint."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import db_session
+from app.schemas import search as schema
+from app.services.search import search as run_search
+
+router = APIRouter(tags=["search"])
+
+
+@router.get("/search", response_model=schema.SearchResults)
+def search(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    db: Annotated[Session, Depends(db_session)],
+    kind: Annotated[str | None, Query(pattern=schema.KIND_REGEX)] = None,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
+):
+    total, rows = run_search(db, q, limit=limit, offset=offset, kind=kind)
+    return schema.SearchResults(
+        query=q,
+        total=total,
+        limit=limit,
+        offset=offset,
+        results=[schema.SearchHit.model_validate(row) for row in rows],
+    )
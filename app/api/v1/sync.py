@@ -0,0 +1,39 @@
+"""Incremental sync endpoint."""
+
+from __future__ import annotations
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import db_session
+from app.schemas import sync as schema
+from app.services.sync import changes_since
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+
+@router.get("", response_model=schema.SyncPage)
+def sync(
+    db: Annotated[Session, Depends(db_session)],
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+):
+    """Templates, steps, field defs, runs, run steps and field values changed since ``since``.
+
+    Omit ``since`` for everything. Rows come back flat, deleted rows as ids
+    under ``deleted``. Pass ``next`` as ``since`` on the next call, right away
+    while ``has_more`` is true.
+    """
+    try:
+        page = changes_since(db, since, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+    return Response(
+        content=page.model_dump_json(by_alias=True, exclude_unset=True),
+        media_type="application/json",
+    )
@@ -2,23 +2,34 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, status
+from sqlalchemy import Row, bindparam, func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
 
-from app.api.deps import db_session
-from app.models import Run, RunStep, StepFieldDef, Template, TemplateStep
+from app.api.deps import db_session, fieldsets
+from app.api.v1.jobs import accept_job
+from app.database import update_returning
+from app.models import Run, RunStep, StepFieldDef, StepFieldValue, Template, TemplateStep
+from app.schemas import jobs as job_schema
 from app.schemas import runs as run_schema
 from app.schemas import templates as template_schema
-from app.services.run_loader import load_run_detail
-
+from app.services.fieldsets import TEMPLATE, Selection, build, dump_json, loader_options
+from app.services.run_documents import invalidate
+from app.services.run_loader import get_run_detail
+from app.services.template_versions import current_version_id, snapshot_template
 
 router = APIRouter(tags=["templates"])
 
 
-def _safe_commit(db: Session) -> None:
+def _safe_commit(db: Session, template_id: int | None = None) -> None:
+    """Commit, snapshotting ``template_id`` first when its steps or fields changed."""
     try:
+        if template_id is not None:
+            snapshot_template(db, template_id)
         db.commit()
     except IntegrityError as exc:
         db.rollback()
@@ -49,6 +60,22 @@ def _handle_integrity_error(exc: IntegrityError) -> None:
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Integrity violation")
 
 
+def _update_row(db: Session, model: type, changes: dict, *criteria, extra=()) -> Row | None:
+    """Apply ``changes`` to the row matching ``criteria``; its columns (plus ``extra``) after.
+
+    One ``UPDATE ... RETURNING`` round trip (see :func:`app.database.update_returning`);
+    a plain read when there is nothing to change. ``None`` when no row matches.
+    """
+    row = select(*model.__table__.c, *extra).where(*criteria)
+    if not changes:
+        return db.execute(row).first()
+    try:
+        return update_returning(db, update(model).where(*criteria).values(**changes), row)
+    except IntegrityError as exc:
+        db.rollback()
+        _handle_integrity_error(exc)
+
+
 def _template_query_with_children() -> select:
     return (
         select(Template)
@@ -56,32 +83,82 @@ def _template_query_with_children() -> select:
             selectinload(Template.steps)
             .selectinload(TemplateStep.field_defs)
         )
+        .where(Template.deleted_at.is_(None))
         .order_by(Template.id)
     )
 
 
+TEMPLATE_LIST_STMT = _template_query_with_children()
+TEMPLATE_DETAIL_STMT = _template_query_with_children().where(
+    Template.id == bindparam("template_id")
+)
+
+
+template_fieldsets = fieldsets(TEMPLATE, default_include=("steps", "steps.field_defs"))
+
+
+def _sparse_templates(
+    db: Session, selection: Selection, *criteria
+) -> list[template_schema.TemplateRead]:
+    templates = db.scalars(
+        select(Template)
+        .options(*loader_options(TEMPLATE, selection))
+        .where(Template.deleted_at.is_(None), *criteria)
+        .order_by(Template.id)
+    ).all()
+    return [build(TEMPLATE, template, selection) for template in templates]
+
+
 @router.get("/templates", response_model=list[template_schema.TemplateRead])
-def list_templates(db: Session = Depends(db_session)):
-    templates = db.execute(_template_query_with_children()).unique().scalars().all()
+def list_templates(
+    selection: Annotated[Selection | None, Depends(template_fieldsets)],
+    db: Annotated[Session, Depends(db_session)],
+):
+    if selection is not None:
+        templates = _sparse_templates(db, selection)
+        return Response(
+            dump_json(templates, template_schema.TemplateRead), media_type="application/json"
+        )
+    templates = db.execute(TEMPLATE_LIST_STMT).unique().scalars().all()
     return templates
 
 
 @router.post("/templates", response_model=template_schema.TemplateRead, status_code=status.HTTP_201_CREATED)
-def create_template(payload: template_schema.TemplateCreate, db: Session = Depends(db_session)):
+def create_template(
+    payload: template_schema.TemplateCreate, db: Annotated[Session, Depends(db_session)]
+):
     template = Template(**payload.model_dump())
     db.add(template)
     db.commit()
     return _get_template_or_404(template.id, db)
 
 
+def _get_live_template_or_404(template_id: int, db: Session) -> Template:
+    # Templates marked deleted are hidden while their rows are being purged
+    template = db.get(Template, template_id)
+    if not template or template.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    return template
+
+
+def _get_live_step_or_404(step_id: int, db: Session) -> TemplateStep:
+    step = db.get(TemplateStep, step_id)
+    if not step or step.template.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not found")
+    return step
+
+
+# Steps of templates that are not pending purge, for criteria of conditional updates
+_LIVE_STEP_IDS = (
+    select(TemplateStep.id)
+    .join(Template, Template.id == TemplateStep.template_id)
+    .where(Template.deleted_at.is_(None))
+)
+
+
 def _get_template_or_404(template_id: int, db: Session) -> Template:
     template = (
-        db.execute(
-            _template_query_with_children().where(Template.id == template_id)
-        )
-        .unique()
-        .scalars()
-        .first()
+        db.execute(TEMPLATE_DETAIL_STMT, {"template_id": template_id}).unique().scalars().first()
     )
     if not template:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
@@ -89,31 +166,71 @@ def _get_template_or_404(template_id: int, db: Session) -> Template:
 
 
 @router.get("/templates/{template_id}", response_model=template_schema.TemplateRead)
-def get_template(template_id: int, db: Session = Depends(db_session)):
+def get_template(
+    template_id: int,
+    selection: Annotated[Selection | None, Depends(template_fieldsets)],
+    db: Annotated[Session, Depends(db_session)],
+):
+    if selection is not None:
+        templates = _sparse_templates(db, selection, Template.id == template_id)
+        if not templates:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+        return Response(
+            dump_json(templates[0], template_schema.TemplateRead), media_type="application/json"
+        )
     return _get_template_or_404(template_id, db)
 
 
 @router.patch("/templates/{template_id}", response_model=template_schema.TemplateRead)
 def update_template(
-    template_id: int, payload: template_schema.TemplateUpdate, db: Session = Depends(db_session)
+    template_id: int,
+    payload: template_schema.TemplateUpdate,
+    db: Annotated[Session, Depends(db_session)],
 ):
-    template = db.get(Template, template_id)
-    if not template:
+    row = _update_row(
+        db,
+        Template,
+        payload.model_dump(exclude_unset=True),
+        Template.id == template_id,
+        Template.deleted_at.is_(None),
+    )
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
-    for field, value in payload.model_dump(exclude_unset=True).items():
-        setattr(template, field, value)
     db.commit()
-    db.refresh(template)
-    return _get_template_or_404(template_id, db)
-
+    # Steps are unchanged, but the response embeds them
+    steps = db.scalars(
+        select(TemplateStep)
+        .options(selectinload(TemplateStep.field_defs))
+        .where(TemplateStep.template_id == template_id)
+        .order_by(TemplateStep.order_index)
+    ).all()
+    return template_schema.TemplateRead.model_validate({**row._mapping, "steps": steps})
+
+
+@router.delete(
+    "/templates/{template_id}",
+    response_model=job_schema.JobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def delete_template(
+    template_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Annotated[Session, Depends(db_session)],
+):
+    """Mark the template deleted and purge its runs and rows in the background.
 
-@router.delete("/templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_template(template_id: int, db: Session = Depends(db_session)):
+    Deleting an already-deleted template that has not been purged yet (e.g. the
+    previous purge failed) starts a new purge job.
+    """
     template = db.get(Template, template_id)
     if not template:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
-    db.delete(template)
-    db.commit()
+    if template.deleted_at is None:
+        template.deleted_at = datetime.utcnow()
+        # Its runs read as missing from now on; drop their cached documents
+        invalidate(db, db.scalars(select(Run.id).where(Run.template_id == template_id)))
+    return accept_job(db, request, background_tasks, "purge_template", {"template_id": template_id})
 
 
 @router.post(
@@ -124,11 +241,9 @@ def delete_template(template_id: int, db: Session = Depends(db_session)):
 def create_step(
     template_id: int,
     payload: template_schema.TemplateStepCreate,
-    db: Session = Depends(db_session),
+    db: Annotated[Session, Depends(db_session)],
 ):
-    template = db.get(Template, template_id)
-    if not template:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    _get_live_template_or_404(template_id, db)
 
     data = payload.model_dump(exclude_unset=True)
     if data.get("order_index") is None:
@@ -139,32 +254,47 @@ def create_step(
 
     step = TemplateStep(template_id=template_id, **data)
     db.add(step)
-    _safe_commit(db)
+    _safe_commit(db, template_id)
     db.refresh(step)
     return step
 
 
 @router.patch("/template-steps/{step_id}", response_model=template_schema.TemplateStepRead)
 def update_step(
-    step_id: int, payload: template_schema.TemplateStepUpdate, db: Session = Depends(db_session)
+    step_id: int,
+    payload: template_schema.TemplateStepUpdate,
+    db: Annotated[Session, Depends(db_session)],
 ):
-    step = db.get(TemplateStep, step_id)
-    if not step:
+    row = _update_row(
+        db,
+        TemplateStep,
+        payload.model_dump(exclude_unset=True),
+        TemplateStep.id == step_id,
+        TemplateStep.id.in_(_LIVE_STEP_IDS),
+    )
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not found")
-    for field, value in payload.model_dump(exclude_unset=True).items():
-        setattr(step, field, value)
-    _safe_commit(db)
-    db.refresh(step)
-    return step
+    _safe_commit(db, row.template_id)
+    field_defs = db.scalars(
+        select(StepFieldDef)
+        .where(StepFieldDef.template_step_id == step_id)
+        .order_by(StepFieldDef.order_index)
+    ).all()
+    return template_schema.TemplateStepRead.model_validate(
+        {**row._mapping, "field_defs": field_defs}
+    )
 
 
 @router.delete("/template-steps/{step_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_step(step_id: int, db: Session = Depends(db_session)):
-    step = db.get(TemplateStep, step_id)
-    if not step:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not found")
+def delete_step(step_id: int, db: Annotated[Session, Depends(db_session)]):
+    step = _get_live_step_or_404(step_id, db)
+    # Its run steps are detached (template_step_id is set to NULL), which their
+    # runs' documents show
+    invalidate(
+        db, db.scalars(select(RunStep.run_id).where(RunStep.template_step_id == step_id).distinct())
+    )
     db.delete(step)
-    db.commit()
+    _safe_commit(db, step.template_id)
 
 
 @router.post(
@@ -175,14 +305,12 @@ def delete_step(step_id: int, db: Session = Depends(db_session)):
 def create_step_field(
     step_id: int,
     payload: template_schema.StepFieldDefCreate,
-    db: Session = Depends(db_session),
+    db: Annotated[Session, Depends(db_session)],
 ):
-    step = db.get(TemplateStep, step_id)
-    if not step:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not found")
+    step = _get_live_step_or_404(step_id, db)
     field = StepFieldDef(template_step_id=step_id, **payload.model_dump())
     db.add(field)
-    _safe_commit(db)
+    _safe_commit(db, step.template_id)
     db.refresh(field)
     return field
 
@@ -191,25 +319,46 @@ def create_step_field(
 def update_step_field(
     field_id: int,
     payload: template_schema.StepFieldDefUpdate,
-    db: Session = Depends(db_session),
+    db: Annotated[Session, Depends(db_session)],
 ):
-    field_def = db.get(StepFieldDef, field_id)
-    if not field_def:
+    template_id = (
+        select(TemplateStep.template_id)
+        .where(TemplateStep.id == StepFieldDef.template_step_id)
+        .scalar_subquery()
+        .label("template_id")
+    )
+    row = _update_row(
+        db,
+        StepFieldDef,
+        payload.model_dump(exclude_unset=True),
+        StepFieldDef.id == field_id,
+        StepFieldDef.template_step_id.in_(_LIVE_STEP_IDS),
+        extra=[template_id],
+    )
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Field not found")
-    for field, value in payload.model_dump(exclude_unset=True).items():
-        setattr(field_def, field, value)
-    _safe_commit(db)
-    db.refresh(field_def)
-    return field_def
+    _safe_commit(db, row.template_id)
+    return template_schema.StepFieldDefRead.model_validate(row._mapping)
 
 
 @router.delete("/step-fields/{field_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_step_field(field_id: int, db: Session = Depends(db_session)):
+def delete_step_field(field_id: int, db: Annotated[Session, Depends(db_session)]):
     field_def = db.get(StepFieldDef, field_id)
-    if not field_def:
+    if not field_def or field_def.template_step.template.deleted_at is not None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Field not found")
+    template_id = field_def.template_step.template_id
+    # Values of this field go with it; drop their runs' cached documents
+    invalidate(
+        db,
+        db.scalars(
+            select(RunStep.run_id)
+            .join(StepFieldValue, StepFieldValue.run_step_id == RunStep.id)
+            .where(StepFieldValue.field_def_id == field_id)
+            .distinct()
+        ),
+    )
     db.delete(field_def)
-    db.commit()
+    _safe_commit(db, template_id)
 
 
 @router.post(
@@ -220,11 +369,13 @@ def delete_step_field(field_id: int, db: Session = Depends(db_session)):
 def create_run_from_template(
     template_id: int,
     payload: run_schema.RunCreate,
-    db: Session = Depends(db_session),
+    db: Annotated[Session, Depends(db_session)],
 ):
     template = (
         db.execute(
-            select(Template).options(selectinload(Template.steps)).where(Template.id == template_id)
+            select(Template)
+            .options(selectinload(Template.steps))
+            .where(Template.id == template_id, Template.deleted_at.is_(None))
         )
         .scalars()
         .first()
@@ -232,7 +383,11 @@ def create_run_from_template(
     if not template:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
 
-    run = Run(template_id=template_id, **payload.model_dump())
+    run = Run(
+        template_id=template_id,
+        template_version_id=current_version_id(db, template),
+        **payload.model_dump(),
+    )
     db.add(run)
     db.flush()
 
@@ -246,4 +401,4 @@ def create_run_from_template(
         )
 
     db.commit()
-    return load_run_detail(db, run.id)
+    return get_run_detail(db, run.id)
@@ -4,15 +4,24 @@ from __future__ import annotations
 
 import os
 from functools import lru_cache
+from typing import Literal
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
-
+from pydantic import BaseModel, ConfigDict, Field
 
 load_dotenv()
 
 
+def _optional_int(name: str) -> int | None:
+    value = os.getenv(name, "").strip()
+    if not value or value.lower() == "none":
+        return None
+    return int(value)
+
+
 class Settings(BaseModel):
+    model_config = ConfigDict(validate_default=True)
+
     api_prefix: str = Field(default=os.getenv("API_PREFIX", "/api/v1"))
     database_url: str = Field(
         default=os.getenv(
@@ -23,6 +32,110 @@ class Settings(BaseModel):
     db_pool_size: int = Field(default=int(os.getenv("DB_POOL_SIZE", "10")))
     db_max_overflow: int = Field(default=int(os.getenv("DB_MAX_OVERFLOW", "5")))
     db_echo: bool = Field(default=os.getenv("DB_ECHO", "false").lower() == "true")
+    db_pool_timeout: float = Field(default=float(os.getenv("DB_POOL_TIMEOUT", "30")))
+    db_pool_recycle: int = Field(default=int(os.getenv("DB_POOL_RECYCLE", "-1")))
+    db_pool_pre_ping: bool = Field(default=os.getenv("DB_POOL_PRE_PING", "false").lower() == "true")
+    db_pool_use_lifo: bool = Field(default=os.getenv("DB_POOL_USE_LIFO", "false").lower() == "true")
+    # "session": app-side QueuePool; "transaction": behind PgBouncer-style transaction pooling,
+    # which needs NullPool and no server-side prepared statements
+    db_pooling_mode: Literal["session", "transaction"] = Field(
+        default=os.getenv("DB_POOLING_MODE", "session").lower()
+    )
+    # psycopg: executions before a query is prepared server-side (unset keeps the driver default)
+    db_prepare_threshold: int | None = Field(default=_optional_int("DB_PREPARE_THRESHOLD"))
+    # psycopg: prepared statements kept per connection (unset keeps the driver default)
+    db_statement_cache_size: int | None = Field(default=_optional_int("DB_STATEMENT_CACHE_SIZE"))
+    # Runs finished longer ago than this move to run_archives
+    archive_after_days: int = Field(default=int(os.getenv("ARCHIVE_AFTER_DAYS", "90")))
+    archive_batch_size: int = Field(default=int(os.getenv("ARCHIVE_BATCH_SIZE", "500")))
+    # Seconds between in-process archive passes (0 disables; use scripts/archive_runs.py instead)
+    archive_interval_seconds: int = Field(default=int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "0")))
+    # Postgres only: monthly range partitions for runs/run_steps (see app.services.partitions)
+    db_partition_runs: bool = Field(
+        default=os.getenv("DB_PARTITION_RUNS", "false").lower() == "true"
+    )
+    partition_months_ahead: int = Field(default=int(os.getenv("PARTITION_MONTHS_AHEAD", "3")))
+    # Detach month partitions older than this many months (0 keeps everything)
+    partition_retention_months: int = Field(
+        default=int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+    )
+    # Runs changed per transaction by POST /runs:bulk
+    bulk_chunk_size: int = Field(default=int(os.getenv("BULK_CHUNK_SIZE", "1000")))
+    # Seconds between in-process scheduler polls for recurring templates (0 disables;
+    # use scripts/run_scheduler.py instead)
+    scheduler_interval_seconds: int = Field(
+        default=int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "0"))
+    )
+    # Schedules claimed per transaction, and missed intervals caught up per template
+    scheduler_batch_size: int = Field(default=int(os.getenv("SCHEDULER_BATCH_SIZE", "100")))
+    scheduler_max_catch_up: int = Field(default=int(os.getenv("SCHEDULER_MAX_CATCH_UP", "31")))
+    # Seconds between in-process job worker polls (0 disables; use scripts/run_jobs.py instead).
+    # Jobs are always attempted once right after the request that queued them.
+    job_worker_interval_seconds: int = Field(
+        default=int(os.getenv("JOB_WORKER_INTERVAL_SECONDS", "0"))
+    )
+    job_max_attempts: int = Field(default=int(os.getenv("JOB_MAX_ATTEMPTS", "3")))
+    # Retry n waits JOB_RETRY_BACKOFF_SECONDS * 2**(n-1), at most an hour
+    job_retry_backoff_seconds: float = Field(
+        default=float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+    )
+    # Running jobs not updated for this long are assumed orphaned by a dead worker and re-queued,
+    # or failed when out of attempts
+    job_stale_after_seconds: int = Field(default=int(os.getenv("JOB_STALE_AFTER_SECONDS", "600")))
+    # Pre-serialized GET /runs/{id} bodies kept per process (0 disables), and for how long
+    # another process's writes may go unseen
+    run_document_cache_size: int = Field(default=int(os.getenv("RUN_DOCUMENT_CACHE_SIZE", "1024")))
+    run_document_cache_ttl_seconds: float = Field(
+        default=float(os.getenv("RUN_DOCUMENT_CACHE_TTL_SECONDS", "5"))
+    )
+    # Also persist them in run_documents, shared by all processes, re-rendering a stored
+    # document once it is older than the store TTL
+    run_document_store: bool = Field(
+        default=os.getenv("RUN_DOCUMENT_STORE", "false").lower() == "true"
+    )
+    run_document_store_ttl_seconds: int = Field(
+        default=int(os.getenv("RUN_DOCUMENT_STORE_TTL_SECONDS", "3600"))
+    )
+    # How long a POST's Idempotency-Key replays its first response, and seconds between
+    # in-process purges of expired keys (0 disables)
+    idempotency_key_ttl_seconds: int = Field(
+        default=int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+    )
+    idempotency_purge_interval_seconds: int = Field(
+        default=int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+    )
+    # Concurrent API requests per route class (see app.api.admission): by default the pool's
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW connections, less those background work needs, split
+    # between classes, or e.g. "read=10,write=4,heavy=1" (required with transaction pooling)
+    admission_control: bool = Field(
+        default=os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+    )
+    admission_limits: str | None = Field(default=os.getenv("ADMISSION_LIMITS") or None)
+    # Requests per class waiting for a slot, and for how long, before 503
+    admission_queue_size: int = Field(default=int(os.getenv("ADMISSION_QUEUE_SIZE", "20")))
+    admission_queue_timeout_seconds: float = Field(
+        default=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+    )
+    # Longest a single statement of an API request may run (Postgres; 0 disables), with
+    # per-route overrides by route name, e.g. "list_templates=2000,sync=15000". By default
+    # the heavy routes (see app.api.admission) get a minute; an empty value drops that.
+    statement_timeout_ms: int = Field(default=int(os.getenv("STATEMENT_TIMEOUT_MS", "5000")))
+    statement_timeouts: str | None = Field(
+        default=os.getenv(
+            "STATEMENT_TIMEOUTS", "bulk_update_runs=60000,run_batch=60000,sync=60000"
+        )
+        or None
+    )
+    # Deadline of an API request from arrival, and of a heavy one; later statements fail
+    # with 504 (0 disables)
+    request_timeout_seconds: float = Field(
+        default=float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+    )
+    heavy_request_timeout_seconds: float = Field(
+        default=float(os.getenv("HEAVY_REQUEST_TIMEOUT_SECONDS", "300"))
+    )
+    # Connections opened during startup, before the app reports ready (0 disables warm-up)
+    db_pool_prewarm: int = Field(default=int(os.getenv("DB_POOL_PREWARM", "0")))
 
 
 @lru_cache(maxsize=1)
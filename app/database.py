@@ -1,34 +1,228 @@
-"""Database engine and session handling."""
+"""Database engine and session handling.
 
-from __future__ import annotations
+The engine is built lazily on first use rather than at import time, so test
+collection, Alembic and CLI scripts do not pay for driver imports or pool
+setup they never use. The FastAPI lifespan owns warm-up and disposal.
+"""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from __future__ import annotations
 
-from app.config import get_settings
+import time
+from typing import Any
 
+from sqlalchemy import Select, Update, create_engine, event
+from sqlalchemy.engine import Engine, Row, make_url
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
+from sqlalchemy.pool import NullPool
 
-settings = get_settings()
+from app.config import Settings, get_settings
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(
-    settings.database_url,
-    pool_size=settings.db_pool_size,
-    max_overflow=settings.db_max_overflow,
-    echo=settings.db_echo,
-)
+@event.listens_for(Engine, "connect")
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record) -> None:
+    # SQLite ignores FOREIGN KEY clauses (including ON DELETE CASCADE) unless asked
+    if type(dbapi_connection).__module__.startswith("sqlite3"):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+class DeadlineExceeded(Exception):
+    """A statement ran into its ``statement_timeout``, or the request past its deadline.
+
+    ``reason`` is ``"statement_timeout"`` or ``"request_deadline"``.
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+def set_time_limits(
+    session: Session,
+    *,
+    statement_timeout_ms: int | None = None,
+    deadline: float | None = None,
+) -> None:
+    """Bound the statements ``session`` runs.
+
+    Every transaction of the session then starts with ``SET LOCAL
+    statement_timeout`` (Postgres only) at ``statement_timeout_ms`` or the time
+    left until ``deadline`` (a ``time.monotonic()`` value), whichever is less,
+    and statements issued after the deadline raise :class:`DeadlineExceeded`.
+    A new statement timeout replaces the old one; an earlier deadline is kept.
+    Applies to the current transaction too, if one is open.
+    """
+    if statement_timeout_ms:
+        session.info["statement_timeout_ms"] = statement_timeout_ms
+    if deadline is not None:
+        current = session.info.get("deadline")
+        session.info["deadline"] = deadline if current is None else min(current, deadline)
+    if session.in_transaction():
+        _limit_transaction(session, session.connection())
+
+
+def _limit_transaction(session: Session, connection) -> None:
+    limits = []
+    if session.info.get("statement_timeout_ms"):
+        limits.append(session.info["statement_timeout_ms"])
+    deadline = session.info.get("deadline")
+    if deadline is not None:
+        left = int((deadline - time.monotonic()) * 1000)
+        if left <= 0:
+            raise DeadlineExceeded("request_deadline")
+        limits.append(left)
+    if limits and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(min(limits))}")
+
+
+@event.listens_for(Session, "after_begin")
+def _limit_new_transaction(session, transaction, connection) -> None:
+    _limit_transaction(session, connection)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _check_deadline(orm_execute_state) -> None:
+    deadline = orm_execute_state.session.info.get("deadline")
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded("request_deadline")
+
+
+@event.listens_for(Engine, "handle_error")
+def _statement_timeout(context) -> Exception | None:
+    # query_canceled: statement_timeout fired (or the query was cancelled by hand)
+    if getattr(context.original_exception, "sqlstate", None) == "57014":
+        return DeadlineExceeded("statement_timeout")
+    return None
+
+
+_engine: Engine | None = None
+_session_factory: sessionmaker[Session] | None = None
+_owns_engine = False
+
+
+def _uses_psycopg(settings: Settings) -> bool:
+    return make_url(settings.database_url).get_driver_name() == "psycopg"
+
+
+def engine_options(settings: Settings) -> dict[str, Any]:
+    """Translate connection settings into ``create_engine`` keyword arguments.
+
+    In ``transaction`` pooling mode an external pooler owns the connections, so the
+    app holds none between checkouts (``NullPool``) and psycopg never prepares
+    statements server-side, since the next transaction may land on another backend.
+    """
+    options: dict[str, Any] = {"echo": settings.db_echo, "pool_pre_ping": settings.db_pool_pre_ping}
+    connect_args: dict[str, Any] = {}
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    if settings.db_pooling_mode == "transaction":
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_use_lifo=settings.db_pool_use_lifo,
+        )
 
+    if _uses_psycopg(settings):
+        if settings.db_pooling_mode == "transaction":
+            connect_args["prepare_threshold"] = None
+        elif settings.db_prepare_threshold is not None:
+            connect_args["prepare_threshold"] = settings.db_prepare_threshold
 
-def get_session():
-    session = SessionLocal()
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def build_engine(settings: Settings) -> Engine:
+    engine = create_engine(settings.database_url, **engine_options(settings))
+
+    cache_size = settings.db_statement_cache_size
+    if cache_size is not None and settings.db_pooling_mode == "session" and _uses_psycopg(settings):
+
+        @event.listens_for(engine, "connect")
+        def _set_prepared_max(dbapi_connection, connection_record) -> None:
+            dbapi_connection.prepared_max = cache_size
+
+    return engine
+
+
+def configure_engine(engine: Engine | None, *, owned: bool = False) -> None:
+    """Install ``engine`` as the process-wide engine (``None`` resets to lazy).
+
+    Engines installed by callers (tests, scripts) are left for them to dispose;
+    only ``owned`` engines are closed by :func:`dispose_engine`.
+    """
+    global _engine, _session_factory, _owns_engine
+    _engine = engine
+    _owns_engine = owned and engine is not None
+    _session_factory = (
+        sessionmaker(bind=engine, autocommit=False, autoflush=False) if engine is not None else None
+    )
+
+
+def get_engine() -> Engine:
+    if _engine is None:
+        configure_engine(build_engine(get_settings()), owned=True)
+    return _engine
+
+
+def get_sessionmaker() -> sessionmaker[Session]:
+    if _session_factory is None:
+        get_engine()
+    return _session_factory
+
+
+def warm_pool(engine: Engine, connections: int) -> int:
+    """Open up to ``connections`` pooled connections and return them to the pool.
+
+    Connections are held simultaneously so the pool really grows to ``connections``
+    instead of handing the same connection back each time. Returns how many opened.
+    """
+    held = []
+    try:
+        for _ in range(max(connections, 0)):
+            held.append(engine.connect())
+    finally:
+        for connection in held:
+            connection.close()
+    return len(held)
+
+
+def dispose_engine() -> None:
+    if _engine is not None and _owns_engine:
+        _engine.dispose()
+        configure_engine(None)
+
+
+def get_session(
+    *, statement_timeout_ms: int | None = None, deadline: float | None = None
+):
+    session = get_sessionmaker()()
+    set_time_limits(session, statement_timeout_ms=statement_timeout_ms, deadline=deadline)
     try:
         yield session
     finally:
         session.close()
 
+
+def update_returning(db: Session, stmt: Update, row: Select) -> Row | None:
+    """Execute ``stmt`` and return the changed row's ``row`` columns; ``None`` if none matched.
+
+    One round trip with ``UPDATE ... RETURNING``. On backends without it, the
+    ``UPDATE`` is followed by ``row``, which must select the same row by key
+    (the update's own criteria may no longer match it).
+    """
+    options = {"synchronize_session": False}
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(*row.selected_columns), execution_options=options).first()
+    if not db.execute(stmt, execution_options=options).rowcount:
+        return None
+    return db.execute(row).first()
@@ -2,16 +2,85 @@
 
 from __future__ import annotations
 
-from fastapi import FastAPI
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from typing import Any
+
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
 
-from app.api.v1 import runs, templates
+from app.api.admission import HEAVY_PATHS, AdmissionController, AdmissionMiddleware
+from app.api.deadlines import DeadlineMiddleware, TimeoutCounters, deadline_response
+from app.api.idempotency import IdempotencyMiddleware
+from app.api.negotiation import MsgPackMiddleware
+from app.api.v1 import batch, jobs, runs, search, sync, templates
 from app.config import get_settings
+from app.database import DeadlineExceeded, dispose_engine, get_engine, warm_pool
+from app.services.archive import archive_periodically
+from app.services.idempotency import purge_periodically
+from app.services.jobs import work_periodically
+from app.services.run_writes import VersionConflict
+from app.services.scheduler import schedule_periodically
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings()
+    if settings.db_pool_prewarm > 0:
+        await run_in_threadpool(warm_pool, get_engine(), settings.db_pool_prewarm)
+
+    background: list[asyncio.Task] = []
+    if settings.archive_interval_seconds > 0:
+        background.append(asyncio.create_task(archive_periodically(settings.archive_interval_seconds)))
+    if settings.scheduler_interval_seconds > 0:
+        background.append(
+            asyncio.create_task(schedule_periodically(settings.scheduler_interval_seconds))
+        )
+    if settings.job_worker_interval_seconds > 0:
+        background.append(asyncio.create_task(work_periodically(settings.job_worker_interval_seconds)))
+    if settings.idempotency_purge_interval_seconds > 0:
+        background.append(
+            asyncio.create_task(purge_periodically(settings.idempotency_purge_interval_seconds))
+        )
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        dispose_engine()
 
 
 def create_app() -> FastAPI:
     settings = get_settings()
-    app = FastAPI(title="Process Ave API", version="0.1.0")
+    app = FastAPI(title="Process Ave API", version="0.1.0", lifespan=lifespan)
+
+    # Idempotency-Key on POST; inside MessagePack negotiation, so it stores JSON
+    app.add_middleware(IdempotencyMiddleware)
+
+    # Accept: application/msgpack / Content-Type: application/msgpack
+    app.add_middleware(MsgPackMiddleware)
+
+    # Shed load before requests queue on the connection pool; inside CORS, so browsers can
+    # read the 503
+    app.state.admission = AdmissionController.from_settings(settings)
+    if settings.admission_control:
+        app.add_middleware(AdmissionMiddleware, controller=app.state.admission)
+
+    # Deadlines start before admission, so time spent queued counts
+    if settings.request_timeout_seconds > 0 or settings.heavy_request_timeout_seconds > 0:
+        app.add_middleware(
+            DeadlineMiddleware,
+            timeout_seconds=settings.request_timeout_seconds,
+            api_prefix=settings.api_prefix,
+            heavy_paths=HEAVY_PATHS,
+            heavy_timeout_seconds=settings.heavy_request_timeout_seconds,
+        )
 
     # Add CORS middleware
     app.add_middleware(
@@ -24,13 +93,50 @@ def create_app() -> FastAPI:
 
     app.include_router(templates.router, prefix=settings.api_prefix)
     app.include_router(runs.router, prefix=settings.api_prefix)
+    app.include_router(search.router, prefix=settings.api_prefix)
+    app.include_router(jobs.router, prefix=settings.api_prefix)
+    app.include_router(sync.router, prefix=settings.api_prefix)
+    app.include_router(batch.router, prefix=settings.api_prefix)
+
+    # Another writer got there first: If-Match no longer matches, or an ORM
+    # flush found the row's version changed since it was read
+    @app.exception_handler(VersionConflict)
+    @app.exception_handler(StaleDataError)
+    async def version_conflict(request: Request, exc: Exception) -> JSONResponse:
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": "Changed by another request; reload and retry"},
+        )
+
+    # A statement timeout or the request deadline cut a query short
+    app.state.timeouts = TimeoutCounters()
+
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+        return deadline_response(request.scope, exc)
 
     @app.get("/healthz")
     def healthcheck() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/metrics")
+    def metrics(request: Request) -> dict[str, Any]:
+        return {
+            "admission": request.app.state.admission.snapshot(),
+            "timeouts": request.app.state.timeouts.snapshot(),
+        }
+
     return app
 
 
-app = create_app()
+_app: FastAPI | None = None
+
 
+def __getattr__(name: str) -> FastAPI:
+    # ``uvicorn app.main:app`` still works, but importing this module no longer builds the app.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,11 @@
 """SQLAlchemy models exported for Alembic and the app."""
 
+from app.models import search  # noqa: F401  -- registers search DDL on the metadata
+from app.models.archive import RunArchive, RunDocument
+from app.models.idempotency import IdempotencyKey
+from app.models.jobs import Job
+from app.models.schedules import RecurringSchedule
+from app.models.sync import SyncChange  # also registers the change-log DDL
 from app.models.templates import (
     Run,
     RunStep,
@@ -8,6 +14,7 @@ from app.models.templates import (
     Template,
     TemplateStep,
 )
+from app.models.versions import TemplateVersion
 
 __all__ = [
     "Template",
@@ -16,5 +23,12 @@ __all__ = [
     "RunStep",
     "StepFieldDef",
     "StepFieldValue",
+    "RunArchive",
+    "RunDocument",
+    "Job",
+    "RecurringSchedule",
+    "TemplateVersion",
+    "SyncChange",
+    "IdempotencyKey",
 ]
 
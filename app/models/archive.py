@@ -0,0 +1,52 @@
+"""Serialized run documents: cold storage for finished runs and the detail cache."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, Index, Integer, LargeBinary, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.templates import VariablesJSON, variables_gin_index
+
+
+class RunArchive(Base):
+    """A finished run moved out of ``runs``/``run_steps``/``step_field_values``.
+
+    ``document`` is the zlib-compressed ``RunDetail`` JSON exactly as the API
+    served it at archive time; the other columns exist for filtering, so listing
+    only decompresses the rows it returns.
+    """
+
+    __tablename__ = "run_archives"
+    __table_args__ = (
+        Index("idx_run_archives_template_status", "template_id", "status"),
+        Index("idx_run_archives_created_at", "created_at"),
+        variables_gin_index("run_archives"),
+    )
+
+    run_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    template_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    name: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(Text, nullable=False)
+    variables: Mapped[Any | None] = mapped_column(VariablesJSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    document: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+class RunDocument(Base):
+    """Cached ``GET /runs/{id}`` body: the ``RunDetail`` JSON bytes, uncompressed.
+
+    No foreign key to ``runs`` (partitioned ``runs`` cannot be referenced by id
+    alone); rows are deleted together with their runs.
+    """
+
+    __tablename__ = "run_documents"
+
+    run_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    document: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    rendered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
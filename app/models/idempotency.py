@@ -0,0 +1,31 @@
+"""Responses remembered for ``Idempotency-Key`` retries."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, Index, Integer, LargeBinary, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """A key and the response of the request that first used it.
+
+    The row is inserted when the request starts and filled in, in the same
+    transaction, once it succeeds; other requests therefore only ever see
+    finished rows. Rows are ignored after ``expires_at`` and purged later.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (Index("idx_idempotency_keys_expires_at", "expires_at"),)
+
+    key: Mapped[str] = mapped_column(Text, primary_key=True)
+    request_hash: Mapped[str] = mapped_column(Text, nullable=False)  # Method, path, query, body
+    status_code: Mapped[int | None] = mapped_column(Integer)
+    headers: Mapped[Any | None] = mapped_column(JSON)  # [[name, value], ...]
+    response: Mapped[bytes | None] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
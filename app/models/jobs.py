@@ -0,0 +1,40 @@
+"""Background job bookkeeping."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, Index, Integer, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.templates import TimestampMixin
+
+
+class Job(Base, TimestampMixin):
+    """Work accepted by the API and finished in the background.
+
+    ``progress``/``total`` are handler-defined units (rows purged, runs
+    created...); ``total`` stays ``NULL`` until the handler knows it. A failed
+    attempt goes back to ``queued`` with a later ``run_after`` until
+    ``max_attempts`` is used up.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (Index("idx_jobs_status_run_after", "status", "run_after"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(Text, nullable=False, default="queued")
+    payload: Mapped[Any | None] = mapped_column(JSON)
+    progress: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total: Mapped[int | None] = mapped_column(Integer)
+    result: Mapped[Any | None] = mapped_column(JSON)
+    error: Mapped[str | None] = mapped_column(Text)  # Last failure, kept while retrying
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
+    run_after: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by: Mapped[str | None] = mapped_column(Text)  # Worker running the current attempt
+    started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime)
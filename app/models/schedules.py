@@ -0,0 +1,29 @@
+"""Next-due bookkeeping for recurring templates."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class RecurringSchedule(Base):
+    """One row per recurring template: when its next run is due.
+
+    The row is the unit workers lock (``FOR UPDATE SKIP LOCKED``) while they
+    create due runs and advance ``next_due_at`` in the same transaction, so an
+    interval is materialized exactly once however many schedulers run.
+    """
+
+    __tablename__ = "recurring_schedules"
+    __table_args__ = (Index("idx_recurring_schedules_next_due_at", "next_due_at"),)
+
+    template_id: Mapped[int] = mapped_column(
+        ForeignKey("templates.id", ondelete="CASCADE"), primary_key=True, autoincrement=False
+    )
+    next_due_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # Due time of the latest run created
+    last_run_at: Mapped[datetime | None] = mapped_column(DateTime)
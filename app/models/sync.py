@@ -0,0 +1,149 @@
+"""Database-maintained change log behind ``GET /sync``.
+
+Triggers on every synced table upsert one ``sync_changes`` row per changed row,
+keyed by ``(kind, row_id)``, with a fresh sequence number. Inserts, updates and
+deletes all count, including ones made by bulk statements and foreign-key
+cascades. The log therefore holds each row's latest change; a logged row that
+no longer exists is a tombstone.
+
+Postgres uses statement-level triggers with transition tables (one upsert per
+statement) and the ``sync_change_seq`` sequence. Because sequence numbers are
+taken before commit, each entry also records its transaction id, and readers
+only return entries from transactions older than their snapshot's ``xmin``
+(see :mod:`app.services.sync`). SQLite serializes writers, so a counter
+table and row triggers suffice there, and ``xid`` is always 0.
+
+Like :mod:`app.models.search`, the DDL is attached to ``Base.metadata`` and
+installed by migration ``20261019_000015`` (from its own copy) on existing
+databases.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Index, Integer, Text, event, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+# Table -> kind recorded in sync_changes
+SYNCED_TABLES = {
+    "templates": "template",
+    "template_steps": "template_step",
+    "step_field_defs": "field_def",
+    "runs": "run",
+    "run_steps": "run_step",
+    "step_field_values": "field_value",
+}
+
+
+class SyncChange(Base):
+    """Latest change to one synced row."""
+
+    __tablename__ = "sync_changes"
+    __table_args__ = (Index("idx_sync_changes_xid_seq", "xid", "seq"),)
+
+    kind: Mapped[str] = mapped_column(Text, primary_key=True)
+    row_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    xid: Mapped[int] = mapped_column(BigInteger, nullable=False)  # Writing transaction (Postgres)
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+POSTGRES_DDL = [
+    "CREATE SEQUENCE IF NOT EXISTS sync_change_seq",
+    """
+    CREATE OR REPLACE FUNCTION sync_record_changes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO sync_changes (kind, row_id, xid, seq)
+            SELECT TG_ARGV[0], id, pg_current_xact_id()::text::bigint, nextval('sync_change_seq')
+            FROM old_rows
+            ON CONFLICT (kind, row_id) DO UPDATE SET xid = excluded.xid, seq = excluded.seq;
+        ELSE
+            INSERT INTO sync_changes (kind, row_id, xid, seq)
+            SELECT TG_ARGV[0], id, pg_current_xact_id()::text::bigint, nextval('sync_change_seq')
+            FROM new_rows
+            ON CONFLICT (kind, row_id) DO UPDATE SET xid = excluded.xid, seq = excluded.seq;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+]
+
+# Transition tables allow one event per trigger
+_POSTGRES_EVENTS = {"insert": "NEW", "update": "NEW", "delete": "OLD"}
+
+
+def postgres_triggers(table: str) -> list[str]:
+    kind = SYNCED_TABLES[table]
+    statements = []
+    for event_name, transition in _POSTGRES_EVENTS.items():
+        name = f"{table}_sync_{event_name}"
+        rows = f"{transition.lower()}_rows"
+        statements += [
+            f"DROP TRIGGER IF EXISTS {name} ON {table}",
+            f"""
+            CREATE TRIGGER {name} AFTER {event_name.upper()} ON {table}
+            REFERENCING {transition} TABLE AS {rows}
+            FOR EACH STATEMENT EXECUTE FUNCTION sync_record_changes('{kind}')
+            """,
+        ]
+    return statements
+
+
+def _sqlite_record(kind: str, row: str) -> str:
+    # An upsert: triggers fired by foreign-key actions ignore OR REPLACE
+    return f"""
+        UPDATE sync_sequence SET value = value + 1;
+        INSERT INTO sync_changes (kind, row_id, xid, seq)
+        SELECT '{kind}', {row}.id, 0, value FROM sync_sequence WHERE true
+        ON CONFLICT (kind, row_id) DO UPDATE SET seq = excluded.seq;
+    """
+
+
+SQLITE_DDL = [
+    "CREATE TABLE IF NOT EXISTS sync_sequence (value INTEGER NOT NULL)",
+    "INSERT INTO sync_sequence (value) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM sync_sequence)",
+]
+
+
+def sqlite_triggers(table: str) -> list[str]:
+    kind = SYNCED_TABLES[table]
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sync_{suffix} AFTER {event_name} ON {table} BEGIN
+            {_sqlite_record(kind, row)}
+        END
+        """
+        for suffix, event_name, row in (
+            ("ai", "INSERT", "NEW"),
+            ("au", "UPDATE", "NEW"),
+            ("ad", "DELETE", "OLD"),
+        )
+    ]
+
+
+def install_sync(connection, tables=tuple(SYNCED_TABLES)) -> None:
+    """Create the sequence, function and triggers for the connection's dialect."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        statements = [*POSTGRES_DDL, *(s for table in tables for s in postgres_triggers(table))]
+    elif dialect == "sqlite":
+        statements = [*SQLITE_DDL, *(s for table in tables for s in sqlite_triggers(table))]
+    else:
+        statements = []
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_after_create(target, connection, **kw) -> None:
+    install_sync(connection)
+
+
+@event.listens_for(Base.metadata, "after_drop")
+def _drop_after_drop(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS sync_sequence"))
+    elif connection.dialect.name == "postgresql":
+        connection.execute(text("DROP SEQUENCE IF EXISTS sync_change_seq"))
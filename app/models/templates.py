@@ -3,24 +3,26 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any
 
 from sqlalchemy import (
+    JSON,
     Boolean,
     CheckConstraint,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
-    JSON,
     Text,
     UniqueConstraint,
+    text,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
 
-
 template_status_enum = Enum(
     "not_started",
     "in_progress",
@@ -38,6 +40,19 @@ run_step_status_enum = Enum(
 )
 
 
+# JSONB on Postgres so variables can be searched with GIN-indexed containment (@>)
+VariablesJSON = JSON().with_variant(JSONB(), "postgresql")
+
+
+def variables_gin_index(table: str) -> Index:
+    return Index(
+        f"idx_{table}_variables_gin",
+        "variables",
+        postgresql_using="gin",
+        postgresql_ops={"variables": "jsonb_path_ops"},
+    ).ddl_if(dialect="postgresql")
+
+
 class TimestampMixin:
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
@@ -47,20 +62,32 @@ class TimestampMixin:
 
 class Template(Base, TimestampMixin):
     __tablename__ = "templates"
+    __table_args__ = (variables_gin_index("templates"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(Text, nullable=False)
-    description: Mapped[Optional[str]] = mapped_column(Text)
-    created_by: Mapped[Optional[int]] = mapped_column(Integer)
-    variables: Mapped[Optional[Any]] = mapped_column(JSON)  # Template-level variables for UI integration
-    icon: Mapped[Optional[str]] = mapped_column(Text)  # Emoji icon for the template
+    description: Mapped[str | None] = mapped_column(Text)
+    created_by: Mapped[int | None] = mapped_column(Integer)
+    # Template-level variables for UI integration
+    variables: Mapped[Any | None] = mapped_column(VariablesJSON)
+    icon: Mapped[str | None] = mapped_column(Text)  # Emoji icon for the template
     is_recurring: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)  # Whether this is a recurring process
-    recurrence_interval: Mapped[Optional[str]] = mapped_column(Text)  # How often it should run (daily, weekly, etc.)
-
-    steps: Mapped[list["TemplateStep"]] = relationship(
-        back_populates="template", cascade="all, delete-orphan", order_by="TemplateStep.order_index"
+    # How often it should run (daily, weekly, etc.)
+    recurrence_interval: Mapped[str | None] = mapped_column(Text)
+    # Set on delete; rows purged by a job
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Latest TemplateVersion snapshot; no FK to avoid a templates <-> template_versions cycle
+    current_version_id: Mapped[int | None] = mapped_column(Integer)
+
+    steps: Mapped[list[TemplateStep]] = relationship(
+        back_populates="template",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="TemplateStep.order_index",
+    )
+    runs: Mapped[list[Run]] = relationship(
+        back_populates="template", cascade="all, delete-orphan", passive_deletes=True
     )
-    runs: Mapped[list["Run"]] = relationship(back_populates="template", cascade="all, delete-orphan")
 
 
 class TemplateStep(Base, TimestampMixin):
@@ -74,32 +101,56 @@ class TemplateStep(Base, TimestampMixin):
     template_id: Mapped[int] = mapped_column(ForeignKey("templates.id", ondelete="CASCADE"), nullable=False)
     order_index: Mapped[int] = mapped_column(Integer, nullable=False)
     title: Mapped[str] = mapped_column(Text, nullable=False)
-    description: Mapped[Optional[str]] = mapped_column(Text)
+    description: Mapped[str | None] = mapped_column(Text)
     is_required: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
 
     template: Mapped[Template] = relationship(back_populates="steps")
-    field_defs: Mapped[list["StepFieldDef"]] = relationship(
+    field_defs: Mapped[list[StepFieldDef]] = relationship(
         back_populates="template_step", cascade="all, delete-orphan", order_by="StepFieldDef.order_index"
     )
-    run_steps: Mapped[list["RunStep"]] = relationship(back_populates="template_step")
+    # Run steps outlive their template step (ON DELETE SET NULL)
+    run_steps: Mapped[list[RunStep]] = relationship(
+        back_populates="template_step", passive_deletes=True
+    )
 
 
 class Run(Base, TimestampMixin):
     __tablename__ = "runs"
+    __table_args__ = (
+        Index("idx_runs_template_status", "template_id", "status"),
+        Index("idx_runs_template_version_id", "template_version_id"),
+        variables_gin_index("runs"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     template_id: Mapped[int] = mapped_column(ForeignKey("templates.id", ondelete="CASCADE"), nullable=False)
     name: Mapped[str] = mapped_column(Text, nullable=False)
     status: Mapped[str] = mapped_column(template_status_enum, nullable=False, default="not_started")
-    created_by: Mapped[Optional[int]] = mapped_column(Integer)
-    variables: Mapped[Optional[Any]] = mapped_column(JSON)  # Live variable values for this workflow run
-    current_step_index: Mapped[Optional[int]] = mapped_column(Integer, default=0)  # Track current step for UI
+    created_by: Mapped[int | None] = mapped_column(Integer)
+    # Live variable values for this workflow run
+    variables: Mapped[Any | None] = mapped_column(VariablesJSON)
+    # Track current step for UI
+    current_step_index: Mapped[int | None] = mapped_column(Integer, default=0)
     completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)  # Workflow completion status
-    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)  # When the workflow was completed
+    # When the workflow was completed
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Due time, for runs the scheduler created
+    scheduled_for: Mapped[datetime | None] = mapped_column(DateTime)
+    # Snapshot of the template's steps the run was started from (NULL for older runs)
+    template_version_id: Mapped[int | None] = mapped_column(ForeignKey("template_versions.id"))
+    # Bumped by every change; ORM flushes and conditional updates check it (If-Match)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default=text("1")
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     template: Mapped[Template] = relationship(back_populates="runs")
-    steps: Mapped[list["RunStep"]] = relationship(
-        back_populates="run", cascade="all, delete-orphan", order_by="RunStep.order_index"
+    steps: Mapped[list[RunStep]] = relationship(
+        back_populates="run",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="RunStep.order_index",
     )
 
 
@@ -108,20 +159,29 @@ class RunStep(Base, TimestampMixin):
     __table_args__ = (
         CheckConstraint("order_index > 0", name="run_steps_order_positive"),
         UniqueConstraint("run_id", "order_index", name="run_step_order_unique"),
+        Index("idx_run_steps_template_step_id", "template_step_id"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"), nullable=False)
-    template_step_id: Mapped[int] = mapped_column(ForeignKey("template_steps.id"), nullable=False)
+    # NULL once the template step is deleted; the run's template version still holds it
+    template_step_id: Mapped[int | None] = mapped_column(
+        ForeignKey("template_steps.id", ondelete="SET NULL")
+    )
     order_index: Mapped[int] = mapped_column(Integer, nullable=False)
     status: Mapped[str] = mapped_column(run_step_status_enum, nullable=False, default="not_started")
-    notes: Mapped[Optional[str]] = mapped_column(Text)
-    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    notes: Mapped[str | None] = mapped_column(Text)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    version: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=1, server_default=text("1")
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     run: Mapped[Run] = relationship(back_populates="steps")
-    template_step: Mapped[TemplateStep] = relationship(back_populates="run_steps")
-    field_values: Mapped[list["StepFieldValue"]] = relationship(
-        back_populates="run_step", cascade="all, delete-orphan"
+    template_step: Mapped[TemplateStep | None] = relationship(back_populates="run_steps")
+    field_values: Mapped[list[StepFieldValue]] = relationship(
+        back_populates="run_step", cascade="all, delete-orphan", passive_deletes=True
     )
 
 
@@ -139,17 +199,20 @@ class StepFieldDef(Base, TimestampMixin):
     label: Mapped[str] = mapped_column(Text, nullable=False)
     type: Mapped[str] = mapped_column(Text, nullable=False)
     required: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
-    options_json: Mapped[Optional[Any]] = mapped_column(JSON)
+    options_json: Mapped[Any | None] = mapped_column(JSON)
     order_index: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
 
     template_step: Mapped[TemplateStep] = relationship(back_populates="field_defs")
-    values: Mapped[list["StepFieldValue"]] = relationship(back_populates="field_def")
+    values: Mapped[list[StepFieldValue]] = relationship(
+        back_populates="field_def", passive_deletes=True
+    )
 
 
 class StepFieldValue(Base, TimestampMixin):
     __tablename__ = "step_field_values"
     __table_args__ = (
         UniqueConstraint("run_step_id", "field_def_id", name="run_step_field_unique"),
+        Index("idx_step_field_values_field_def_id", "field_def_id"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -159,7 +222,7 @@ class StepFieldValue(Base, TimestampMixin):
     field_def_id: Mapped[int] = mapped_column(
         ForeignKey("step_field_defs.id", ondelete="CASCADE"), nullable=False
     )
-    value: Mapped[Optional[Any]] = mapped_column(JSON)
+    value: Mapped[Any | None] = mapped_column(JSON)
 
     run_step: Mapped[RunStep] = relationship(back_populates="field_values")
     field_def: Mapped[StepFieldDef] = relationship(back_populates="values")
@@ -0,0 +1,33 @@
+"""Immutable snapshots of a template's steps and field definitions."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Integer, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class TemplateVersion(Base):
+    """What a template's steps looked like at some point, as one JSON document.
+
+    ``document`` is ``{"steps": [TemplateStepRead, ...]}`` (field defs nested);
+    ``content_hash`` covers it minus timestamps, so saving a template without a
+    structural change reuses the existing version. Rows are never updated.
+    """
+
+    __tablename__ = "template_versions"
+    __table_args__ = (
+        UniqueConstraint("template_id", "content_hash", name="template_version_content_unique"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    template_id: Mapped[int] = mapped_column(
+        ForeignKey("templates.id", ondelete="CASCADE"), nullable=False
+    )
+    content_hash: Mapped[str] = mapped_column(Text, nullable=False)
+    document: Mapped[Any] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,50 @@
+"""Schemas for batched requests."""
+
+from __future__ import annotations
+
+from typing import Any, Literal
+
+from pydantic import Field, field_validator
+
+from app.schemas.base import ORMModel
+
+
+class BatchOperation(ORMModel):
+    # Name later operations use to refer to this one's result, as ``${name.field}``
+    id: str | None = Field(None, pattern=r"^[A-Za-z_][A-Za-z0-9_-]*$")
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+    path: str  # Below the API prefix, e.g. ``/templates/${tpl.id}/steps``
+    body: Any = None
+    headers: dict[str, str] = Field(default_factory=dict)  # E.g. ``If-Match``
+
+    @field_validator("path")
+    @classmethod
+    def _api_path(cls, path: str) -> str:
+        if not path.startswith("/"):
+            raise ValueError("path must start with /")
+        if path.split("?")[0].rstrip("/") == "/batch":
+            raise ValueError("batches cannot be nested")
+        return path
+
+
+class BatchRequest(ORMModel):
+    operations: list[BatchOperation] = Field(min_length=1, max_length=100)
+
+    @field_validator("operations")
+    @classmethod
+    def _unique_ids(cls, operations: list[BatchOperation]) -> list[BatchOperation]:
+        names = [operation.id for operation in operations if operation.id is not None]
+        if len(names) != len(set(names)):
+            raise ValueError("operation ids must be unique")
+        return operations
+
+
+class BatchResult(ORMModel):
+    id: str | None = None
+    status: int
+    headers: dict[str, str] = Field(default_factory=dict)  # ``Location`` and ``ETag``, if sent
+    body: Any = None
+
+
+class BatchResponse(ORMModel):
+    results: list[BatchResult]
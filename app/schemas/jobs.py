@@ -0,0 +1,25 @@
+"""Schemas for background jobs."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from app.schemas.base import TimestampedModel
+
+JOB_STATUSES = ["queued", "running", "succeeded", "failed"]
+
+
+class JobRead(TimestampedModel):
+    kind: str
+    status: str
+    payload: Any | None = None
+    progress: int = 0
+    total: int | None = None
+    result: Any | None = None
+    error: str | None = None
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
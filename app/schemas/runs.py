@@ -3,21 +3,20 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Literal
 
-from pydantic import Field
+from pydantic import Field, model_validator
 
 from app.schemas.base import ORMModel, TimestampedModel
 from app.schemas.templates import TemplateRead, TemplateStepRead
 
-
 RUN_STATUSES = ["not_started", "in_progress", "done", "archived"]
 RUN_STEP_STATUSES = ["not_started", "in_progress", "blocked", "done"]
 
 
 class RunCreate(ORMModel):
     name: str
-    variables: Optional[list[dict[str, Any]]] = None  # Initial variable values
+    variables: list[dict[str, Any]] | None = None  # Initial variable values
 
 
 STATUS_REGEX = "^(" + "|".join(RUN_STATUSES) + ")$"
@@ -25,32 +24,51 @@ STEP_STATUS_REGEX = "^(" + "|".join(RUN_STEP_STATUSES) + ")$"
 
 
 class RunUpdate(ORMModel):
-    name: Optional[str] = None
-    status: Optional[str] = Field(default=None, pattern=STATUS_REGEX)
-    variables: Optional[list[dict[str, Any]]] = None  # Update variable values
-    current_step_index: Optional[int] = None  # Update current step
-    completed: Optional[bool] = None  # Mark workflow as completed
-    completed_at: Optional[datetime] = None  # When the workflow was completed
+    name: str | None = None
+    status: str | None = Field(default=None, pattern=STATUS_REGEX)
+    variables: list[dict[str, Any]] | None = None  # Update variable values
+    current_step_index: int | None = None  # Update current step
+    completed: bool | None = None  # Mark workflow as completed
+    completed_at: datetime | None = None  # When the workflow was completed
+
+
+class RunVariablesPatch(ORMModel):
+    set: dict[str, Any] = Field(default_factory=dict)  # key -> new value; unknown keys are added
+    unset: list[str] = Field(default_factory=list)  # Keys to remove
+
+    @model_validator(mode="after")
+    def _disjoint(self) -> RunVariablesPatch:
+        both = sorted(self.set.keys() & set(self.unset))
+        if both:
+            raise ValueError(f"keys both set and unset: {', '.join(both)}")
+        return self
 
 
 class RunRead(TimestampedModel):
     template_id: int
     name: str
     status: str
-    variables: Optional[list[dict[str, Any]]] = None
-    current_step_index: Optional[int] = 0
+    variables: list[dict[str, Any]] | None = None
+    current_step_index: int | None = 0
     completed: bool = False
-    completed_at: Optional[datetime] = None
+    completed_at: datetime | None = None
+    scheduled_for: datetime | None = None
+    version: int = 1  # Send as If-Match to update only this version
 
 
 class RunWithTemplate(RunRead):
-    template: Optional[TemplateRead] = None
+    template: TemplateRead | None = None
 
 
 class RunStepUpdate(ORMModel):
-    status: Optional[str] = Field(default=None, pattern=STEP_STATUS_REGEX)
-    notes: Optional[str] = None
-    completed_at: Optional[datetime] = None
+    status: str | None = Field(default=None, pattern=STEP_STATUS_REGEX)
+    notes: str | None = None
+    completed_at: datetime | None = None
+
+
+class RunStepBatchUpdate(RunStepUpdate):
+    run_step_id: int
+    version: int | None = None  # Only update the step if it is still at this version
 
 
 class FieldValuePayload(ORMModel):
@@ -70,14 +88,49 @@ class StepFieldValueRead(TimestampedModel):
 
 class RunStepRead(TimestampedModel):
     run_id: int
-    template_step_id: int
+    template_step_id: int | None  # None once the template step was deleted
     order_index: int
     status: str
-    notes: Optional[str] = None
-    completed_at: Optional[datetime] = None
-    template_step: Optional[TemplateStepRead] = None
+    notes: str | None = None
+    completed_at: datetime | None = None
+    version: int = 1  # Send as If-Match to update only this version
+    template_step: TemplateStepRead | None = None
     field_values: list[StepFieldValueRead] = Field(default_factory=list)
 
 
 class RunDetail(RunRead):
     steps: list[RunStepRead] = Field(default_factory=list)
+
+
+class RunBulkFilter(ORMModel):
+    template_id: int | None = None
+    status: str | None = Field(default=None, pattern=STATUS_REGEX)
+    older_than_days: int | None = Field(default=None, ge=0)  # Last updated before now - N days
+
+    @model_validator(mode="after")
+    def _not_empty(self) -> RunBulkFilter:
+        if self.template_id is None and self.status is None and self.older_than_days is None:
+            raise ValueError("filter needs at least one of template_id, status, older_than_days")
+        return self
+
+
+class RunBulkRequest(ORMModel):
+    # "archive" moves runs to cold storage (run_archives); use set_status for status="archived"
+    action: Literal["archive", "delete", "set_status"]
+    # Target status for set_status
+    status: str | None = Field(default=None, pattern=STATUS_REGEX)
+    run_ids: list[int] | None = Field(default=None, min_length=1)
+    filter: RunBulkFilter | None = None
+
+    @model_validator(mode="after")
+    def _check_selection(self) -> RunBulkRequest:
+        if (self.run_ids is None) == (self.filter is None):
+            raise ValueError("provide exactly one of run_ids or filter")
+        if (self.action == "set_status") != (self.status is not None):
+            raise ValueError("status is required for set_status and only allowed there")
+        return self
+
+
+class RunBulkResult(ORMModel):
+    action: str
+    affected: int
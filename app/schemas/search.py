@@ -0,0 +1,25 @@
+"""Schemas for full-text search results."""
+
+from __future__ import annotations
+
+from pydantic import Field
+
+from app.schemas.base import ORMModel
+
+SEARCH_KINDS = ["template", "run"]
+KIND_REGEX = "^(" + "|".join(SEARCH_KINDS) + ")$"
+
+
+class SearchHit(ORMModel):
+    kind: str
+    id: int
+    title: str
+    rank: float
+
+
+class SearchResults(ORMModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: list[SearchHit] = Field(default_factory=list)
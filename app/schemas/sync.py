@@ -0,0 +1,35 @@
+"""Schemas for incremental sync."""
+
+from __future__ import annotations
+
+from pydantic import Field
+
+from app.schemas.base import ORMModel
+from app.schemas.runs import RunRead, RunStepRead, StepFieldValueRead
+from app.schemas.templates import StepFieldDefRead, TemplateRead, TemplateStepRead
+
+
+class SyncChanges(ORMModel):
+    # Flat rows: nested relations (template steps, run steps, ...) are never included
+    templates: list[TemplateRead] = Field(default_factory=list)
+    template_steps: list[TemplateStepRead] = Field(default_factory=list)
+    field_defs: list[StepFieldDefRead] = Field(default_factory=list)
+    runs: list[RunRead] = Field(default_factory=list)
+    run_steps: list[RunStepRead] = Field(default_factory=list)
+    field_values: list[StepFieldValueRead] = Field(default_factory=list)
+
+
+class SyncDeleted(ORMModel):
+    templates: list[int] = Field(default_factory=list)
+    template_steps: list[int] = Field(default_factory=list)
+    field_defs: list[int] = Field(default_factory=list)
+    runs: list[int] = Field(default_factory=list)
+    run_steps: list[int] = Field(default_factory=list)
+    field_values: list[int] = Field(default_factory=list)
+
+
+class SyncPage(ORMModel):
+    next: str  # Pass as ``since`` on the next call
+    has_more: bool  # More changes are waiting; call again right away
+    changes: SyncChanges
+    deleted: SyncDeleted
@@ -0,0 +1,183 @@
+"""Move finished runs out of the hot tables into ``run_archives``.
+
+Runs whose status is ``done``/``archived`` and that finished (``completed_at``,
+else last ``updated_at``) more than N days ago are snapshotted as compressed
+``RunDetail`` JSON, then deleted with their steps and field values. Each chunk
+is its own transaction so a large backlog never holds long locks.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.database import get_sessionmaker
+from app.models import Run, RunArchive, Template
+from app.schemas.runs import RunDetail, RunWithTemplate
+from app.schemas.templates import TemplateRead
+from app.services.run_bulk import delete_runs
+from app.services.run_loader import get_run_details, variable_filter
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("done", "archived")
+
+
+def _finished_before(cutoff: datetime):
+    return and_(
+        Run.status.in_(FINISHED_STATUSES),
+        func.coalesce(Run.completed_at, Run.updated_at) < cutoff,
+        # Implied by the above; lets Postgres prune newer created_at partitions
+        Run.created_at < cutoff,
+    )
+
+
+def encode_document(detail: RunDetail) -> bytes:
+    return zlib.compress(detail.model_dump_json(by_alias=True).encode())
+
+
+def decode_document(document: bytes) -> bytes:
+    return zlib.decompress(document)
+
+
+def archive_runs(db: Session, run_ids: list[int]) -> int:
+    """Snapshot and delete the given runs, whatever their status; caller commits."""
+    runs = get_run_details(db, run_ids)
+    if not runs:
+        return 0
+    db.add_all(
+        RunArchive(
+            run_id=run.id,
+            template_id=run.template_id,
+            name=run.name,
+            status=run.status,
+            variables=run.variables,
+            created_at=run.created_at,
+            completed_at=run.completed_at,
+            document=encode_document(run),
+        )
+        for run in runs
+    )
+    delete_runs(db, [run.id for run in runs], created_since=min(run.created_at for run in runs))
+    return len(runs)
+
+
+def archive_finished_runs(
+    db: Session,
+    *,
+    older_than_days: int,
+    batch_size: int,
+    now: datetime | None = None,
+) -> int:
+    """Archive eligible runs in chunks of ``batch_size``; return how many moved."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        run_ids = db.scalars(
+            select(Run.id)
+            .where(_finished_before(cutoff))
+            .order_by(Run.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not run_ids:
+            return archived
+        archived += archive_runs(db, list(run_ids))
+        db.commit()
+        db.expunge_all()
+
+
+def load_archived_document(db: Session, run_id: int) -> bytes | None:
+    """Return the archived ``RunDetail`` JSON for ``run_id``, if it was archived.
+
+    Like the listing, leaves out runs of templates pending purge.
+    """
+    deleted = select(Template.id).where(Template.deleted_at.is_not(None))
+    document = db.scalar(
+        select(RunArchive.document).where(
+            RunArchive.run_id == run_id, RunArchive.template_id.not_in(deleted)
+        )
+    )
+    return decode_document(document) if document is not None else None
+
+
+def list_archived_runs(
+    db: Session,
+    *,
+    template_id: int | None = None,
+    status: str | None = None,
+    variables: dict[str, str] | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    after_id: int | None = None,
+    limit: int = 100,
+) -> list[RunWithTemplate]:
+    """Up to ``limit`` archived runs with ``run_id > after_id`` as list entries.
+
+    Filters match those of the hot listing and run in SQL on the archive's own
+    columns; only the returned snapshots are decompressed. Runs of templates
+    pending purge are left out.
+    """
+    deleted = select(Template.id).where(Template.deleted_at.is_not(None))
+    stmt = (
+        select(RunArchive.document)
+        .where(RunArchive.template_id.not_in(deleted))
+        .order_by(RunArchive.run_id)
+        .limit(limit)
+    )
+    if template_id is not None:
+        stmt = stmt.where(RunArchive.template_id == template_id)
+    if status is not None:
+        stmt = stmt.where(RunArchive.status == status)
+    if created_after is not None:
+        stmt = stmt.where(RunArchive.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(RunArchive.created_at < created_before)
+    if after_id is not None:
+        stmt = stmt.where(RunArchive.run_id > after_id)
+    for key, value in (variables or {}).items():
+        stmt = stmt.where(variable_filter(db, key, value, RunArchive.variables))
+
+    entries = [
+        RunWithTemplate.model_validate_json(decode_document(document))
+        for document in db.scalars(stmt)
+    ]
+
+    templates = {
+        template.id: template
+        for template in db.scalars(
+            select(Template).where(Template.id.in_({entry.template_id for entry in entries}))
+        )
+    }
+    for entry in entries:
+        template = templates.get(entry.template_id)
+        entry.template = TemplateRead.model_validate(template) if template else None
+    return entries
+
+
+def run_archive_pass() -> int:
+    settings = get_settings()
+    with get_sessionmaker()() as db:
+        return archive_finished_runs(
+            db, older_than_days=settings.archive_after_days, batch_size=settings.archive_batch_size
+        )
+
+
+async def archive_periodically(interval_seconds: int) -> None:
+    """Run an archive pass every ``interval_seconds`` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            archived = await run_in_threadpool(run_archive_pass)
+        except Exception:
+            logger.exception("Run archive pass failed")
+        else:
+            if archived:
+                logger.info("Archived %d finished runs", archived)
@@ -0,0 +1,196 @@
+"""Sparse fieldsets (``?fields=``) and relation expansion (``?include=``).
+
+A :class:`Resource` ties a response schema to its model and the relations that
+may be expanded; schema fields and model attributes share names.
+:func:`parse_selection` turns the two query parameters into a
+:class:`Selection` tree. :func:`loader_options` turns that tree into
+``load_only``/``selectinload`` options, so only selected columns and included
+relations are read; touching anything else raises instead of lazy-loading.
+:func:`build` turns loaded rows into schema instances whose ``exclude_unset``
+dump (:func:`dump_json`) holds only the selected data.
+
+``fields`` lists field names, dotted for included relations
+(``fields=name,steps.title``). ``id`` is always returned, and a level without
+listed fields returns all of its fields. Naming a relation, or a field of one,
+includes it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import inspect
+from sqlalchemy.orm import MANYTOONE, load_only, raiseload, selectinload
+
+from app.models import Run, RunStep, StepFieldDef, StepFieldValue, Template, TemplateStep
+from app.schemas.runs import RunDetail, RunStepRead, RunWithTemplate, StepFieldValueRead
+from app.schemas.templates import StepFieldDefRead, TemplateRead, TemplateStepRead
+
+Path = tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Resource:
+    schema: type[BaseModel]
+    model: type
+    relations: dict[str, Resource] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        return tuple(name for name in self.schema.model_fields if name not in self.relations)
+
+
+FIELD_DEF = Resource(StepFieldDefRead, StepFieldDef)
+TEMPLATE_STEP = Resource(TemplateStepRead, TemplateStep, {"field_defs": FIELD_DEF})
+TEMPLATE = Resource(TemplateRead, Template, {"steps": TEMPLATE_STEP})
+FIELD_VALUE = Resource(StepFieldValueRead, StepFieldValue)
+RUN_STEP = Resource(
+    RunStepRead, RunStep, {"template_step": TEMPLATE_STEP, "field_values": FIELD_VALUE}
+)
+RUN = Resource(RunWithTemplate, Run, {"template": TEMPLATE})
+RUN_DETAIL = Resource(RunDetail, Run, {"steps": RUN_STEP})
+
+
+@dataclass
+class Selection:
+    columns: tuple[str, ...]
+    children: dict[str, Selection] = field(default_factory=dict)
+
+    def find(self, path: Path) -> Selection | None:
+        selection: Selection | None = self
+        for name in path:
+            selection = selection.children.get(name) if selection else None
+        return selection
+
+
+def _split(value: str | None) -> list[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _resolve(resource: Resource, path: Path, parameter: str) -> Resource:
+    for depth, name in enumerate(path):
+        if name not in resource.relations:
+            raise ValueError(f"Unknown {parameter}: {'.'.join(path[: depth + 1])}")
+        resource = resource.relations[name]
+    return resource
+
+
+def parse_selection(
+    resource: Resource,
+    *,
+    fields: str | None = None,
+    include: str | None = None,
+    default_include: Iterable[str] = (),
+) -> Selection:
+    """Parse ``fields``/``include``; ``default_include`` applies when ``include`` is absent.
+
+    Raises ``ValueError`` naming the first unknown field or relation.
+    """
+    includes: set[Path] = set()
+
+    def add_include(path: Path) -> None:
+        includes.update(path[: depth + 1] for depth in range(len(path)))
+
+    for item in default_include if include is None else _split(include):
+        path = tuple(item.split("."))
+        _resolve(resource, path, "include")
+        add_include(path)
+
+    requested: dict[Path, set[str]] = {}
+    for item in _split(fields):
+        *prefix, name = item.split(".")
+        owner = _resolve(resource, tuple(prefix), "field")
+        if name in owner.relations:
+            add_include((*prefix, name))
+        elif name in owner.columns:
+            add_include(tuple(prefix))
+            requested.setdefault(tuple(prefix), set()).add(name)
+        else:
+            raise ValueError(f"Unknown field: {item}")
+
+    def select_level(resource: Resource, path: Path) -> Selection:
+        names = requested.get(path)
+        columns = resource.columns
+        if names:
+            columns = tuple(name for name in columns if name in names or name == "id")
+        return Selection(
+            columns,
+            {
+                name: select_level(relation, (*path, name))
+                for name, relation in resource.relations.items()
+                if (*path, name) in includes
+            },
+        )
+
+    return select_level(resource, ())
+
+
+def loader_options(
+    resource: Resource, selection: Selection, *, external: Iterable[Path] = ()
+) -> list[Any]:
+    """Loader options reading only ``selection``.
+
+    Relations in ``external`` are left for the caller to fill (see :func:`build`);
+    only the foreign keys they need are loaded.
+    """
+    external = {tuple(path) for path in external}
+    mapper = inspect(resource.model)
+    keys = dict.fromkeys(selection.columns)
+    options: list[Any] = []
+    for name, relation in resource.relations.items():
+        attribute = getattr(resource.model, name)
+        child = selection.children.get(name)
+        if child is not None and mapper.relationships[name].direction is MANYTOONE:
+            # The key selectinload (or the caller) looks the related row up by
+            for column in mapper.relationships[name].local_columns:
+                keys[mapper.get_property_by_column(column).key] = None
+        if child is None or (name,) in external:
+            options.append(raiseload(attribute))
+            continue
+        nested = [path[1:] for path in external if len(path) > 1 and path[0] == name]
+        options.append(
+            selectinload(attribute).options(*loader_options(relation, child, external=nested))
+        )
+    options.append(load_only(*(getattr(resource.model, key) for key in keys), raiseload=True))
+    return options
+
+
+def build(
+    resource: Resource, obj: Any, selection: Selection, *, external: Iterable[Path] = ()
+) -> BaseModel:
+    """``resource.schema`` holding only the selected attributes of ``obj``.
+
+    ``obj`` may be a loaded row or any object with the same attributes (such as
+    a schema instance). Relations in ``external`` are skipped; assign them later.
+    """
+    external = {tuple(path) for path in external}
+    values = {name: getattr(obj, name) for name in selection.columns}
+    for name, child in selection.children.items():
+        if (name,) in external:
+            continue
+        relation = resource.relations[name]
+        nested = [path[1:] for path in external if len(path) > 1 and path[0] == name]
+        value = getattr(obj, name)
+        if isinstance(value, list):
+            values[name] = [build(relation, item, child, external=nested) for item in value]
+        else:
+            values[name] = (
+                None if value is None else build(relation, value, child, external=nested)
+            )
+    return resource.schema.model_construct(**values)
+
+
+@cache
+def _list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[schema])
+
+
+def dump_json(value: BaseModel | list[BaseModel], schema: type[BaseModel]) -> bytes:
+    """JSON of built instances, with only the fields they were built with."""
+    if isinstance(value, list):
+        return _list_adapter(schema).dump_json(value, by_alias=True, exclude_unset=True)
+    return value.model_dump_json(by_alias=True, exclude_unset=True)
@@ -0,0 +1,125 @@
+"""Storage behind ``Idempotency-Key``.
+
+A request claims its key with an ``INSERT`` in the transaction that also runs
+the route (see :mod:`app.api.idempotency`). A concurrent request with the same
+key blocks on that row until the first one commits, then finds its stored
+response; if the first one rolls back, the key is free again. Keys expire
+after ``IDEMPOTENCY_KEY_TTL_SECONDS`` and are purged in batches.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.database import get_sessionmaker
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = 1000
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    headers: list[tuple[str, str]]
+    body: bytes
+
+
+def request_hash(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _stored(db: Session, key: str, now: datetime) -> StoredResponse | None:
+    row = db.scalar(
+        select(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at > now)
+    )
+    if row is None:
+        return None
+    headers = [(name, value) for name, value in row.headers or []]
+    return StoredResponse(row.request_hash, row.status_code, headers, row.response or b"")
+
+
+def stored_response(db: Session, key: str) -> StoredResponse | None:
+    """The response recorded for ``key``, unless it expired."""
+    return _stored(db, key, datetime.utcnow())
+
+
+def claim_key(db: Session, key: str, hashed: str) -> IdempotencyKey | None:
+    """Reserve ``key`` in ``db``'s transaction; ``None`` if another request used it.
+
+    The caller fills in the returned row with :func:`record_response` and
+    commits, or rolls back to release the key.
+    """
+    now = datetime.utcnow()
+    db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now)
+    )
+    row = IdempotencyKey(
+        key=key,
+        request_hash=hashed,
+        created_at=now,
+        expires_at=now + timedelta(seconds=get_settings().idempotency_key_ttl_seconds),
+    )
+    db.add(row)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Another request committed the key first
+        db.rollback()
+        return None
+    return row
+
+
+def record_response(
+    row: IdempotencyKey, status_code: int, headers: list[tuple[str, str]], body: bytes
+) -> None:
+    row.status_code = status_code
+    row.headers = [list(header) for header in headers]
+    row.response = body
+
+
+def purge_expired_keys(db: Session, *, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete expired keys, ``batch_size`` per transaction; how many went."""
+    purged = 0
+    while True:
+        keys = select(IdempotencyKey.key).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        deleted = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys.limit(batch_size)))
+        ).rowcount
+        db.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+
+def run_purge_pass() -> int:
+    with get_sessionmaker()() as db:
+        return purge_expired_keys(db)
+
+
+async def purge_periodically(interval_seconds: int) -> None:
+    """Purge expired keys every ``interval_seconds`` until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            purged = await run_in_threadpool(run_purge_pass)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
+        else:
+            if purged:
+                logger.info("Purged %d expired idempotency keys", purged)
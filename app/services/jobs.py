@@ -0,0 +1,179 @@
+"""A small job queue on the ``jobs`` table.
+
+Endpoints queue a job and answer ``202``; the job is then attempted right
+after the response (a FastAPI background task) and, if that fails or the
+process dies, by any worker polling the table: the in-process loop
+(``JOB_WORKER_INTERVAL_SECONDS``) or ``scripts/run_jobs.py``. Workers claim
+jobs with ``FOR UPDATE SKIP LOCKED`` plus a conditional ``UPDATE ... WHERE
+status = 'queued'``, so on Postgres and on SQLite (which ignores row locks)
+every attempt runs exactly once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.database import get_sessionmaker
+from app.models import Job
+from app.services.run_actions import bulk_runs_job
+from app.services.template_purge import purge_template
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+# kind -> handler(db, job); handlers commit as they go, update job.progress and
+# may return a JSON-able result
+HANDLERS: dict[str, Callable[[Session, Job], Any | None]] = {
+    "bulk_runs": bulk_runs_job,
+    "purge_template": purge_template,
+}
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def create_job(db: Session, kind: str, payload: dict[str, Any] | None = None) -> Job:
+    """Add a queued job to the session and flush it so it has an id; caller commits."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(kind=kind, payload=payload, max_attempts=get_settings().job_max_attempts)
+    db.add(job)
+    db.flush()
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    delay = timedelta(seconds=get_settings().job_retry_backoff_seconds * 2 ** (attempts - 1))
+    return min(delay, MAX_RETRY_DELAY)
+
+
+def claim_job(
+    db: Session, worker: str, *, job_id: int | None = None, now: datetime | None = None
+) -> Job | None:
+    """Mark the next due queued job (or ``job_id``, if due) running; commits the claim."""
+    now = now or datetime.utcnow()
+    stmt = (
+        select(Job.id)
+        .where(Job.status == "queued", Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if job_id is not None:
+        stmt = stmt.where(Job.id == job_id)
+    candidate = db.scalar(stmt)
+    if candidate is None:
+        db.rollback()
+        return None
+    claimed = db.execute(
+        update(Job)
+        .where(Job.id == candidate, Job.status == "queued")
+        .values(status="running", locked_by=worker, attempts=Job.attempts + 1, started_at=now),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    db.commit()
+    return db.get(Job, candidate) if claimed else None
+
+
+def execute_job(db: Session, job: Job) -> None:
+    """Run a claimed job's handler and record success, a retry or the final failure."""
+    job_id, kind = job.id, job.kind
+    try:
+        result = HANDLERS[kind](db, job)
+    except Exception as exc:
+        logger.exception("Job %d (%s) failed", job_id, kind)
+        db.rollback()
+        job = db.get(Job, job_id)
+        job.error = str(exc)
+        if job.attempts < job.max_attempts:
+            job.status = "queued"
+            job.run_after = datetime.utcnow() + retry_delay(job.attempts)
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+    else:
+        # Handlers may have expunged the session between chunks
+        job = db.get(Job, job_id)
+        job.status = "succeeded"
+        job.result = result
+        job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    db.commit()
+
+
+def requeue_stale_jobs(
+    db: Session, *, older_than: timedelta, now: datetime | None = None
+) -> int:
+    """Release running jobs whose worker stopped updating them; returns how many.
+
+    Jobs with attempts left are re-queued; those that used their last attempt
+    are marked failed, so a job that keeps killing its worker is not retried forever.
+    """
+    now = now or datetime.utcnow()
+    stale = (Job.status == "running", Job.updated_at < now - older_than)
+    error = "Worker stopped responding"
+    failed = db.execute(
+        update(Job)
+        .where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status="failed", locked_by=None, error=error, finished_at=now),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    requeued = db.execute(
+        update(Job)
+        .where(*stale)
+        .values(status="queued", locked_by=None, error=error),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    db.commit()
+    return failed + requeued
+
+
+def run_job(job_id: int) -> None:
+    """Attempt one specific job now, unless a worker already has it or it is not due."""
+    with get_sessionmaker()() as db:
+        job = claim_job(db, worker_id(), job_id=job_id)
+        if job is not None:
+            execute_job(db, job)
+
+
+def work_once(worker: str | None = None) -> bool:
+    """Claim and run the next due job; returns whether there was one."""
+    with get_sessionmaker()() as db:
+        job = claim_job(db, worker or worker_id())
+        if job is None:
+            return False
+        execute_job(db, job)
+        return True
+
+
+def work_pending(worker: str | None = None) -> int:
+    """Re-queue stale jobs, then run due jobs until none are left; returns jobs run."""
+    with get_sessionmaker()() as db:
+        requeue_stale_jobs(db, older_than=timedelta(seconds=get_settings().job_stale_after_seconds))
+    done = 0
+    while work_once(worker):
+        done += 1
+    return done
+
+
+async def work_periodically(poll_seconds: int) -> None:
+    """Run queued jobs every ``poll_seconds`` until cancelled."""
+    while True:
+        try:
+            await run_in_threadpool(work_pending)
+        except Exception:
+            logger.exception("Job worker pass failed")
+        await asyncio.sleep(poll_seconds)
@@ -0,0 +1,324 @@
+"""Monthly range partitioning of ``runs`` and ``run_steps`` on Postgres.
+
+Partitioning is opt-in (``DB_PARTITION_RUNS``). Converting rewrites both tables
+into ``PARTITION BY RANGE (created_at)`` parents with one partition per month
+(``runs_p2026_01``...) plus a default partition, so run it in a maintenance
+window. Postgres requires the partition key in every unique constraint, which
+has three consequences:
+
+* primary keys become ``(id, created_at)``; ids still come from the original
+  sequences, so the ORM keeps treating ``id`` alone as the identity;
+* foreign keys *into* the partitioned tables become composite. ``run_steps``
+  gains ``run_created_at`` and ``step_field_values`` gains
+  ``run_step_created_at``, filled by ``BEFORE INSERT`` triggers (the ORM never
+  sets them), so ``ON DELETE CASCADE`` keeps working. ``created_at`` of runs and
+  run steps must therefore never change;
+* unique constraints gain ``created_at``. Each partition also gets a unique
+  index on the original columns (:data:`PARTITION_UNIQUE`), so a run's step
+  order stays unique unless its steps straddle a month boundary.
+
+Triggers are not copied to the rebuilt tables; the sync change-log triggers
+are re-created on them (see :mod:`app.models.sync`).
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.models.sync import install_sync
+
+PARTITIONED_TABLES = ("runs", "run_steps")
+
+# connection.info key caching :func:`steps_partitioned` per DBAPI connection
+_STEPS_PARTITIONED = "partitions.steps_partitioned"
+
+# Composite foreign keys into the partitioned tables:
+# (table, constraint, column holding the parent's created_at, column holding its id, parent)
+INCOMING_FOREIGN_KEYS = (
+    ("run_steps", "run_steps_run_id_fkey", "run_created_at", "run_id", "runs"),
+    (
+        "step_field_values",
+        "step_field_values_run_step_id_fkey",
+        "run_step_created_at",
+        "run_step_id",
+        "run_steps",
+    ),
+)
+
+# Unique constraints enforced per partition without created_at: table -> columns
+PARTITION_UNIQUE = {"run_steps": ("run_id", "order_index")}
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def _partition_month(table: str, name: str) -> date | None:
+    match = re.fullmatch(rf"{table}_p(\d{{4}})_(\d{{2}})", name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(connection: Connection, table: str = "runs") -> bool:
+    relkind = connection.scalar(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    )
+    return relkind == "p"
+
+
+def steps_partitioned(connection: Connection) -> bool:
+    """Whether ``run_steps`` is partitioned; looked up once per DBAPI connection.
+
+    Step reads and deletes bound ``run_steps.created_at`` by their runs'
+    ``created_at`` only then, so Postgres can skip older partitions. The bound
+    relies on steps never being created before their run, which nothing
+    enforces, so unpartitioned tables never get it.
+    """
+    if connection.dialect.name != "postgresql":
+        return False
+    partitioned = connection.info.get(_STEPS_PARTITIONED)
+    if partitioned is None:
+        partitioned = is_partitioned(connection, "run_steps")
+        connection.info[_STEPS_PARTITIONED] = partitioned
+    return partitioned
+
+
+def list_partitions(connection: Connection, table: str) -> dict[str, date | None]:
+    """Attached partitions of ``table`` mapped to their month (``None`` for default)."""
+    names = connection.scalars(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    ).all()
+    return {name: _partition_month(table, name) for name in names}
+
+
+def _add_partition_indexes(connection: Connection, table: str, name: str) -> None:
+    if table in PARTITION_UNIQUE:
+        columns = ", ".join(PARTITION_UNIQUE[table])
+        connection.execute(
+            text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name}_unique ON {name} ({columns})")
+        )
+
+
+def _drop_foreign_keys(connection: Connection, parent: str) -> list[tuple]:
+    """Drop the foreign keys into ``parent``; returns them for :func:`_add_foreign_keys`."""
+    dropped = [fk for fk in INCOMING_FOREIGN_KEYS if fk[4] == parent]
+    for table, constraint, *_ in dropped:
+        connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}"))
+    return dropped
+
+
+def _add_foreign_keys(connection: Connection, foreign_keys) -> None:
+    for table, constraint, created_column, id_column, parent in foreign_keys:
+        connection.execute(
+            text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {constraint} "
+                f"FOREIGN KEY ({id_column}, {created_column}) "
+                f"REFERENCES {parent} (id, created_at) ON DELETE CASCADE"
+            )
+        )
+
+
+def create_month_partition(connection: Connection, table: str, month: date) -> str:
+    """Create ``table``'s partition for ``month``, moving its rows out of the default partition.
+
+    Postgres refuses to create a partition while the default one holds rows in
+    its range, so those are copied into a standalone table that is then
+    attached. Foreign keys into ``table`` are dropped meanwhile, so deleting the
+    rows from the default partition does not cascade, and re-added afterwards.
+    """
+    name = partition_name(table, month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    default = f"{table}_default"
+    in_range = f"created_at >= '{start}' AND created_at < '{end}'"
+    if (
+        name not in list_partitions(connection, table)
+        and default in list_partitions(connection, table)
+        and connection.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})"))
+    ):
+        foreign_keys = _drop_foreign_keys(connection, table)
+        connection.execute(
+            text(
+                f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+                "INCLUDING STORAGE INCLUDING COMMENTS)"
+            )
+        )
+        connection.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}"))
+        connection.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+        connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+        _add_foreign_keys(connection, foreign_keys)
+    else:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}"))
+    _add_partition_indexes(connection, table, name)
+    return name
+
+
+def ensure_future_partitions(
+    connection: Connection, *, months_ahead: int, now: datetime | None = None
+) -> list[str]:
+    """Create partitions from the current month through ``months_ahead`` months out."""
+    current = month_start((now or datetime.utcnow()).date())
+    created = []
+    for table in PARTITIONED_TABLES:
+        existing = list_partitions(connection, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if partition_name(table, month) not in existing:
+                created.append(create_month_partition(connection, table, month))
+    return created
+
+
+def detach_partitions_before(
+    connection: Connection, cutoff: date, *, drop: bool = False, force: bool = False
+) -> list[str]:
+    """Detach (and optionally drop) month partitions that end on or before ``cutoff``.
+
+    Partitions that still hold rows are skipped unless ``force`` is set; archive
+    runs first so old partitions are empty by the time they are detached.
+    """
+    detached = []
+    for table in PARTITIONED_TABLES:
+        for name, month in sorted(list_partitions(connection, table).items()):
+            if month is None or add_months(month, 1) > cutoff:
+                continue
+            if not force and connection.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})")):
+                continue
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                connection.execute(text(f"DROP TABLE {name}"))
+            detached.append(name)
+    return detached
+
+
+def _rebuild_partitioned(
+    connection: Connection, table: str, *, months_ahead: int, now: datetime | None
+) -> None:
+    # Capture secondary indexes and unique/foreign-key constraints before the rename,
+    # so their definitions already point at the final table name.
+    indexes = connection.scalars(
+        text(
+            "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() "
+            "AND tablename = :table AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table))"
+        ),
+        {"table": table},
+    ).all()
+    constraints = connection.execute(
+        text(
+            "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table) AND contype IN ('u', 'f')"
+        ),
+        {"table": table},
+    ).all()
+    sequence = connection.scalar(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+    )
+    oldest = connection.scalar(text(f"SELECT min(created_at) FROM {table}"))
+
+    legacy = f"{table}_unpartitioned"
+    connection.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    connection.execute(
+        text(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+            "INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (created_at)"
+        )
+    )
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    current = month_start((now or datetime.utcnow()).date())
+    month = month_start(oldest.date()) if oldest else current
+    while month <= add_months(current, months_ahead):
+        create_month_partition(connection, table, month)
+        month = add_months(month, 1)
+    default = f"{table}_default"
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+    _add_partition_indexes(connection, table, default)
+
+    connection.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+    connection.execute(text(f"DROP TABLE {legacy}"))
+
+    connection.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, created_at)"))
+    for name, kind, definition in constraints:
+        if kind == "u":
+            definition = re.sub(r"\)$", ", created_at)", definition)
+        connection.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+    for definition in indexes:
+        connection.execute(text(definition))
+
+
+def _add_parent_created_at(
+    connection: Connection, table: str, created_column: str, id_column: str, parent: str
+) -> None:
+    """Add and backfill ``table.created_column``, kept filled from ``parent`` by a trigger."""
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {created_column} timestamp"))
+    connection.execute(
+        text(
+            f"UPDATE {table} SET {created_column} = {parent}.created_at "
+            f"FROM {parent} WHERE {parent}.id = {table}.{id_column}"
+        )
+    )
+    connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN {created_column} SET NOT NULL"))
+    connection.execute(
+        text(
+            f"""
+            CREATE OR REPLACE FUNCTION {table}_fill_{created_column}() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.{created_column} IS NULL THEN
+                    SELECT created_at INTO NEW.{created_column}
+                    FROM {parent} WHERE id = NEW.{id_column};
+                END IF;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+    )
+
+
+def _add_fill_trigger(connection: Connection, table: str, created_column: str) -> None:
+    connection.execute(
+        text(
+            f"CREATE TRIGGER {table}_fill_{created_column} BEFORE INSERT ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_fill_{created_column}()"
+        )
+    )
+
+
+def convert_to_partitioned(
+    connection: Connection, *, months_ahead: int, now: datetime | None = None
+) -> bool:
+    """Rebuild ``runs``/``run_steps`` as partitioned tables; no-op if already done."""
+    if is_partitioned(connection, "runs"):
+        return False
+    # Parents' created_at is copied onto child rows while the old foreign keys
+    # still guarantee every child has a parent
+    for table, constraint, created_column, id_column, parent in INCOMING_FOREIGN_KEYS:
+        _add_parent_created_at(connection, table, created_column, id_column, parent)
+        connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}"))
+    for table in PARTITIONED_TABLES:
+        _rebuild_partitioned(connection, table, months_ahead=months_ahead, now=now)
+    for table, _, created_column, _, _ in INCOMING_FOREIGN_KEYS:
+        _add_fill_trigger(connection, table, created_column)
+    _add_foreign_keys(connection, INCOMING_FOREIGN_KEYS)
+    if connection.scalar(text("SELECT to_regclass('sync_changes')")) is not None:
+        install_sync(connection, PARTITIONED_TABLES)
+    connection.info[_STEPS_PARTITIONED] = True
+    return True
@@ -0,0 +1,61 @@
+"""Apply a ``POST /runs:bulk`` request, inline or as a background job."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Job, RunArchive
+from app.schemas.runs import RunBulkRequest
+from app.services import run_bulk
+from app.services.archive import archive_runs
+
+
+def apply_bulk_request(
+    db: Session, payload: RunBulkRequest, *, on_chunk: Callable[[int], None] | None = None
+) -> int:
+    """Archive, delete or re-status the selected runs, one committed chunk at a time.
+
+    Runs are never loaded for ``delete``/``set_status``: each chunk of ids is one
+    ``UPDATE`` or a ``DELETE`` per table. ``on_chunk`` gets the running total
+    before each commit. A failure part-way keeps the chunks already committed.
+    """
+    chunk_size = get_settings().bulk_chunk_size
+    if payload.run_ids is not None:
+        chunks = run_bulk.iter_chunks(payload.run_ids, chunk_size)
+    else:
+        criteria = run_bulk.run_criteria(**payload.filter.model_dump())
+        chunks = run_bulk.iter_run_id_chunks(db, criteria, chunk_size)
+
+    affected = 0
+    for run_ids in chunks:
+        if payload.action == "archive":
+            affected += archive_runs(db, run_ids)
+        elif payload.action == "delete":
+            affected += run_bulk.delete_runs(db, run_ids)
+            if payload.run_ids is not None:
+                # Ids may also name runs already moved to cold storage
+                archived = delete(RunArchive).where(RunArchive.run_id.in_(run_ids))
+                affected += db.execute(archived).rowcount
+        else:
+            affected += run_bulk.set_runs_status(db, run_ids, payload.status)
+        if on_chunk is not None:
+            on_chunk(affected)
+        db.commit()
+        db.expunge_all()
+    return affected
+
+
+def bulk_runs_job(db: Session, job: Job) -> dict[str, Any]:
+    job_id = job.id
+
+    def record_progress(affected: int) -> None:
+        # Chunks expunge the session, so look the job up again each time
+        db.get(Job, job_id).progress = affected
+
+    payload = RunBulkRequest.model_validate(job.payload)
+    return {"affected": apply_bulk_request(db, payload, on_chunk=record_progress)}
@@ -0,0 +1,114 @@
+"""Set-based operations over many runs, applied in chunked transactions.
+
+Nothing here loads runs into the session: each chunk of ids is selected by
+keyset (``id > last``) and changed with one ``UPDATE``/``DELETE`` per table,
+then committed, so large cleanups neither hold long locks nor grow memory.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from datetime import datetime, timedelta
+
+from sqlalchemy import ColumnElement, and_, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Run, RunStep, StepFieldValue
+from app.services.partitions import steps_partitioned
+from app.services.run_documents import invalidate
+
+
+def delete_runs(
+    db: Session, run_ids: Sequence[int], *, created_since: datetime | None = None
+) -> int:
+    """Delete runs with their steps and field values; returns runs deleted.
+
+    Children are deleted with one statement per table first, rather than row by
+    row through ``ON DELETE CASCADE``. Pass the oldest ``created_at`` of the runs
+    as ``created_since`` to let Postgres skip older ``run_steps`` partitions; it
+    is ignored unless ``run_steps`` is partitioned (see
+    :func:`app.services.partitions.steps_partitioned`).
+    """
+    if not run_ids:
+        return 0
+    invalidate(db, run_ids)
+    steps_of_runs = [RunStep.run_id.in_(run_ids)]
+    if created_since is not None and steps_partitioned(db.connection()):
+        steps_of_runs.append(RunStep.created_at >= created_since)
+    step_ids = select(RunStep.id).where(*steps_of_runs).scalar_subquery()
+    db.execute(
+        delete(StepFieldValue).where(StepFieldValue.run_step_id.in_(step_ids)),
+        execution_options={"synchronize_session": False},
+    )
+    db.execute(
+        delete(RunStep).where(*steps_of_runs),
+        execution_options={"synchronize_session": False},
+    )
+    result = db.execute(
+        delete(Run).where(Run.id.in_(run_ids)), execution_options={"synchronize_session": False}
+    )
+    return result.rowcount
+
+
+def set_runs_status(db: Session, run_ids: Sequence[int], status: str) -> int:
+    """Set ``status`` on runs, bumping their ``version``; returns rows changed.
+
+    Moving runs to ``done`` also marks them ``completed``, stamping
+    ``completed_at`` where it is not already set.
+    """
+    if not run_ids:
+        return 0
+    invalidate(db, run_ids)
+    values = {"status": status, "version": Run.version + 1}
+    if status == "done":
+        values.update(
+            completed=True, completed_at=func.coalesce(Run.completed_at, datetime.utcnow())
+        )
+    result = db.execute(
+        update(Run).where(Run.id.in_(run_ids), Run.status != status).values(**values),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
+
+
+def run_criteria(
+    *,
+    template_id: int | None = None,
+    status: str | None = None,
+    older_than_days: int | None = None,
+    now: datetime | None = None,
+) -> list[ColumnElement[bool]]:
+    criteria: list[ColumnElement[bool]] = []
+    if template_id is not None:
+        criteria.append(Run.template_id == template_id)
+    if status is not None:
+        criteria.append(Run.status == status)
+    if older_than_days is not None:
+        cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+        # created_at is implied by updated_at and lets Postgres prune partitions
+        criteria.extend([Run.updated_at < cutoff, Run.created_at < cutoff])
+    return criteria
+
+
+def iter_run_id_chunks(
+    db: Session, criteria: Sequence[ColumnElement[bool]], chunk_size: int
+) -> Iterator[list[int]]:
+    """Yield ids of runs matching ``criteria`` in ascending chunks."""
+    last_id = 0
+    while True:
+        ids = db.scalars(
+            select(Run.id)
+            .where(and_(*criteria), Run.id > last_id)
+            .order_by(Run.id)
+            .limit(chunk_size)
+        ).all()
+        if not ids:
+            return
+        yield list(ids)
+        last_id = ids[-1]
+
+
+def iter_chunks(run_ids: Sequence[int], chunk_size: int) -> Iterator[list[int]]:
+    unique = sorted(set(run_ids))
+    for start in range(0, len(unique), chunk_size):
+        yield unique[start:start + chunk_size]
@@ -0,0 +1,260 @@
+"""Cache of serialized ``GET /runs/{id}`` bodies.
+
+A hit is one dictionary lookup in the per-process LRU, or one primary-key
+read of ``run_documents`` when ``RUN_DOCUMENT_STORE`` is on. The cached value
+is the exact response bytes, so nothing is loaded or validated.
+
+Endpoints that change a single run re-render its document after they commit
+(write-through, :func:`refresh_document`). Set-based changes drop the
+documents of the runs they touch (:func:`invalidate`). Reads only fill missing
+entries, never replace one, and skip the fill once a write happened since they
+started (the store: once the run or its steps moved past the versions they
+rendered), so a read racing a write can neither overwrite the fresh document
+nor bring back a dropped one. Other processes' LRUs notice a write within
+``RUN_DOCUMENT_CACHE_TTL_SECONDS``; stored documents are rendered again once
+older than ``RUN_DOCUMENT_STORE_TTL_SECONDS``, bounding how long a change that
+invalidated nothing can be served stale.
+
+Only runs rendered from a template version snapshot are cached; older runs
+follow live template edits, which do not invalidate anything.
+
+Sessions inside a transaction their routes do not commit (``POST /batch``, an
+idempotent ``POST``) call :func:`defer_writes`: their renders are never cached
+and the runs they write are only noted, to be dropped by :func:`release_writes`
+once the owner has committed.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from sqlalchemy import LargeBinary, delete, exists, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Run, RunDocument, RunStep, Template
+from app.schemas.runs import RunDetail
+from app.services.run_loader import render_run_detail
+
+
+class DocumentCache:
+    """Thread-safe LRU of ``run_id -> bytes`` with a per-entry time to live.
+
+    ``writes`` counts replacing puts and discards; a fill passing the count it
+    read before rendering is dropped if any happened since.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.writes = 0
+        self._entries: OrderedDict[int, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, run_id: int) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(run_id)
+            if entry is None:
+                return None
+            expires_at, document = entry
+            if expires_at < time.monotonic():
+                del self._entries[run_id]
+                return None
+            self._entries.move_to_end(run_id)
+            return document
+
+    def put(
+        self, run_id: int, document: bytes, *, replace: bool = True, since: int | None = None
+    ) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if replace:
+                self.writes += 1
+            elif run_id in self._entries or since not in (None, self.writes):
+                return
+            self._entries[run_id] = (time.monotonic() + self.ttl_seconds, document)
+            self._entries.move_to_end(run_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, run_ids: Iterable[int]) -> None:
+        with self._lock:
+            self.writes += 1
+            for run_id in run_ids:
+                self._entries.pop(run_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Session.info key of the ids of runs written while the session's cache writes are deferred
+_DEFERRED = "run_documents.deferred"
+
+
+@lru_cache(maxsize=1)
+def get_document_cache() -> DocumentCache:
+    settings = get_settings()
+    return DocumentCache(settings.run_document_cache_size, settings.run_document_cache_ttl_seconds)
+
+
+def serialize_detail(detail: RunDetail) -> bytes:
+    return detail.model_dump_json(by_alias=True).encode()
+
+
+def _dialect_insert(db: Session):
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(RunDocument)
+
+
+def _stale_before() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=get_settings().run_document_store_ttl_seconds)
+
+
+def _store_if_absent(db: Session, detail: RunDetail, document: bytes) -> None:
+    # Guarded by EXISTS so a read racing a delete (of the run, or of its template)
+    # does not resurrect the run's document, nor one racing a change write back
+    # the versions it rendered; only an expired row is replaced
+    deleted = select(Template.id).where(Template.deleted_at.is_not(None))
+    step_versions = (
+        select(func.coalesce(func.sum(RunStep.version), 0))
+        .where(RunStep.run_id == detail.id)
+        .scalar_subquery()
+    )
+    current = exists().where(
+        Run.id == detail.id,
+        Run.version == detail.version,
+        Run.template_id.not_in(deleted),
+        step_versions == sum(step.version for step in detail.steps),
+    )
+    row = select(
+        literal(detail.id), literal(document, LargeBinary), literal(datetime.utcnow())
+    ).where(current)
+    stmt = _dialect_insert(db).from_select(["run_id", "document", "rendered_at"], row)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["run_id"],
+            set_={"document": stmt.excluded.document, "rendered_at": stmt.excluded.rendered_at},
+            where=RunDocument.rendered_at < _stale_before(),
+        )
+    )
+
+
+def _store(db: Session, run_id: int, document: bytes) -> None:
+    stmt = _dialect_insert(db).values(
+        run_id=run_id, document=document, rendered_at=datetime.utcnow()
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["run_id"],
+            set_={"document": stmt.excluded.document, "rendered_at": stmt.excluded.rendered_at},
+        )
+    )
+
+
+def defer_writes(db: Session) -> None:
+    """Keep what ``db`` renders out of the cache until :func:`release_writes`.
+
+    A session whose ``info`` was copied from a deferred one shares its set of runs.
+    """
+    db.info.setdefault(_DEFERRED, set())
+
+
+def writes_deferred(db: Session) -> bool:
+    return _DEFERRED in db.info
+
+
+def release_writes(db: Session) -> None:
+    """Drop the documents of the runs ``db`` wrote, once their transaction has committed."""
+    get_document_cache().discard(db.info.pop(_DEFERRED, ()))
+
+
+def get_document(db: Session, run_id: int) -> bytes | None:
+    """The ``RunDetail`` JSON for ``run_id`` from the cache, rendering it on a miss.
+
+    ``None`` for missing runs and runs of soft-deleted templates, whose documents
+    are dropped when the template is deleted.
+    """
+    cache = get_document_cache()
+    writes = cache.writes
+    deferred = db.info.get(_DEFERRED)
+    # The transaction sees its own uncommitted writes, the cache does not
+    written = deferred is not None and run_id in deferred
+    document = None if written else cache.get(run_id)
+    if document is not None:
+        return document
+
+    store = get_settings().run_document_store
+    if store and not written:
+        document = db.scalar(
+            select(RunDocument.document).where(
+                RunDocument.run_id == run_id, RunDocument.rendered_at >= _stale_before()
+            )
+        )
+        if document is not None:
+            if deferred is None:
+                cache.put(run_id, document, replace=False, since=writes)
+            return document
+
+    rendered = render_run_detail(db, run_id, live_template=True)
+    if rendered is None:
+        return None
+    detail, from_snapshot = rendered
+    document = serialize_detail(detail)
+    if from_snapshot and deferred is None:
+        cache.put(run_id, document, replace=False, since=writes)
+        if store:
+            _store_if_absent(db, detail, document)
+            db.commit()
+    return document
+
+
+def refresh_detail(db: Session, run_id: int) -> tuple[RunDetail, bytes] | None:
+    """Re-render and cache ``run_id`` after a committed change; the new detail and document.
+
+    With deferred writes the change is not committed yet: the run is only invalidated.
+    """
+    cache = get_document_cache()
+    deferred = writes_deferred(db)
+    if deferred:
+        invalidate(db, [run_id])
+    rendered = render_run_detail(db, run_id)
+    if rendered is None:
+        cache.discard([run_id])
+        return None
+    detail, from_snapshot = rendered
+    document = serialize_detail(detail)
+    if from_snapshot and not deferred:
+        cache.put(run_id, document)
+        if get_settings().run_document_store:
+            _store(db, run_id, document)
+            db.commit()
+    return detail, document
+
+
+def refresh_document(db: Session, run_id: int) -> bytes | None:
+    """:func:`refresh_detail`, returning only the document."""
+    refreshed = refresh_detail(db, run_id)
+    return refreshed[1] if refreshed else None
+
+
+def invalidate(db: Session, run_ids: Iterable[int]) -> None:
+    """Drop the cached documents of ``run_ids``; caller commits the ``run_documents`` delete."""
+    run_ids = list(run_ids)
+    get_document_cache().discard(run_ids)
+    db.info.get(_DEFERRED, set()).update(run_ids)
+    if get_settings().run_document_store and run_ids:
+        db.execute(
+            delete(RunDocument).where(RunDocument.run_id.in_(run_ids)),
+            execution_options={"synchronize_session": False},
+        )
@@ -2,27 +2,253 @@
 
 from __future__ import annotations
 
-from sqlalchemy import select
+import json
+from typing import Any
+
+from sqlalchemy import ColumnElement, Select, bindparam, exists, func, or_, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import Run, RunStep, Template, TemplateStep, TemplateVersion
+from app.schemas.runs import RunDetail, RunRead, RunStepRead, StepFieldValueRead
+from app.schemas.templates import TemplateStepRead
+from app.services.fieldsets import (
+    RUN,
+    RUN_DETAIL,
+    TEMPLATE_STEP,
+    Selection,
+    build,
+    loader_options,
+)
+from app.services.partitions import steps_partitioned
 
-from app.models import Run, RunStep, TemplateStep
+# Built once at import: per call we only bind ``run_id``, skipping statement
+# construction and loader-option processing before the compile-cache lookup.
+RUN_DETAIL_STMT = (
+    select(Run).options(selectinload(Run.template)).where(Run.id == bindparam("run_id"))
+)
 
+RUN_DETAILS_STMT = (
+    select(Run)
+    .options(selectinload(Run.template))
+    .where(Run.id.in_(bindparam("run_ids", expanding=True)))
+    .order_by(Run.id)
+)
 
-from typing import Optional
 
-def load_run_detail(db: Session, run_id: int) -> Optional[Run]:
+# Steps are read with their own statement instead of ``selectinload(Run.steps)``,
+# which only knows ``run_id``. When ``run_steps`` is partitioned, the runs' oldest
+# ``created_at`` also bounds them so Postgres skips older month partitions (see
+# app.services.partitions.steps_partitioned); keyed by whether the bound applies.
+def _steps_stmts(*options) -> dict[bool, Select]:
     stmt = (
-        select(Run)
-        .options(
-            selectinload(Run.template),
-            selectinload(Run.steps)
-            .selectinload(RunStep.template_step)
-            .selectinload(TemplateStep.field_defs),
-            selectinload(Run.steps).selectinload(RunStep.field_values),
+        select(RunStep)
+        .options(*options)
+        .where(RunStep.run_id.in_(bindparam("run_ids", expanding=True)))
+        .order_by(RunStep.run_id, RunStep.order_index)
+    )
+    return {False: stmt, True: stmt.where(RunStep.created_at >= bindparam("created_since"))}
+
+
+RUN_STEPS_DETAIL_STMTS = _steps_stmts(
+    selectinload(RunStep.template_step).selectinload(TemplateStep.field_defs),
+    selectinload(RunStep.field_values),
+)
+RUN_STEPS_STATE_STMTS = _steps_stmts(selectinload(RunStep.field_values))
+
+
+def _load_steps(db: Session, runs: list[Run], stmts: dict[bool, Select]) -> None:
+    """Fill ``run.steps`` of ``runs`` from ``stmts`` (one of the statement pairs above)."""
+    if not runs:
+        return
+    steps: dict[int, list[RunStep]] = {run.id: [] for run in runs}
+    params = {"run_ids": list(steps)}
+    pruned = steps_partitioned(db.connection())
+    if pruned:
+        params["created_since"] = min(run.created_at for run in runs)
+    for step in db.scalars(stmts[pruned], params):
+        steps[step.run_id].append(step)
+    for run in runs:
+        set_committed_value(run, "steps", steps[run.id])
+
+
+def load_run_detail(db: Session, run_id: int) -> Run | None:
+    run = db.execute(RUN_DETAIL_STMT, {"run_id": run_id}).scalars().first()
+    if run is not None:
+        _load_steps(db, [run], RUN_STEPS_DETAIL_STMTS)
+    return run
+
+
+def load_run_details(db: Session, run_ids: list[int]) -> list[Run]:
+    runs = db.execute(RUN_DETAILS_STMT, {"run_ids": run_ids}).scalars().all()
+    _load_steps(db, list(runs), RUN_STEPS_DETAIL_STMTS)
+    return runs
+
+
+# Run state plus the template version document it was started from: template
+# steps and field defs come from that one row instead of two more eager loads.
+_RUN_STATE_STMT = select(Run, TemplateVersion.document).outerjoin(
+    TemplateVersion, TemplateVersion.id == Run.template_version_id
+)
+RUN_STATE_STMT = _RUN_STATE_STMT.where(Run.id == bindparam("run_id"))
+# Runs of templates pending purge are already gone for clients reading them
+_TEMPLATE_LIVE = Run.template_id.not_in(
+    select(Template.id).where(Template.deleted_at.is_not(None))
+)
+LIVE_RUN_STATE_STMT = RUN_STATE_STMT.where(_TEMPLATE_LIVE)
+RUN_STATES_STMT = _RUN_STATE_STMT.where(
+    Run.id.in_(bindparam("run_ids", expanding=True))
+).order_by(Run.id)
+
+_RUN_STEP_FIELDS = [
+    name for name in RunStepRead.model_fields if name not in ("template_step", "field_values")
+]
+
+
+class _SnapshotSteps:
+    """Template steps of a version document, looked up for a run step.
+
+    Run steps of a deleted template step are detached (``template_step_id`` is
+    NULL) but keep the ``order_index`` they were created with from this same
+    snapshot, which is unique among its steps.
+    """
+
+    def __init__(self, steps: list[dict[str, Any]]) -> None:
+        self.by_id = {step["id"]: step for step in steps}
+        self.by_order = {step["order_index"]: step for step in steps}
+
+    def get(self, run_step: RunStep) -> dict[str, Any] | None:
+        if run_step.template_step_id is None:
+            return self.by_order.get(run_step.order_index)
+        return self.by_id.get(run_step.template_step_id)
+
+
+def _run_step_read(run_step: RunStep, template_steps: _SnapshotSteps) -> RunStepRead:
+    return RunStepRead(
+        **{name: getattr(run_step, name) for name in _RUN_STEP_FIELDS},
+        template_step=template_steps.get(run_step),
+        field_values=[StepFieldValueRead.model_validate(value) for value in run_step.field_values],
+    )
+
+
+def run_detail_from_snapshot(run: Run, document: dict[str, Any]) -> RunDetail:
+    template_steps = _SnapshotSteps(document["steps"])
+    return RunDetail(
+        **{name: getattr(run, name) for name in RunRead.model_fields},
+        steps=[_run_step_read(run_step, template_steps) for run_step in run.steps],
+    )
+
+
+def render_run_detail(
+    db: Session, run_id: int, *, live_template: bool = False
+) -> tuple[RunDetail, bool] | None:
+    """``(detail, from_snapshot)``: ``RunDetail`` rendered from the run's template version.
+
+    Runs created before template versioning fall back to the live eager load
+    (``from_snapshot`` is false: their steps change with the template). With
+    ``live_template``, runs of soft-deleted templates count as missing.
+    """
+    stmt = LIVE_RUN_STATE_STMT if live_template else RUN_STATE_STMT
+    row = db.execute(stmt, {"run_id": run_id}).first()
+    if row is None:
+        return None
+    run, document = row
+    if document is None:
+        return RunDetail.model_validate(load_run_detail(db, run_id)), False
+    _load_steps(db, [run], RUN_STEPS_STATE_STMTS)
+    return run_detail_from_snapshot(run, document), True
+
+
+def get_run_detail(db: Session, run_id: int) -> RunDetail | None:
+    rendered = render_run_detail(db, run_id)
+    return rendered[0] if rendered else None
+
+
+def get_run_details(db: Session, run_ids: list[int]) -> list[RunDetail]:
+    rows = db.execute(RUN_STATES_STMT, {"run_ids": run_ids}).all()
+    _load_steps(db, [run for run, document in rows if document is not None], RUN_STEPS_STATE_STMTS)
+    legacy_ids = [run.id for run, document in rows if document is None]
+    legacy = {run.id: run for run in load_run_details(db, legacy_ids)} if legacy_ids else {}
+    return [
+        run_detail_from_snapshot(run, document)
+        if document is not None
+        else RunDetail.model_validate(legacy[run.id])
+        for run, document in rows
+    ]
+
+
+_STEPS = RUN_DETAIL.relations["steps"]
+
+
+def get_sparse_run_detail(db: Session, run_id: int, selection: Selection) -> RunDetail | None:
+    """``RunDetail`` holding only ``selection`` (see :mod:`app.services.fieldsets`).
+
+    Steps are read like :func:`_load_steps` reads them, bounded by the run's
+    ``created_at`` on partitioned tables. Template steps come from the run's template version
+    snapshot, like the full document; legacy runs read the selected columns of
+    the live steps. Runs of soft-deleted templates count as missing.
+    """
+    steps = selection.children.get("steps")
+    external = [("steps",)] if steps is not None else []
+    template_step = steps.children.get("template_step") if steps is not None else None
+    stmt = (
+        select(Run, Run.created_at)
+        .options(*loader_options(RUN_DETAIL, selection, external=external))
+        .where(Run.id == run_id, _TEMPLATE_LIVE)
+    )
+    if template_step is not None:
+        stmt = stmt.add_columns(TemplateVersion.document).outerjoin(
+            TemplateVersion, TemplateVersion.id == Run.template_version_id
         )
-        .where(Run.id == run_id)
+    row = db.execute(stmt).first()
+    if row is None:
+        return None
+    run, created_at = row[:2]
+    detail = build(RUN_DETAIL, run, selection, external=external)
+    if steps is None:
+        return detail
+
+    step_external = [("template_step",)]
+    steps_stmt = (
+        select(RunStep)
+        .options(*loader_options(_STEPS, steps, external=step_external))
+        .where(RunStep.run_id == run_id)
+        .order_by(RunStep.order_index)
     )
-    return db.execute(stmt).unique().scalars().first()
+    if steps_partitioned(db.connection()):
+        steps_stmt = steps_stmt.where(RunStep.created_at >= created_at)
+    run_steps = db.scalars(steps_stmt).all()
+    detail.steps = [
+        build(_STEPS, run_step, steps, external=step_external) for run_step in run_steps
+    ]
+    if template_step is None:
+        return detail
+
+    document = row[2]
+    if document is not None:
+        snapshot = _SnapshotSteps(document["steps"])
+        sources = [
+            None if step is None else TemplateStepRead.model_validate(step)
+            for step in map(snapshot.get, run_steps)
+        ]
+    else:
+        # Legacy runs show the live template steps; detached run steps have none
+        template_step_ids = {run_step.template_step_id for run_step in run_steps}
+        live = {
+            step.id: step
+            for step in db.scalars(
+                select(TemplateStep)
+                .options(*loader_options(TEMPLATE_STEP, template_step))
+                .where(TemplateStep.id.in_(template_step_ids - {None}))
+            )
+        }
+        sources = [live.get(run_step.template_step_id) for run_step in run_steps]
+    for source, step_read in zip(sources, detail.steps, strict=True):
+        step_read.template_step = (
+            None if source is None else build(TEMPLATE_STEP, source, template_step)
+        )
+    return detail
 
 
 def load_runs(db: Session, *filters) -> list[Run]:
@@ -34,3 +260,54 @@ def load_runs(db: Session, *filters) -> list[Run]:
     for condition in filters:
         stmt = stmt.where(condition)
     return db.execute(stmt).unique().scalars().all()
+
+
+def load_sparse_runs(db: Session, selection: Selection, *filters) -> list[Run]:
+    """Runs with only the columns and relations in ``selection``; see :func:`load_runs`."""
+    stmt = select(Run).options(*loader_options(RUN, selection)).order_by(Run.id)
+    for condition in filters:
+        stmt = stmt.where(condition)
+    return db.execute(stmt).scalars().all()
+
+
+def _reject_constant(name: str) -> Any:
+    # NaN and +/-Infinity are not JSON numbers and cannot be bound as JSONB
+    raise ValueError(f"{name} is not a JSON number")
+
+
+def _variable_values(value: str) -> list[Any]:
+    """``value``, plus the JSON number or boolean it spells (``3``, ``true``) if any."""
+    try:
+        parsed = json.loads(value, parse_constant=_reject_constant)
+    except ValueError:
+        return [value]
+    if isinstance(parsed, (bool, int, float)):
+        return [value, parsed]
+    return [value]
+
+
+def variable_filter(
+    db: Session, key: str, value: str, column: Any = Run.variables
+) -> ColumnElement[bool]:
+    """Match rows with a ``{"key": key, "value": value}`` entry in ``column``.
+
+    Query strings are text, so ``?var.count=3`` also matches a stored number ``3``
+    (and ``true``/``false`` a stored boolean). Postgres uses JSONB containment so
+    the GIN index on the column applies; other backends (SQLite in tests)
+    scan the array with ``json_each``.
+    """
+    values = _variable_values(value)
+    if db.get_bind().dialect.name == "postgresql":
+        variables = type_coerce(column, JSONB)
+        return or_(*(variables.contains([{"key": key, "value": v}]) for v in values))
+
+    entry = func.json_each(column).table_valued("value").alias("variable")
+    # json_extract returns numbers and booleans (as 1/0) untyped; compare their JSON text
+    stored = entry.c.value.op("->")("$.value")
+    return exists().where(
+        func.json_extract(entry.c.value, "$.key") == key,
+        or_(
+            func.json_extract(entry.c.value, "$.value") == value,
+            *(stored == json.dumps(v) for v in values[1:]),
+        ),
+    )
@@ -0,0 +1,129 @@
+"""Per-key changes to ``Run.variables`` applied inside the database.
+
+``Run.variables`` is a list of ``{"key", "label", "value", ...}`` entries. A
+patch sets the ``value`` of some keys and removes others in one ``UPDATE`` that
+rebuilds the list from its current contents, so the run is never loaded and
+concurrent patches to different keys both survive. Existing entries keep their
+position and other attributes (the value is replaced with ``jsonb_set`` on
+Postgres, ``json_set`` on SQLite); new keys are appended as ``{"key", "value"}``
+in request order. Like :mod:`app.services.run_writes`, the update bumps
+``Run.version`` and can be limited to the versions sent in ``If-Match``.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from functools import cache
+from typing import Any
+
+from sqlalchemy import TextClause, bindparam, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Run
+from app.services.run_documents import invalidate
+from app.services.run_writes import VersionConflict
+
+# :set is a JSON array of {"key", "value"} entries, :unset a JSON array of keys.
+# Anything but an array in runs.variables (SQL or JSON null) counts as empty. The new
+# list is built from the updated row's own runs.variables, never from a separate read
+# of runs: a patch that waited on another's row lock then sees that patch's result
+# (Postgres re-evaluates SET against the latest row version under READ COMMITTED).
+_POSTGRES_PATCH = """
+    UPDATE runs SET updated_at = :now, version = runs.version + 1, variables = (
+        SELECT coalesce(jsonb_agg(merged.entry ORDER BY merged.part, merged.position), '[]')
+        FROM (
+            SELECT CASE WHEN jsonb_typeof(runs.variables) = 'array' THEN runs.variables
+                        ELSE '[]'::jsonb END
+        ) AS current(variables), LATERAL (
+            SELECT 0 AS part, v.position,
+                   CASE WHEN s.entry IS NULL THEN v.entry
+                        ELSE jsonb_set(v.entry, '{value}', s.entry -> 'value') END AS entry
+            FROM jsonb_array_elements(current.variables) WITH ORDINALITY AS v(entry, position)
+            LEFT JOIN jsonb_array_elements(CAST(:set AS jsonb)) AS s(entry)
+                ON s.entry ->> 'key' = v.entry ->> 'key'
+            WHERE NOT EXISTS (
+                SELECT 1 FROM jsonb_array_elements_text(CAST(:unset AS jsonb)) AS u(key)
+                WHERE u.key = v.entry ->> 'key'
+            )
+            UNION ALL
+            SELECT 1, s.position, s.entry
+            FROM jsonb_array_elements(CAST(:set AS jsonb)) WITH ORDINALITY AS s(entry, position)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM jsonb_array_elements(current.variables) AS v(entry)
+                WHERE v.entry ->> 'key' = s.entry ->> 'key'
+            )
+        ) AS merged
+    )
+    WHERE runs.id = :run_id
+"""
+
+_SQLITE_PATCH = """
+    UPDATE runs SET updated_at = :now, version = runs.version + 1, variables = (
+        WITH current(variables) AS (
+            SELECT CASE WHEN json_type(runs.variables) = 'array' THEN runs.variables
+                        ELSE '[]' END
+        )
+        SELECT coalesce(json_group_array(json(entry)), '[]') FROM (
+            SELECT 0 AS part, v.key AS position,
+                   CASE WHEN s.value IS NULL THEN v.value
+                        ELSE json_set(v.value, '$.value', json(s.value -> '$.value')) END AS entry
+            FROM current, json_each(current.variables) AS v
+            LEFT JOIN json_each(:set) AS s ON s.value ->> '$.key' = v.value ->> '$.key'
+            WHERE NOT EXISTS (
+                SELECT 1 FROM json_each(:unset) AS u WHERE u.value = v.value ->> '$.key'
+            )
+            UNION ALL
+            SELECT 1, s.key, s.value
+            FROM json_each(:set) AS s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM current, json_each(current.variables) AS v
+                WHERE v.value ->> '$.key' = s.value ->> '$.key'
+            )
+            ORDER BY 1, 2
+        )
+    )
+    WHERE runs.id = :run_id
+"""
+
+
+@cache
+def _patch_statement(dialect: str, conditional: bool) -> TextClause:
+    sql = _POSTGRES_PATCH if dialect == "postgresql" else _SQLITE_PATCH
+    if not conditional:
+        return text(sql + " RETURNING runs.version")
+    return text(sql + " AND runs.version IN :versions RETURNING runs.version").bindparams(
+        bindparam("versions", expanding=True)
+    )
+
+
+def patch_variables(
+    db: Session,
+    run_id: int,
+    set_values: Mapping[str, Any],
+    unset: Sequence[str],
+    *,
+    versions: Sequence[int] | None = None,
+) -> int | None:
+    """Set and remove variable keys on one run; its new version, ``None`` if it does not exist.
+
+    Raises :class:`VersionConflict` when ``versions`` is given and none matches.
+    Drops the run's cached document; the caller commits.
+    """
+    stmt = _patch_statement(db.get_bind().dialect.name, versions is not None)
+    parameters = {
+        "run_id": run_id,
+        "set": json.dumps([{"key": key, "value": value} for key, value in set_values.items()]),
+        "unset": json.dumps(list(unset)),
+        "now": datetime.utcnow(),
+    }
+    if versions is not None:
+        parameters["versions"] = list(versions)
+    invalidate(db, [run_id])
+    version = db.execute(stmt, parameters).scalar()
+    if version is not None:
+        return version
+    if versions is not None and db.scalar(select(Run.id).where(Run.id == run_id)) is not None:
+        raise VersionConflict(run_id)
+    return None
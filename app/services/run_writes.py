@@ -0,0 +1,183 @@
+"""Single-statement, version-checked updates of runs and run steps.
+
+``Run.version`` and ``RunStep.version`` count changes (they are the mappers'
+``version_id_col``, so ORM flushes check and bump them too). Each write here is
+one ``UPDATE`` that bumps the version and, given the versions a client sent in
+``If-Match``, only matches a row still at one of them. Concurrent writers
+therefore cannot silently overwrite each other, and no row stays locked past
+the statement. The new version comes back with ``UPDATE ... RETURNING`` (see
+:func:`app.database.update_returning`); a miss is told apart from a conflict
+afterwards.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Integer,
+    Text,
+    case,
+    cast,
+    column,
+    func,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy import values as values_
+from sqlalchemy.orm import Session
+
+from app.database import update_returning
+from app.models import Run, RunStep
+from app.services.run_documents import invalidate
+
+
+class VersionConflict(Exception):
+    """The row exists but is no longer at a version the client expected."""
+
+
+def update_run_fields(
+    db: Session,
+    run_id: int,
+    values: Mapping[str, Any],
+    *,
+    versions: Sequence[int] | None = None,
+) -> int | None:
+    """Apply ``values`` to a run; returns its new version, ``None`` when it does not exist.
+
+    Raises :class:`VersionConflict` when ``versions`` is given and none matches.
+    Drops the run's cached document; the caller commits.
+    """
+    stmt = update(Run).where(Run.id == run_id).values(**values, version=Run.version + 1)
+    if versions is not None:
+        stmt = stmt.where(Run.version.in_(versions))
+    invalidate(db, [run_id])
+    row = update_returning(db, stmt, select(Run.version).where(Run.id == run_id))
+    if row is not None:
+        return row.version
+    if versions is not None and db.scalar(select(Run.id).where(Run.id == run_id)) is not None:
+        raise VersionConflict(run_id)
+    return None
+
+
+def update_run_step_fields(
+    db: Session,
+    run_id: int,
+    run_step_id: int,
+    values: Mapping[str, Any],
+    *,
+    versions: Sequence[int] | None = None,
+) -> int | None:
+    """Apply ``values`` to a step of ``run_id``; its new version, or ``None`` if no such step.
+
+    Marking a step ``done`` without a ``completed_at`` stamps it, unless it
+    already has one. Raises :class:`VersionConflict` like :func:`update_run_fields`.
+    """
+    values = dict(values)
+    if values.get("status") == "done" and not values.get("completed_at"):
+        values["completed_at"] = func.coalesce(RunStep.completed_at, datetime.utcnow())
+    stmt = (
+        update(RunStep)
+        .where(RunStep.id == run_step_id, RunStep.run_id == run_id)
+        .values(**values, version=RunStep.version + 1)
+    )
+    if versions is not None:
+        stmt = stmt.where(RunStep.version.in_(versions))
+    invalidate(db, [run_id])
+    row = update_returning(db, stmt, select(RunStep.version).where(RunStep.id == run_step_id))
+    if row is not None:
+        return row.version
+    if versions is not None:
+        step_run_id = db.scalar(select(RunStep.run_id).where(RunStep.id == run_step_id))
+        if step_run_id == run_id:
+            raise VersionConflict(run_step_id)
+    return None
+
+
+# Changeable step columns and their type in the VALUES list
+_STEP_FIELDS = {"status": Text, "notes": Text, "completed_at": DateTime}
+
+
+def update_run_steps(db: Session, run_id: int, updates: Sequence[Mapping[str, Any]]) -> list[int]:
+    """Apply per-step changes to many steps of ``run_id`` in one statement.
+
+    Each update holds ``run_step_id``, any of ``status``/``notes``/``completed_at``
+    and, optionally, the ``version`` it expects. One query checks that every step
+    belongs to the run; if not, nothing is written and the stray ids are
+    returned. All changes then go into a single ``UPDATE ... FROM (VALUES ...)``
+    with per-row "is set" flags, stamping ``completed_at`` like
+    :func:`update_run_step_fields`. Raises :class:`VersionConflict` when a step
+    is past its expected version; the caller rolls back.
+    """
+    ids = [update["run_step_id"] for update in updates]
+    owned = set(db.scalars(select(RunStep.id).where(RunStep.id.in_(ids), RunStep.run_id == run_id)))
+    stray = [run_step_id for run_step_id in ids if run_step_id not in owned]
+    if stray:
+        return stray
+
+    rows = []
+    for change in updates:
+        stamp = change.get("status") == "done" and not change.get("completed_at")
+        row = [change["run_step_id"], change.get("version"), stamp]
+        for name in _STEP_FIELDS:
+            row += [change.get(name), name in change]
+        rows.append(tuple(row))
+    columns = [("run_step_id", Integer), ("version", Integer), ("stamp", Boolean)]
+    for name, type_ in _STEP_FIELDS.items():
+        columns += [(name, type_), (f"set_{name}", Boolean)]
+    postgres = db.get_bind().dialect.name == "postgresql"
+    if postgres:
+        changes = values_(
+            *(column(name, type_) for name, type_ in columns), name="changes"
+        ).data(rows)
+    else:
+        # SQLite cannot name the columns of a VALUES subquery, and pysqlite would
+        # run a WITH ... UPDATE outside the transaction: select the rows instead
+        selects = [
+            select(
+                *(
+                    literal(v, type_).label(name)
+                    for (name, type_), v in zip(columns, row, strict=True)
+                )
+            )
+            for row in rows
+        ]
+        changes = union_all(*selects).subquery("changes")
+
+    def typed(name: str) -> Any:
+        if postgres:
+            # A VALUES column holding only NULLs is text there
+            return cast(changes.c[name], RunStep.__table__.c[name].type)
+        return changes.c[name]
+
+    def changed(name: str) -> Any:
+        return case((changes.c[f"set_{name}"], typed(name)), else_=getattr(RunStep, name))
+
+    stmt = (
+        update(RunStep)
+        .where(
+            RunStep.id == changes.c.run_step_id,
+            RunStep.run_id == run_id,
+            changes.c.version.is_(None) | (RunStep.version == typed("version")),
+        )
+        .values(
+            status=changed("status"),
+            notes=changed("notes"),
+            completed_at=case(
+                (changes.c.stamp, func.coalesce(RunStep.completed_at, datetime.utcnow())),
+                else_=changed("completed_at"),
+            ),
+            version=RunStep.version + 1,
+        )
+    )
+    invalidate(db, [run_id])
+    updated = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+    if updated < len(ids):
+        raise VersionConflict(run_id)
+    return []
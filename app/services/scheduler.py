@@ -0,0 +1,251 @@
+"""Create runs for recurring templates when they fall due.
+
+Every recurring template has a ``recurring_schedules`` row holding its next due
+time. A :class:`Scheduler` keeps those times in a heap so it can sleep until
+the earliest one. When that time comes it claims the due rows with ``FOR UPDATE
+SKIP LOCKED``. It then bulk-inserts one run, with its steps, for every interval
+that has elapsed since, and advances ``next_due_at``, all in one transaction.
+Intervals missed while no scheduler was running are therefore caught up, and
+never twice, even with several API processes or ``scripts/run_scheduler.py``
+workers polling the same database.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.database import get_sessionmaker
+from app.models import RecurringSchedule, Run, RunStep, Template, TemplateStep
+from app.services.template_versions import current_version_id
+
+logger = logging.getLogger(__name__)
+
+# Matches getIntervalDays() in the UI
+RECURRENCE_INTERVALS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(days=7),
+    "biweekly": timedelta(days=14),
+    "monthly": timedelta(days=30),
+    "quarterly": timedelta(days=90),
+}
+
+
+def _recurring_templates():
+    return select(Template.id).where(
+        Template.is_recurring.is_(True),
+        Template.deleted_at.is_(None),
+        Template.recurrence_interval.in_(RECURRENCE_INTERVALS),
+    )
+
+
+def _insert_ignoring_conflicts(db: Session, model, rows: list[dict[str, Any]]) -> None:
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    db.execute(dialect.insert(model).on_conflict_do_nothing(), rows)
+
+
+def sync_schedules(db: Session) -> None:
+    """Add schedules for newly recurring templates and drop stale ones; caller commits.
+
+    A new schedule is first due one interval after the template's latest run,
+    or after the template was created if it has none.
+    """
+    db.execute(
+        delete(RecurringSchedule).where(RecurringSchedule.template_id.not_in(_recurring_templates())),
+        execution_options={"synchronize_session": False},
+    )
+    # Correlated, so only templates without a schedule look up their latest run,
+    # each through idx_runs_template_status, instead of aggregating all runs per tick
+    latest_run = (
+        select(func.max(Run.created_at))
+        .where(Run.template_id == Template.id)
+        .correlate(Template)
+        .scalar_subquery()
+    )
+    missing = db.execute(
+        select(Template.id, Template.recurrence_interval, Template.created_at, latest_run)
+        .where(
+            Template.id.in_(_recurring_templates()),
+            Template.id.not_in(select(RecurringSchedule.template_id)),
+        )
+    ).all()
+    if missing:
+        _insert_ignoring_conflicts(
+            db,
+            RecurringSchedule,
+            [
+                {
+                    "template_id": template_id,
+                    "next_due_at": (last_run or created_at) + RECURRENCE_INTERVALS[interval],
+                }
+                for template_id, interval, created_at, last_run in missing
+            ],
+        )
+
+
+def materialize_due_runs(
+    db: Session,
+    now: datetime,
+    *,
+    batch_size: int,
+    max_catch_up: int,
+    template_ids: list[int] | None = None,
+) -> int:
+    """Create runs for every schedule due at ``now``; returns runs created.
+
+    Claims up to ``batch_size`` schedules per transaction and commits each
+    batch. At most ``max_catch_up`` of the most recent missed intervals are
+    created per template; older ones are skipped.
+    """
+    created = 0
+    while True:
+        stmt = (
+            select(RecurringSchedule, Template)
+            .join(Template, Template.id == RecurringSchedule.template_id)
+            .where(RecurringSchedule.next_due_at <= now, Template.id.in_(_recurring_templates()))
+            .order_by(RecurringSchedule.next_due_at)
+            .limit(batch_size)
+            .with_for_update(of=RecurringSchedule, skip_locked=True)
+        )
+        if template_ids is not None:
+            stmt = stmt.where(RecurringSchedule.template_id.in_(template_ids))
+        claimed = db.execute(stmt).all()
+        if not claimed:
+            return created
+
+        steps: dict[int, list[tuple[int, int]]] = {}
+        for template_id, step_id, order_index in db.execute(
+            select(TemplateStep.template_id, TemplateStep.id, TemplateStep.order_index)
+            .where(TemplateStep.template_id.in_([template.id for _, template in claimed]))
+            .order_by(TemplateStep.template_id, TemplateStep.order_index)
+        ):
+            steps.setdefault(template_id, []).append((step_id, order_index))
+
+        run_rows = []
+        for schedule, template in claimed:
+            version_id = current_version_id(db, template)
+            interval = RECURRENCE_INTERVALS[template.recurrence_interval]
+            due_times = []
+            due = schedule.next_due_at
+            while due <= now:
+                due_times.append(due)
+                due += interval
+            if len(due_times) > max_catch_up:
+                logger.warning(
+                    "Skipping %d missed runs of template %d",
+                    len(due_times) - max_catch_up,
+                    template.id,
+                )
+                due_times = due_times[-max_catch_up:]
+            run_rows.extend(
+                {
+                    "template_id": template.id,
+                    "name": f"{template.name} ({due_at:%Y-%m-%d})",
+                    "variables": template.variables,
+                    "scheduled_for": due_at,
+                    "template_version_id": version_id,
+                }
+                for due_at in due_times
+            )
+            schedule.next_due_at = due
+            schedule.last_run_at = due_times[-1]
+
+        run_ids = db.scalars(
+            insert(Run).returning(Run.id, sort_by_parameter_order=True), run_rows
+        ).all()
+        step_rows = [
+            {"run_id": run_id, "template_step_id": step_id, "order_index": order_index}
+            for run_id, row in zip(run_ids, run_rows, strict=True)
+            for step_id, order_index in steps.get(row["template_id"], [])
+        ]
+        if step_rows:
+            db.execute(insert(RunStep), step_rows)
+        db.commit()
+        db.expunge_all()
+        created += len(run_ids)
+
+
+class Scheduler:
+    """Heap of ``(next_due_at, template_id)``, refreshed from the database each tick."""
+
+    def __init__(self, *, batch_size: int, max_catch_up: int) -> None:
+        self.batch_size = batch_size
+        self.max_catch_up = max_catch_up
+        self._heap: list[tuple[datetime, int]] = []
+
+    def reload(self, db: Session) -> None:
+        self._heap = [
+            (next_due_at, template_id)
+            for template_id, next_due_at in db.execute(
+                select(RecurringSchedule.template_id, RecurringSchedule.next_due_at)
+            )
+        ]
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def seconds_until_due(self, now: datetime, poll_seconds: float) -> float:
+        """Sleep until the earliest due time, but no longer than ``poll_seconds``."""
+        if not self._heap:
+            return poll_seconds
+        # At least a second: a schedule another worker holds stays due until it commits
+        return max(1.0, min(poll_seconds, (self._heap[0][0] - now).total_seconds()))
+
+    def tick(self, db: Session, now: datetime | None = None) -> int:
+        """Sync schedules, create due runs and reload the heap; returns runs created."""
+        now = now or datetime.utcnow()
+        sync_schedules(db)
+        db.commit()
+        self.reload(db)
+        created = 0
+        due = self.pop_due(now)
+        if due:
+            created = materialize_due_runs(
+                db,
+                now,
+                batch_size=self.batch_size,
+                max_catch_up=self.max_catch_up,
+                template_ids=due,
+            )
+            self.reload(db)
+        db.commit()
+        return created
+
+
+def scheduler_from_settings() -> Scheduler:
+    settings = get_settings()
+    return Scheduler(
+        batch_size=settings.scheduler_batch_size, max_catch_up=settings.scheduler_max_catch_up
+    )
+
+
+async def schedule_periodically(poll_seconds: int) -> None:
+    """Create due recurring runs until cancelled, waking at the next due time."""
+    scheduler = scheduler_from_settings()
+
+    def tick() -> int:
+        with get_sessionmaker()() as db:
+            return scheduler.tick(db)
+
+    while True:
+        try:
+            created = await run_in_threadpool(tick)
+        except Exception:
+            logger.exception("Recurring run scheduler pass failed")
+        else:
+            if created:
+                logger.info("Created %d recurring runs", created)
+        await asyncio.sleep(scheduler.seconds_until_due(datetime.utcnow(), poll_seconds))
@@ -0,0 +1,104 @@
+"""Ranked full-text search over templates (with their steps) and runs."""
+
+from __future__ import annotations
+
+import re
+
+from sqlalchemy import Select, column, func, literal, literal_column, or_, select, table, union_all
+from sqlalchemy.orm import Session
+
+from app.models import Run, Template
+from app.models.search import TS_CONFIG
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# SQLite FTS5 table maintained by triggers (see app.models.search)
+search_index = table("search_index", column("kind"), column("ref_id"), column("title"))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _deleted_templates() -> Select:
+    # Soft-deleted templates and their runs are hidden until the purge job removes them
+    return select(Template.id).where(Template.deleted_at.is_not(None))
+
+
+def _postgres_hits(q: str, kind: str | None) -> Select:
+    tsquery = func.websearch_to_tsquery(TS_CONFIG, q)
+    vector = literal_column("templates.search_vector")
+    templates = select(
+        literal("template").label("kind"),
+        Template.id.label("id"),
+        Template.name.label("title"),
+        func.ts_rank(vector, tsquery).label("rank"),
+    ).where(vector.op("@@")(tsquery), Template.deleted_at.is_(None))
+    # ILIKE '%q%' is served by the pg_trgm GIN index on runs.name
+    runs = select(
+        literal("run").label("kind"),
+        Run.id.label("id"),
+        Run.name.label("title"),
+        func.similarity(Run.name, q).label("rank"),
+    ).where(
+        Run.name.ilike(f"%{_escape_like(q)}%", escape="\\"),
+        Run.template_id.not_in(_deleted_templates()),
+    )
+
+    parts = [
+        part for name, part in (("template", templates), ("run", runs)) if kind in (None, name)
+    ]
+    return union_all(*parts) if len(parts) > 1 else parts[0]
+
+
+def _sqlite_hits(q: str, kind: str | None) -> Select | None:
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    # Quote each token so user input cannot use FTS5 query syntax; match prefixes.
+    match = " ".join(f'"{token}"*' for token in tokens)
+    # FTS5 takes the table itself as the MATCH target and bm25() argument
+    fts_table = literal_column("search_index")
+    stmt = select(
+        search_index.c.kind,
+        search_index.c.ref_id.label("id"),
+        search_index.c.title,
+        # bm25() is lower-is-better; weight title matches over body matches
+        (-func.bm25(fts_table, 0.0, 0.0, 10.0, 1.0)).label("rank"),
+    ).where(fts_table.op("MATCH")(match))
+    if kind is not None:
+        stmt = stmt.where(search_index.c.kind == kind)
+    # Deleted templates and their runs keep their index rows until the purge job runs
+    if kind in (None, "template"):
+        stmt = stmt.where(
+            or_(
+                search_index.c.kind != "template",
+                search_index.c.ref_id.not_in(_deleted_templates()),
+            )
+        )
+    if kind in (None, "run"):
+        hidden = select(Run.id).where(Run.template_id.in_(_deleted_templates()))
+        stmt = stmt.where(or_(search_index.c.kind != "run", search_index.c.ref_id.not_in(hidden)))
+    return stmt
+
+
+def search(
+    db: Session, q: str, *, limit: int, offset: int, kind: str | None = None
+) -> tuple[int, list]:
+    """Return ``(total, rows)``; rows carry ``kind``, ``id``, ``title`` and ``rank``."""
+    if db.get_bind().dialect.name == "postgresql":
+        hits = _postgres_hits(q, kind)
+    else:
+        hits = _sqlite_hits(q, kind)
+    if hits is None:
+        return 0, []
+
+    hits = hits.subquery("hits")
+    total = db.scalar(select(func.count()).select_from(hits))
+    rows = db.execute(
+        select(hits)
+        .order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    return total, rows
@@ -0,0 +1,50 @@
+"""Remove a deleted template and everything created from it, in chunks.
+
+``DELETE /templates/{id}`` only sets ``templates.deleted_at``; this job then
+deletes the template's runs (and archived runs) one committed chunk at a time,
+and finally the template row, whose steps and field definitions go with it
+through ``ON DELETE CASCADE``. Nothing is loaded into the session beyond ids.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Job, Run, RunArchive, Template
+from app.services.run_bulk import delete_runs, iter_run_id_chunks
+
+
+def purge_template(db: Session, job: Job) -> None:
+    template_id = job.payload["template_id"]
+    chunk_size = get_settings().bulk_chunk_size
+
+    # A retry starts over counting what is left
+    job.progress = 0
+    job.total = db.scalar(select(func.count()).where(Run.template_id == template_id)) + db.scalar(
+        select(func.count()).where(RunArchive.template_id == template_id)
+    )
+    db.commit()
+
+    # Progress is committed with each chunk, so it always matches what is gone.
+    for run_ids in iter_run_id_chunks(db, [Run.template_id == template_id], chunk_size):
+        job.progress += delete_runs(db, run_ids)
+        db.commit()
+
+    while True:
+        archived_ids = db.scalars(
+            select(RunArchive.run_id)
+            .where(RunArchive.template_id == template_id)
+            .order_by(RunArchive.run_id)
+            .limit(chunk_size)
+        ).all()
+        if not archived_ids:
+            break
+        job.progress += db.execute(
+            delete(RunArchive).where(RunArchive.run_id.in_(archived_ids))
+        ).rowcount
+        db.commit()
+
+    db.execute(delete(Template).where(Template.id == template_id))
+    db.commit()
@@ -0,0 +1,95 @@
+"""Snapshot templates into immutable, content-addressed ``template_versions``.
+
+Every endpoint that changes a template's steps or field definitions calls
+:func:`snapshot_template` before committing, and new runs record the
+template's ``current_version_id``; run detail then renders steps from that one
+document (see :mod:`app.services.run_loader`), so later edits to the template
+no longer change what existing runs show.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from app.models import Template, TemplateStep, TemplateVersion
+from app.schemas.templates import TemplateStepRead
+
+_TIMESTAMPS = ("created_at", "updated_at")
+
+
+def build_document(db: Session, template_id: int) -> dict[str, Any]:
+    steps = db.scalars(
+        select(TemplateStep)
+        .options(selectinload(TemplateStep.field_defs))
+        .where(TemplateStep.template_id == template_id)
+        .order_by(TemplateStep.order_index)
+        .execution_options(populate_existing=True)
+    ).all()
+    return {
+        "steps": [TemplateStepRead.model_validate(step).model_dump(mode="json") for step in steps]
+    }
+
+
+def _without_timestamps(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_timestamps(v) for k, v in value.items() if k not in _TIMESTAMPS}
+    if isinstance(value, list):
+        return [_without_timestamps(item) for item in value]
+    return value
+
+
+def content_hash(document: dict[str, Any]) -> str:
+    """SHA-256 of the canonical JSON of ``document``, ignoring timestamps."""
+    canonical = json.dumps(_without_timestamps(document), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def snapshot_template(db: Session, template_id: int) -> int:
+    """Point the template at a version matching its current steps; returns the version id.
+
+    Reuses an existing version with the same content hash. Flushes pending
+    changes first; the caller commits.
+    """
+    db.flush()
+    document = build_document(db, template_id)
+    digest = content_hash(document)
+    version_id = db.scalar(
+        select(TemplateVersion.id).where(
+            TemplateVersion.template_id == template_id, TemplateVersion.content_hash == digest
+        )
+    )
+    if version_id is None:
+        version = TemplateVersion(template_id=template_id, content_hash=digest, document=document)
+        try:
+            with db.begin_nested():
+                db.add(version)
+        except IntegrityError:
+            # A concurrent request stored the same content first
+            version_id = db.scalar(
+                select(TemplateVersion.id).where(
+                    TemplateVersion.template_id == template_id,
+                    TemplateVersion.content_hash == digest,
+                )
+            )
+        else:
+            version_id = version.id
+    db.execute(
+        update(Template)
+        .where(Template.id == template_id, Template.current_version_id.is_distinct_from(version_id))
+        .values(current_version_id=version_id),
+        execution_options={"synchronize_session": "fetch"},
+    )
+    return version_id
+
+
+def current_version_id(db: Session, template: Template) -> int:
+    """The template's current version, snapshotting templates that predate versioning."""
+    if template.current_version_id is None:
+        return snapshot_template(db, template.id)
+    return template.current_version_id
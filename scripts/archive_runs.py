@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Move runs finished more than N days ago into run_archives.
+
+Usage:
+    python scripts/archive_runs.py [--older-than-days 90] [--batch-size 500]
+
+Defaults come from ARCHIVE_AFTER_DAYS / ARCHIVE_BATCH_SIZE. Safe to run from
+cron alongside the API and alongside other archivers: each chunk is its own
+transaction and claims rows with SKIP LOCKED on Postgres.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import get_settings  # noqa: E402
+from app.database import dispose_engine, get_sessionmaker  # noqa: E402
+from app.services.archive import archive_finished_runs  # noqa: E402
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    args = parser.parse_args()
+
+    try:
+        with get_sessionmaker()() as db:
+            archived = archive_finished_runs(
+                db, older_than_days=args.older_than_days, batch_size=args.batch_size
+            )
+    finally:
+        dispose_engine()
+    print(f"Archived {archived} runs finished more than {args.older_than_days} days ago")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Compare JSON and MessagePack payload size and encode/decode time for template lists.
+
+Builds an in-memory ``list[TemplateRead]`` (no database) and times:
+
+* ``json``: what ``GET /templates`` serves by default (pydantic-core ``dump_json``);
+* ``msgpack (served)``: ``dump_json`` re-encoded by :mod:`app.api.negotiation`;
+* ``msgpack (direct)``: ``msgpack.packb`` of ``dump_python(mode="json")``, for reference.
+
+Sizes are reported raw and gzip-compressed, since most clients receive the latter.
+
+Usage:
+    python scripts/bench_msgpack.py [--templates 500] [--steps 10] [--fields 3] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import gzip
+import json
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import msgpack  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.api.negotiation import json_to_msgpack  # noqa: E402
+from app.schemas.templates import TemplateRead  # noqa: E402
+
+
+def _templates(count: int, steps: int, fields: int) -> list[TemplateRead]:
+    now = datetime(2026, 10, 19, 9, 30)
+    templates = []
+    for t in range(1, count + 1):
+        stamp = now - timedelta(minutes=t)
+        templates.append(
+            TemplateRead.model_validate(
+                {
+                    "id": t,
+                    "name": f"Month-end close {t}",
+                    "description": "Reconcile accounts and file the reports",
+                    "variables": [{"key": "client", "label": "Client", "type": "text"}],
+                    "icon": "📋",
+                    "isRecurring": t % 2 == 0,
+                    "recurrenceInterval": "monthly" if t % 2 == 0 else None,
+                    "created_at": stamp,
+                    "updated_at": stamp,
+                    "steps": [
+                        {
+                            "id": t * 100 + s,
+                            "template_id": t,
+                            "title": f"Step {s}",
+                            "description": None,
+                            "is_required": True,
+                            "order_index": s,
+                            "created_at": stamp,
+                            "updated_at": stamp,
+                            "field_defs": [
+                                {
+                                    "id": (t * 100 + s) * 10 + f,
+                                    "template_step_id": t * 100 + s,
+                                    "name": f"field_{f}",
+                                    "label": f"Field {f}",
+                                    "type": "text",
+                                    "required": False,
+                                    "order_index": f,
+                                    "created_at": stamp,
+                                    "updated_at": stamp,
+                                }
+                                for f in range(1, fields + 1)
+                            ],
+                        }
+                        for s in range(1, steps + 1)
+                    ],
+                }
+            )
+        )
+    return templates
+
+
+def _median_ms(fn: Callable[[], object], repeat: int) -> float:
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--templates", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--fields", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(list[TemplateRead])
+    templates = _templates(args.templates, args.steps, args.fields)
+    as_json = adapter.dump_json(templates, by_alias=True)
+
+    encoders: dict[str, Callable[[], bytes]] = {
+        "json": lambda: adapter.dump_json(templates, by_alias=True),
+        "msgpack (served)": lambda: json_to_msgpack(adapter.dump_json(templates, by_alias=True)),
+        "msgpack (direct)": lambda: msgpack.packb(
+            adapter.dump_python(templates, mode="json", by_alias=True)
+        ),
+    }
+    decoders: dict[str, Callable[[bytes], object]] = {
+        "json": json.loads,
+        "msgpack (served)": msgpack.unpackb,
+        "msgpack (direct)": msgpack.unpackb,
+    }
+
+    print(
+        f"{args.templates} templates x {args.steps} steps x {args.fields} fields, "
+        f"median of {args.repeat}"
+    )
+    print(f"{'format':<18} {'bytes':>10} {'gzip':>10} {'encode ms':>10} {'decode ms':>10}")
+    for name, encode in encoders.items():
+        body = encode()
+        assert decoders[name](body) == json.loads(as_json)
+        encode_ms = _median_ms(encode, args.repeat)
+        decode_ms = _median_ms(functools.partial(decoders[name], body), args.repeat)
+        print(
+            f"{name:<18} {len(body):>10} {len(gzip.compress(body)):>10} "
+            f"{encode_ms:>10.2f} {decode_ms:>10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
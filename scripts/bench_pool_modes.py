@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Compare connection pooling modes under concurrent load.
+
+Runs the same short transaction (a primary-key lookup on ``templates``) from many
+threads against ``DATABASE_URL`` once per mode and reports throughput and
+latency percentiles. Point ``DATABASE_URL`` at PgBouncer to measure the
+``transaction`` mode the way it runs in production.
+
+Usage:
+    DATABASE_URL=postgresql+psycopg://... python scripts/bench_pool_modes.py \\
+        [--threads 32] [--requests 2000] [--modes session,transaction]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.database import build_engine  # noqa: E402
+
+QUERY = text("SELECT id, name FROM templates WHERE id = :id")
+
+
+def _bench(mode: str, threads: int, requests: int) -> None:
+    settings = get_settings().model_copy(update={"db_pooling_mode": mode})
+    engine = build_engine(settings)
+
+    def one(i: int) -> float:
+        start = time.perf_counter()
+        with engine.connect() as connection:
+            connection.execute(QUERY, {"id": i % 100 + 1}).all()
+            connection.commit()
+        return time.perf_counter() - start
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(threads)))  # warm-up
+            start = time.perf_counter()
+            latencies = sorted(pool.map(one, range(requests)))
+            elapsed = time.perf_counter() - start
+    finally:
+        engine.dispose()
+
+    def p(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    print(
+        f"{mode:<12} {requests / elapsed:9.0f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+        f"p95 {p(0.95):7.2f} ms   p99 {p(0.99):7.2f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--modes", default="session,transaction")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.requests} transactions per mode")
+    for mode in args.modes.split(","):
+        _bench(mode.strip(), args.threads, args.requests)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
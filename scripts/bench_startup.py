@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Measure import time of ``app.main`` and cold first-request latency.
+
+Each sample runs in a fresh interpreter so module caches do not hide the cost.
+The first-request sample points the app at a throwaway SQLite database.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--import-budget-ms 800]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import app.main
+print((time.perf_counter() - start) * 1000)
+"""
+
+FIRST_REQUEST_SNIPPET = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.database import Base, get_engine
+import app.models
+from app.main import create_app
+Base.metadata.create_all(get_engine())
+imported = time.perf_counter()
+with TestClient(create_app()) as client:
+    ready = time.perf_counter()
+    response = client.get("/api/v1/templates")
+    done = time.perf_counter()
+assert response.status_code == 200, response.text
+import json
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (done - ready) * 1000,
+}))
+"""
+
+
+def _run(snippet: str, env: dict[str, str]) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip().splitlines()[-1]
+
+
+def _summary(label: str, samples: list[float]) -> None:
+    print(
+        f"{label:<22} median {statistics.median(samples):8.1f} ms"
+        f"   min {min(samples):8.1f} ms   max {max(samples):8.1f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    import_samples = [float(_run(IMPORT_SNIPPET, env)) for _ in range(args.runs)]
+
+    db_path = ROOT / ".bench_startup.sqlite3"
+    env["DATABASE_URL"] = f"sqlite+pysqlite:///{db_path}"
+    cold: dict[str, list[float]] = {"import_ms": [], "startup_ms": [], "first_request_ms": []}
+    try:
+        for _ in range(args.runs):
+            db_path.unlink(missing_ok=True)
+            for key, value in json.loads(_run(FIRST_REQUEST_SNIPPET, env)).items():
+                cold[key].append(value)
+    finally:
+        db_path.unlink(missing_ok=True)
+
+    _summary("import app.main", import_samples)
+    _summary("cold app import", cold["import_ms"])
+    _summary("lifespan startup", cold["startup_ms"])
+    _summary("first request", cold["first_request_ms"])
+
+    budget = args.import_budget_ms
+    if budget is not None and statistics.median(import_samples) > budget:
+        print(f"import time exceeds budget of {budget:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
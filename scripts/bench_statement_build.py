@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Microbenchmark per-call Python overhead of the hot lookup statements.
+
+Compares building ``select(...).options(selectinload(...))`` on every call with
+reusing the module-level statements, both for construction plus cache-key
+generation (what SQLAlchemy does before each compile-cache lookup) and for a
+full ``load_run_detail`` against an in-memory SQLite database.
+
+Usage:
+    python scripts/bench_statement_build.py [--number 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.orm import Session, selectinload  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Run, RunStep, Template, TemplateStep  # noqa: E402
+from app.services.run_loader import RUN_DETAIL_STMT, load_run_detail  # noqa: E402
+
+
+def _inline_run_detail(run_id: int):
+    return (
+        select(Run)
+        .options(
+            selectinload(Run.template),
+            selectinload(Run.steps)
+            .selectinload(RunStep.template_step)
+            .selectinload(TemplateStep.field_defs),
+            selectinload(Run.steps).selectinload(RunStep.field_values),
+        )
+        .where(Run.id == run_id)
+    )
+
+
+def _report(label: str, seconds: float, number: int) -> None:
+    print(f"{label:<40} {seconds / number * 1e6:9.2f} us/call")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.number
+
+    _report("inline build", timeit.timeit(lambda: _inline_run_detail(1), number=n), n)
+    _report(
+        "inline build + cache key",
+        timeit.timeit(lambda: _inline_run_detail(1)._generate_cache_key(), number=n),
+        n,
+    )
+    _report(
+        "prebuilt cache key",
+        timeit.timeit(lambda: RUN_DETAIL_STMT._generate_cache_key(), number=n),
+        n,
+    )
+
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        template = Template(name="bench", steps=[TemplateStep(order_index=1, title="s")])
+        db.add(template)
+        db.flush()
+        db.add(Run(template_id=template.id, name="r", steps=[
+            RunStep(template_step_id=template.steps[0].id, order_index=1)
+        ]))
+        db.commit()
+
+        def inline_load():
+            db.execute(_inline_run_detail(1)).unique().scalars().first()
+            db.expunge_all()
+
+        def prebuilt_load():
+            load_run_detail(db, 1)
+            db.expunge_all()
+
+        queries = max(n // 20, 1)
+        for label, load in (("inline", inline_load), ("prebuilt", prebuilt_load)):
+            _report(
+                f"load_run_detail ({label} statement)",
+                timeit.timeit(load, number=queries),
+                queries,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Maintain monthly partitions of runs and run_steps (Postgres).
+
+Usage:
+    python scripts/partition_runs.py convert
+    python scripts/partition_runs.py maintain [--months-ahead 3] [--retention-months 24]
+                                              [--drop] [--force]
+
+``convert`` rebuilds the tables as partitioned parents (take a maintenance
+window). ``maintain`` creates upcoming month partitions and detaches partitions
+older than the retention window; run it from cron, e.g. daily. Defaults come
+from PARTITION_MONTHS_AHEAD / PARTITION_RETENTION_MONTHS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import get_settings  # noqa: E402
+from app.database import dispose_engine, get_engine  # noqa: E402
+from app.services.partitions import (  # noqa: E402
+    add_months,
+    convert_to_partitioned,
+    detach_partitions_before,
+    ensure_future_partitions,
+    is_partitioned,
+    month_start,
+)
+
+
+def main() -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("convert")
+    maintain = commands.add_parser("maintain")
+    maintain.add_argument("--months-ahead", type=int, default=settings.partition_months_ahead)
+    maintain.add_argument(
+        "--retention-months", type=int, default=settings.partition_retention_months
+    )
+    maintain.add_argument("--drop", action="store_true", help="drop detached partitions")
+    maintain.add_argument("--force", action="store_true", help="detach non-empty partitions too")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        print("Partitioning is only supported on Postgres", file=sys.stderr)
+        return 1
+
+    try:
+        with engine.begin() as connection:
+            if args.command == "convert":
+                converted = convert_to_partitioned(
+                    connection, months_ahead=settings.partition_months_ahead
+                )
+                print(
+                    "Converted runs/run_steps to partitioned tables"
+                    if converted
+                    else "Already partitioned"
+                )
+                return 0
+
+            if not is_partitioned(connection, "runs"):
+                print("runs is not partitioned; run `convert` first", file=sys.stderr)
+                return 1
+            for name in ensure_future_partitions(connection, months_ahead=args.months_ahead):
+                print(f"created {name}")
+            if args.retention_months > 0:
+                cutoff = add_months(month_start(datetime.utcnow().date()), -args.retention_months)
+                for name in detach_partitions_before(
+                    connection, cutoff, drop=args.drop, force=args.force
+                ):
+                    print(f"{'dropped' if args.drop else 'detached'} {name}")
+    finally:
+        dispose_engine()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Run queued background jobs (template purges, async bulk run changes).
+
+Usage:
+    python scripts/run_jobs.py [--once] [--poll-seconds 5]
+
+Jobs are attempted once by the API right after they are queued; workers pick
+up retries and jobs left behind by a restarted API. Run as many as needed:
+each job is claimed with SKIP LOCKED on Postgres and a conditional UPDATE.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import dispose_engine  # noqa: E402
+from app.services.jobs import work_pending, worker_id  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="run due jobs and exit")
+    parser.add_argument("--poll-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    worker = worker_id()
+    try:
+        while True:
+            done = work_pending(worker)
+            if done:
+                print(f"{worker} ran {done} jobs", flush=True)
+            if args.once:
+                return 0
+            time.sleep(args.poll_seconds)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        dispose_engine()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Create due runs for recurring templates, as a standalone worker.
+
+Usage:
+    python scripts/run_scheduler.py [--once] [--poll-seconds 60]
+
+Use this instead of (or next to) SCHEDULER_INTERVAL_SECONDS in the API
+process. Any number of workers can run: schedules are claimed with SKIP LOCKED
+on Postgres, so each due interval becomes exactly one run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import dispose_engine, get_sessionmaker  # noqa: E402
+from app.services.scheduler import scheduler_from_settings  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="run one pass and exit")
+    parser.add_argument("--poll-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    scheduler = scheduler_from_settings()
+    try:
+        while True:
+            with get_sessionmaker()() as db:
+                created = scheduler.tick(db)
+            print(
+                f"{datetime.utcnow():%Y-%m-%dT%H:%M:%S} created {created} recurring runs",
+                flush=True,
+            )
+            if args.once:
+                return 0
+            time.sleep(scheduler.seconds_until_due(datetime.utcnow(), args.poll_seconds))
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        dispose_engine()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
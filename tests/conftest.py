@@ -1,14 +1,28 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+
 import pytest
+from fastapi import Request
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.default import CACHE_HIT
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.api.deps import db_session
-from app.database import Base
+from app.api.transactions import shared_transaction
+from app.database import Base, configure_engine
 from app.main import create_app
+from app.services.run_documents import get_document_cache
+
+
+@pytest.fixture(autouse=True)
+def _reset_document_cache():
+    # Run ids restart with every test database
+    get_document_cache.cache_clear()
+    yield
+    get_document_cache.cache_clear()
 
 
 @pytest.fixture(name="session")
@@ -20,19 +34,23 @@ def session_fixture():
     )
     TestingSessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
     Base.metadata.create_all(bind=engine)
+    configure_engine(engine)
     
     db = TestingSessionLocal()
     try:
         yield db
     finally:
         db.close()
+        configure_engine(None)
         Base.metadata.drop_all(bind=engine)
 
 
 @pytest.fixture(name="client")
 def client_fixture(session: Session):
-    def override_session():
-        yield session
+    def override_session(request: Request):
+        # Routes inside POST /batch or an idempotent POST use the owner's transaction
+        transaction = shared_transaction(request)
+        yield session if transaction is None else transaction.session
 
     app = create_app()
     app.dependency_overrides[db_session] = override_session
@@ -42,3 +60,32 @@ def client_fixture(session: Session):
     
     app.dependency_overrides.clear()
 
+
+class ExecutedStatements(list[str]):
+    """SQL executed while capturing, whitespace collapsed, with compile-cache hits."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.cache_hits: list[bool] = []
+
+
+@pytest.fixture(name="statements")
+def statements_fixture(session: Session):
+    """``with statements() as executed:`` records what the session's engine executes."""
+
+    @contextmanager
+    def capture():
+        executed = ExecutedStatements()
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            executed.append(" ".join(statement.split()))
+            executed.cache_hits.append(context.cache_hit is CACHE_HIT)
+
+        engine = session.get_bind()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield executed
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    return capture
@@ -0,0 +1,236 @@
+"""
+INTEGRATION TESTS - Query plans for hot paths
+
+Seeds a large dataset, captures every statement the hot read paths and
+foreign-key cascades issue, EXPLAINs each one and fails on sequential scans
+that are not explicitly expected.
+
+Runs against a temporary SQLite file by default; set PLAN_CHECK_DATABASE_URL
+to an empty Postgres database to check real Postgres plans.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine, delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.api.v1.templates import TEMPLATE_DETAIL_STMT
+from app.database import Base
+from app.models import (
+    Run,
+    RunStep,
+    StepFieldDef,
+    StepFieldValue,
+    SyncChange,
+    Template,
+    TemplateStep,
+)
+from app.services.run_loader import get_run_detail, load_run_detail, load_runs
+from app.services.run_writes import VersionConflict, update_run_step_fields
+from app.services.sync import changes_since, format_token
+
+TEMPLATES = 50
+STEPS_PER_TEMPLATE = 10
+RUNS_PER_TEMPLATE = 40
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    url = os.getenv("PLAN_CHECK_DATABASE_URL") or (
+        f"sqlite+pysqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    )
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    _seed(engine)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def _seed(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Template),
+            [{"id": t, "name": f"Template {t}"} for t in range(1, TEMPLATES + 1)],
+        )
+        steps = [
+            {
+                "id": (t - 1) * STEPS_PER_TEMPLATE + i,
+                "template_id": t,
+                "order_index": i,
+                "title": f"Step {i}",
+            }
+            for t in range(1, TEMPLATES + 1)
+            for i in range(1, STEPS_PER_TEMPLATE + 1)
+        ]
+        conn.execute(insert(TemplateStep), steps)
+        conn.execute(
+            insert(StepFieldDef),
+            [
+                {
+                    "id": s["id"],
+                    "template_step_id": s["id"],
+                    "name": "f",
+                    "label": "F",
+                    "type": "text",
+                }
+                for s in steps
+            ],
+        )
+        runs = [
+            {
+                "id": (t - 1) * RUNS_PER_TEMPLATE + r,
+                "template_id": t,
+                "name": f"Run {t}-{r}",
+                "status": ("not_started", "in_progress", "done")[r % 3],
+            }
+            for t in range(1, TEMPLATES + 1)
+            for r in range(1, RUNS_PER_TEMPLATE + 1)
+        ]
+        conn.execute(insert(Run), runs)
+        run_steps = [
+            {
+                "id": (run["id"] - 1) * STEPS_PER_TEMPLATE + i,
+                "run_id": run["id"],
+                "template_step_id": (run["template_id"] - 1) * STEPS_PER_TEMPLATE + i,
+                "order_index": i,
+            }
+            for run in runs
+            for i in range(1, STEPS_PER_TEMPLATE + 1)
+        ]
+        conn.execute(insert(RunStep), run_steps)
+        conn.execute(
+            insert(StepFieldValue),
+            [
+                {"run_step_id": rs["id"], "field_def_id": rs["template_step_id"], "value": "x"}
+                for rs in run_steps
+            ],
+        )
+        conn.execute(text("ANALYZE"))
+
+
+@contextmanager
+def _captured(engine):
+    statements: list[tuple[str, object]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _seq_scans(engine, statement: str, parameters) -> set[str]:
+    """Tables read with a full sequential scan in the plan of ``statement``."""
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        if engine.dialect.name == "postgresql":
+            # Small seeded tables are legitimately cheaper to scan; with seq scans
+            # discouraged, one still appears only when no index can serve the query.
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            found: set[str] = set()
+            nodes = [plan[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                if node["Node Type"] == "Seq Scan":
+                    found.add(node["Relation Name"])
+                nodes.extend(node.get("Plans", []))
+            return found
+
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return {
+            match.group(1)
+            for row in cursor.fetchall()
+            if (match := _SQLITE_SCAN.match(row[-1]))
+        }
+
+
+def _run_detail(db: Session) -> None:
+    load_run_detail(db, 1234)
+
+
+def _run_detail_document(db: Session) -> None:
+    # Seeded runs have no template version, so this also covers the live fallback
+    get_run_detail(db, 1234)
+
+
+def _template_detail(db: Session) -> None:
+    db.execute(TEMPLATE_DETAIL_STMT, {"template_id": 17}).unique().scalars().first()
+
+
+def _run_step_update(db: Session) -> None:
+    # Step 4321 belongs to run 433; a stale If-Match also checks the miss lookup
+    update_run_step_fields(db, 433, 4321, {"status": "done"})
+    with pytest.raises(VersionConflict):
+        update_run_step_fields(db, 433, 4321, {"notes": "late"}, versions=[1])
+
+
+def _runs_for_template(db: Session) -> None:
+    load_runs(db, Run.template_id == 17)
+
+
+def _runs_for_template_and_status(db: Session) -> None:
+    load_runs(db, Run.template_id == 17, Run.status == "done")
+
+
+def _template_step_fk_lookup(db: Session) -> None:
+    # What deleting a template step costs: finding run steps that reference it
+    db.execute(select(RunStep.id).where(RunStep.template_step_id == 123)).all()
+
+
+def _field_def_cascade(db: Session) -> None:
+    # The ON DELETE CASCADE from step_field_defs to step_field_values
+    db.execute(delete(StepFieldValue).where(StepFieldValue.field_def_id == 123))
+
+
+def _sync_pages(db: Session) -> None:
+    # The seed's triggers filled the change log; a client a few hundred changes behind
+    xid = db.scalar(select(func.max(SyncChange.xid)))
+    seq = db.scalar(select(func.max(SyncChange.seq)).where(SyncChange.xid == xid))
+    page = changes_since(db, format_token((xid, seq - 300)), limit=200)
+    changes_since(db, page.next, limit=200)
+
+
+HOT_PATHS = {
+    "run detail": (_run_detail, set()),
+    "run detail document": (_run_detail_document, set()),
+    "template detail": (_template_detail, set()),
+    "run step update": (_run_step_update, set()),
+    "runs for template": (_runs_for_template, set()),
+    "runs for template and status": (_runs_for_template_and_status, set()),
+    "template step FK lookup": (_template_step_fk_lookup, set()),
+    "field def cascade": (_field_def_cascade, set()),
+    "sync pages": (_sync_pages, set()),
+}
+
+
+@pytest.mark.integration
+@pytest.mark.parametrize("name", list(HOT_PATHS))
+def test_hot_path_has_no_unexpected_seq_scans(plan_engine, name: str):
+    operation, allowed = HOT_PATHS[name]
+
+    with Session(plan_engine) as db, _captured(plan_engine) as statements:
+        operation(db)
+        db.rollback()
+
+    assert statements, f"{name} issued no statements"
+    for statement, parameters in statements:
+        unexpected = _seq_scans(plan_engine, statement, parameters) - allowed
+        assert not unexpected, f"{name}: sequential scan on {sorted(unexpected)} in\n{statement}"
@@ -99,7 +99,7 @@ class TestTemplatesCRUD:
 
         # Delete it
         response = client.delete(f"/api/v1/templates/{template_id}")
-        assert response.status_code == 204
+        assert response.status_code == 202
 
         # Verify it's gone
         get_response = client.get(f"/api/v1/templates/{template_id}")
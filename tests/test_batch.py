@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Template
+from app.services.run_documents import get_document_cache
+
+
+def _batch(client: TestClient, *operations: dict):
+    return client.post("/api/v1/batch", json={"operations": list(operations)})
+
+
+def _template_operations() -> list[dict]:
+    return [
+        {"id": "tpl", "method": "POST", "path": "/templates", "body": {"name": "Close books"}},
+        {
+            "id": "step",
+            "method": "POST",
+            "path": "/templates/${tpl.id}/steps",
+            "body": {"title": "Reconcile"},
+        },
+        {
+            "method": "POST",
+            "path": "/template-steps/${step.id}/fields",
+            "body": {"name": "notes", "label": "Notes for ${step.title}", "type": "text"},
+        },
+        {
+            "id": "run",
+            "method": "POST",
+            "path": "/templates/${tpl.id}/runs",
+            "body": {"name": "Oct"},
+        },
+    ]
+
+
+def test_template_steps_fields_and_run_in_one_commit(client: TestClient, session: Session):
+    commits = []
+
+    def record(conn):
+        commits.append(conn)
+
+    engine = session.get_bind()
+    event.listen(engine, "commit", record)
+    try:
+        resp = _batch(client, *_template_operations())
+    finally:
+        event.remove(engine, "commit", record)
+
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [result["status"] for result in results] == [201, 201, 201, 201]
+    assert [result["id"] for result in results] == ["tpl", "step", None, "run"]
+    assert results[2]["body"]["label"] == "Notes for Reconcile"
+    assert results[1]["body"]["template_id"] == results[0]["body"]["id"]
+    assert len(commits) == 1
+
+    template = client.get(f"/api/v1/templates/{results[0]['body']['id']}").json()
+    assert template["steps"][0]["field_defs"][0]["name"] == "notes"
+    run = client.get(f"/api/v1/runs/{results[3]['body']['id']}").json()
+    assert run["steps"][0]["template_step"]["title"] == "Reconcile"
+
+
+def test_run_and_step_updates_with_references(client: TestClient):
+    setup = _batch(client, *_template_operations()).json()["results"]
+    run = setup[3]["body"]
+
+    resp = _batch(
+        client,
+        {"id": "run", "method": "GET", "path": f"/runs/{run['id']}"},
+        {
+            "method": "PATCH",
+            "path": "/runs/${run.id}",
+            "body": {"status": "in_progress"},
+            "headers": {"If-Match": "${run.version}"},
+        },
+        {
+            "method": "PATCH",
+            "path": "/runs/${run.id}/steps",
+            "body": [{"run_step_id": "${run.steps.0.id}", "status": "done"}],
+        },
+    )
+
+    assert resp.status_code == 200
+    detail = resp.json()["results"][2]["body"]
+    assert detail["status"] == "in_progress"
+    assert detail["steps"][0]["status"] == "done"
+    assert detail["version"] == 2
+
+
+def test_failed_operation_rolls_back_the_batch(client: TestClient, session: Session):
+    operations = _template_operations()
+    operations[3]["path"] = "/templates/999/runs"
+
+    resp = _batch(client, *operations)
+
+    assert resp.status_code == 404
+    assert resp.json()["index"] == 3
+    assert resp.json()["result"]["body"] == {"detail": "Template not found"}
+    assert session.scalar(select(func.count()).select_from(Template)) == 0
+    assert client.get("/api/v1/templates").json() == []
+
+
+def test_conflicts_and_bad_references_fail_the_batch(client: TestClient):
+    run = _batch(client, *_template_operations()).json()["results"][3]["body"]
+
+    conflict = _batch(
+        client,
+        {"method": "PATCH", "path": f"/runs/{run['id']}", "body": {"name": "Renamed"}},
+        {
+            "method": "PATCH",
+            "path": f"/runs/{run['id']}",
+            "body": {"name": "Stale"},
+            "headers": {"If-Match": '"1"'},
+        },
+    )
+    assert conflict.status_code == 409
+    assert conflict.json()["index"] == 1
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["name"] == "Oct"
+
+    unknown = _batch(client, {"method": "GET", "path": "/runs/${nope.id}"})
+    assert unknown.status_code == 422
+    assert unknown.json()["result"]["body"] == {"detail": "Unknown reference: nope"}
+    assert _batch(client, {"method": "GET", "path": "/nowhere"}).status_code == 404
+    assert _batch(client, {"method": "POST", "path": "/batch"}).status_code == 422
+
+
+def test_run_documents_are_cached_only_after_commit(client: TestClient):
+    run = _batch(client, *_template_operations()).json()["results"][3]["body"]
+    other = _batch(client, *_template_operations()).json()["results"][3]["body"]
+    client.get(f"/api/v1/runs/{run['id']}")
+    client.get(f"/api/v1/runs/{other['id']}")
+    cache = get_document_cache()
+
+    failed = _batch(
+        client,
+        {"method": "PATCH", "path": f"/runs/{run['id']}", "body": {"name": "Renamed"}},
+        {"method": "GET", "path": f"/runs/{run['id']}"},
+        {"method": "GET", "path": "/runs/999"},
+    )
+    assert failed.status_code == 404
+    # Nothing uncommitted was cached, and other runs keep their documents
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["name"] == "Oct"
+    assert cache.get(other["id"]) is not None
+
+    applied = _batch(
+        client,
+        {"method": "PATCH", "path": f"/runs/{run['id']}", "body": {"name": "Renamed"}},
+        {"method": "GET", "path": f"/runs/{run['id']}"},
+    )
+    assert applied.json()["results"][1]["body"]["name"] == "Renamed"
+    assert cache.get(run["id"]) is None
+    assert cache.get(other["id"]) is not None
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["name"] == "Renamed"
+
+
+def test_queued_jobs_start_after_commit(client: TestClient):
+    template = _batch(client, *_template_operations()).json()["results"][0]["body"]
+
+    resp = _batch(client, {"method": "DELETE", "path": f"/templates/{template['id']}"})
+
+    assert resp.status_code == 200
+    result = resp.json()["results"][0]
+    assert result["status"] == 202
+    assert result["headers"]["location"].endswith(f"/api/v1/jobs/{result['body']['id']}")
+    assert client.get(result["headers"]["location"]).json()["status"] == "succeeded"
+    assert client.get(f"/api/v1/templates/{template['id']}").status_code == 404
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api import deadlines
+from app.api.admission import HEAVY_PATHS
+from app.config import Settings, get_settings
+from app.database import DeadlineExceeded, set_time_limits
+
+
+class _Route:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+def test_request_past_its_deadline_gets_504(client: TestClient, session: Session):
+    client.post("/api/v1/templates", json={"name": "Close books"})
+    session.close()
+    set_time_limits(session, deadline=time.monotonic() - 1)
+
+    resp = client.get("/api/v1/templates")
+
+    assert resp.status_code == 504
+    assert resp.json() == {
+        "detail": "The request ran past its deadline and was cancelled",
+        "reason": "request_deadline",
+    }
+    assert client.get("/metrics").json()["timeouts"] == {
+        "statement_timeout": 0,
+        "request_deadline": 1,
+        "routes": {"list_templates": 1},
+    }
+    session.info.clear()
+
+
+def test_statement_timeouts_per_route(monkeypatch):
+    monkeypatch.setattr(get_settings(), "statement_timeout_ms", 5000)
+    monkeypatch.setattr(get_settings(), "statement_timeouts", "list_templates=200, sync=0")
+
+    def limits(route: str, **scope):
+        request = Request({"type": "http", "route": _Route(route), **scope})
+        return deadlines.time_limits(request)
+
+    assert limits("list_templates") == {"statement_timeout_ms": 200, "deadline": None}
+    assert limits("get_run")["statement_timeout_ms"] == 5000
+    assert limits("sync")["statement_timeout_ms"] is None
+    assert limits("get_run", **{deadlines.SCOPE_KEY: 12.5})["deadline"] == 12.5
+
+
+def test_heavy_routes_get_longer_limits(client: TestClient):
+    defaults = deadlines.parse_timeouts(Settings().statement_timeouts)
+    assert defaults == {"bulk_update_runs": 60000, "run_batch": 60000, "sync": 60000}
+    # The defaults name the heavy routes
+    paths = {client.app.url_path_for(name) for name in defaults}
+    assert paths == {get_settings().api_prefix + path for path in HEAVY_PATHS}
+
+    middleware = deadlines.DeadlineMiddleware(
+        None, 30, "/api/v1", heavy_paths=HEAVY_PATHS, heavy_timeout_seconds=300
+    )
+    assert middleware.timeout("/api/v1/runs/1") == 30
+    assert middleware.timeout("/api/v1/runs:bulk") == 300
+    assert middleware.timeout("/api/v1/sync") == 300
+    assert middleware.timeout("/healthz") is None
+    middleware.heavy_timeout_seconds = 0
+    assert middleware.timeout("/api/v1/batch") is None
+
+
+def test_later_deadline_does_not_extend_an_earlier_one(session: Session):
+    set_time_limits(session, statement_timeout_ms=100, deadline=50.0)
+    set_time_limits(session, statement_timeout_ms=300, deadline=90.0)
+    assert session.info == {"statement_timeout_ms": 300, "deadline": 50.0}
+    session.info.clear()
+
+
+def test_slow_statement_is_cancelled(session: Session):
+    if session.get_bind().dialect.name != "postgresql":
+        pytest.skip("statement_timeout is Postgres only")
+    set_time_limits(session, statement_timeout_ms=50)
+
+    with pytest.raises(DeadlineExceeded) as excinfo:
+        session.execute(text("SELECT pg_sleep(1)"))
+
+    assert excinfo.value.reason == "statement_timeout"
+    session.rollback()
+    session.info.clear()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.fieldsets import TEMPLATE, parse_selection
+
+
+def _template(client: TestClient) -> dict:
+    template = client.post(
+        "/api/v1/templates", json={"name": "Close books", "description": "Month end"}
+    ).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps",
+        json={"title": "Reconcile", "description": "<p>Long rich text</p>"},
+    ).json()
+    client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "notes", "label": "Notes", "type": "text"},
+    )
+    return template
+
+
+def test_step_titles_only(client: TestClient, statements):
+    template = _template(client)
+
+    with statements() as executed:
+        resp = client.get(
+            "/api/v1/templates", params={"include": "steps", "fields": "name,steps.title"}
+        )
+
+    assert resp.status_code == 200
+    assert resp.json() == [
+        {"id": template["id"], "name": "Close books", "steps": [{"id": 1, "title": "Reconcile"}]}
+    ]
+    # Templates, then steps: descriptions are never read and field defs never loaded
+    assert len(executed) == 2
+    assert not any("description" in statement for statement in executed)
+    assert not any("step_field_defs" in statement for statement in executed)
+
+
+def test_defaults_still_expand_everything(client: TestClient):
+    template = _template(client)
+    full = client.get(f"/api/v1/templates/{template['id']}").json()
+
+    sparse = client.get(f"/api/v1/templates/{template['id']}", params={"fields": "name"}).json()
+    assert sparse["steps"][0] == full["steps"][0]
+    assert set(sparse) == {"id", "name", "steps"}
+
+    flat = client.get(f"/api/v1/templates/{template['id']}", params={"include": ""}).json()
+    assert flat == {key: value for key, value in full.items() if key != "steps"}
+
+
+def test_run_detail_sparse_uses_the_template_snapshot(client: TestClient):
+    template = _template(client)
+    run = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Oct"}).json()
+    step_id = run["steps"][0]["template_step"]["id"]
+    client.patch(f"/api/v1/template-steps/{step_id}", json={"title": "Renamed later"})
+
+    detail = client.get(
+        f"/api/v1/runs/{run['id']}",
+        params={
+            "include": "steps.template_step",
+            "fields": "status,steps.status,steps.template_step.title",
+        },
+    ).json()
+    assert detail == {
+        "id": run["id"],
+        "status": "not_started",
+        "steps": [
+            {
+                "id": run["steps"][0]["id"],
+                "status": "not_started",
+                "template_step": {"id": step_id, "title": "Reconcile"},
+            }
+        ],
+    }
+    assert client.get("/api/v1/runs/999", params={"fields": "name"}).status_code == 404
+
+
+def test_run_list_with_template_names(client: TestClient):
+    template = _template(client)
+    client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Oct"})
+
+    runs = client.get("/api/v1/runs", params={"fields": "name,template.name"}).json()
+    assert runs == [
+        {"id": 1, "name": "Oct", "template": {"id": template["id"], "name": "Close books"}}
+    ]
+    flat = client.get("/api/v1/runs", params={"include": ""}).json()[0]
+    assert "template" not in flat and {"status", "variables"} <= flat.keys()
+
+
+def test_unknown_fields_are_rejected(client: TestClient):
+    resp = client.get("/api/v1/templates", params={"fields": "steps.secret"})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Unknown field: steps.secret"
+    assert client.get("/api/v1/runs", params={"include": "steps"}).status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("fields", "include", "expected"),
+    [
+        (None, "steps", {"steps": {}}),
+        ("steps.field_defs.label", "", {"steps": {"field_defs": {}}}),
+        ("steps", None, {"steps": {"field_defs": {}}}),
+    ],
+)
+def test_parse_selection_includes(fields, include, expected):
+    def tree(selection):
+        return {name: tree(child) for name, child in selection.children.items()}
+
+    selection = parse_selection(
+        TEMPLATE, fields=fields, include=include, default_include=("steps", "steps.field_defs")
+    )
+    assert tree(selection) == expected
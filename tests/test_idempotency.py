@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import IdempotencyKey, Run, RunStep, Template
+from app.services.idempotency import purge_expired_keys
+
+
+def _template(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Close books"}).json()
+    client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": "Reconcile"})
+    return template
+
+
+def _count(session: Session, model) -> int:
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_retried_run_creation_is_replayed(client: TestClient, session: Session):
+    template = _template(client)
+
+    def start_run():
+        return client.post(
+            f"/api/v1/templates/{template['id']}/runs",
+            json={"name": "Oct"},
+            headers={"Idempotency-Key": "run-oct"},
+        )
+
+    first = start_run()
+    retry = start_run()
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert _count(session, Run) == 1
+    assert _count(session, RunStep) == 1
+
+
+def test_key_reused_for_another_request(client: TestClient, session: Session):
+    headers = {"Idempotency-Key": "tpl-1"}
+    assert client.post("/api/v1/templates", json={"name": "A"}, headers=headers).status_code == 201
+
+    resp = client.post("/api/v1/templates", json={"name": "B"}, headers=headers)
+
+    assert resp.status_code == 422
+    assert resp.json()["detail"] == "Idempotency-Key was already used for a different request"
+    assert _count(session, Template) == 1
+
+
+def test_failed_requests_do_not_use_up_the_key(client: TestClient, session: Session):
+    headers = {"Idempotency-Key": "tpl-2"}
+    assert client.post("/api/v1/templates", json={}, headers=headers).status_code == 422
+    missing = client.post("/api/v1/templates/9/runs", json={"name": "x"}, headers=headers)
+    assert missing.status_code == 404
+    assert _count(session, IdempotencyKey) == 0
+
+    assert client.post("/api/v1/templates", json={"name": "A"}, headers=headers).status_code == 201
+    assert _count(session, IdempotencyKey) == 1
+
+
+def test_other_requests_ignore_the_header(client: TestClient, session: Session):
+    template = _template(client)
+    headers = {"Idempotency-Key": "tpl-3"}
+
+    for _ in range(2):
+        resp = client.patch(
+            f"/api/v1/templates/{template['id']}", json={"name": "Renamed"}, headers=headers
+        )
+        assert resp.status_code == 200
+    blank = client.post("/api/v1/templates", json={"name": "A"}, headers={"Idempotency-Key": ""})
+    assert blank.status_code == 400
+    assert _count(session, IdempotencyKey) == 0
+
+
+def test_expired_keys_run_again_and_are_purged(client: TestClient, session: Session, monkeypatch):
+    monkeypatch.setattr(get_settings(), "idempotency_key_ttl_seconds", 0)
+    headers = {"Idempotency-Key": "tpl-4"}
+
+    for _ in range(2):
+        resp = client.post("/api/v1/templates", json={"name": "A"}, headers=headers)
+        assert resp.status_code == 201
+        assert "idempotent-replayed" not in resp.headers
+
+    assert _count(session, Template) == 2
+    assert purge_expired_keys(session, batch_size=1) == 1
+    assert _count(session, IdempotencyKey) == 0
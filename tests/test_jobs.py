@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models import Job
+from app.services import jobs
+
+
+@pytest.fixture
+def flaky(monkeypatch):
+    """A ``flaky`` job kind that fails until ``calls`` reaches ``succeed_on``."""
+    state = {"calls": 0, "succeed_on": 2}
+
+    def handler(db: Session, job: Job):
+        state["calls"] += 1
+        if state["calls"] < state["succeed_on"]:
+            raise RuntimeError(f"boom {state['calls']}")
+        job.progress = 1
+        return {"calls": state["calls"]}
+
+    monkeypatch.setitem(jobs.HANDLERS, "flaky", handler)
+    return state
+
+
+def _queue(session: Session, kind: str = "flaky") -> int:
+    job = jobs.create_job(session, kind, {"x": 1})
+    session.commit()
+    return job.id
+
+
+def test_failed_attempt_is_retried_after_backoff(session: Session, flaky):
+    job_id = _queue(session)
+
+    jobs.run_job(job_id)
+
+    session.expire_all()
+    job = session.get(Job, job_id)
+    assert (job.status, job.attempts, job.error) == ("queued", 1, "boom 1")
+    assert job.run_after > datetime.utcnow()
+    assert jobs.work_once("w1") is False  # Not due yet
+
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    session.commit()
+    assert jobs.work_once("w1") is True
+
+    session.expire_all()
+    job = session.get(Job, job_id)
+    assert (job.status, job.attempts, job.result, job.progress) == ("succeeded", 2, {"calls": 2}, 1)
+    assert job.locked_by is None and job.finished_at is not None
+
+
+def test_job_fails_after_max_attempts(session: Session, flaky, monkeypatch):
+    flaky["succeed_on"] = 99
+    monkeypatch.setattr(jobs, "retry_delay", lambda attempts: timedelta(0))
+    job_id = _queue(session)
+
+    assert jobs.work_pending("w1") == 3
+
+    session.expire_all()
+    job = session.get(Job, job_id)
+    assert (job.status, job.attempts, job.error) == ("failed", 3, "boom 3")
+
+
+def test_claimed_job_is_not_claimed_again(session: Session, flaky):
+    job_id = _queue(session)
+
+    assert jobs.claim_job(session, "w1").id == job_id
+    assert jobs.claim_job(session, "w2") is None
+    assert jobs.claim_job(session, "w2", job_id=job_id) is None
+
+
+def test_stale_running_job_is_requeued(session: Session, flaky):
+    job_id = _queue(session)
+    jobs.claim_job(session, "w1")
+
+    assert jobs.requeue_stale_jobs(session, older_than=timedelta(minutes=10)) == 0
+    later = datetime.utcnow() + timedelta(minutes=11)
+    assert jobs.requeue_stale_jobs(session, older_than=timedelta(minutes=10), now=later) == 1
+    session.expire_all()
+    assert session.get(Job, job_id).status == "queued"
+
+
+def test_stale_job_on_its_last_attempt_fails(session: Session, flaky):
+    job_id = _queue(session)
+    session.get(Job, job_id).max_attempts = 1
+    session.commit()
+    jobs.claim_job(session, "w1")
+
+    later = datetime.utcnow() + timedelta(minutes=11)
+    assert jobs.requeue_stale_jobs(session, older_than=timedelta(minutes=10), now=later) == 1
+
+    session.expire_all()
+    job = session.get(Job, job_id)
+    assert (job.status, job.attempts, job.error) == ("failed", 1, "Worker stopped responding")
+    assert job.locked_by is None and job.finished_at == later
+    assert jobs.work_once("w1") is False
+
+
+def test_retry_delay_doubles_up_to_an_hour():
+    assert jobs.retry_delay(1) == timedelta(seconds=10)
+    assert jobs.retry_delay(3) == timedelta(seconds=40)
+    assert jobs.retry_delay(20) == timedelta(hours=1)
+
+
+def test_bulk_runs_respond_async(client: TestClient):
+    template = client.post("/api/v1/templates", json={"name": "Async"}).json()
+    for index in range(3):
+        client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": f"r{index}"})
+
+    resp = client.post(
+        "/api/v1/runs:bulk",
+        json={"action": "delete", "filter": {"template_id": template["id"]}},
+        headers={"Prefer": "respond-async"},
+    )
+
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "queued"
+    job = client.get(resp.headers["location"]).json()
+    assert (job["kind"], job["status"]) == ("bulk_runs", "succeeded")
+    assert job["result"] == {"affected": 3}
+    assert client.get("/api/v1/runs").json() == []
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.negotiation import accepts_msgpack
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+
+def _template(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Close books"}).json()
+    client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": "Reconcile"})
+    return template
+
+
+def test_responses_follow_the_accept_header(client: TestClient):
+    template = _template(client)
+    run = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Oct"}).json()
+
+    for path in (
+        "/api/v1/templates",
+        f"/api/v1/templates/{template['id']}",
+        f"/api/v1/runs/{run['id']}",
+    ):
+        as_json = client.get(path)
+        as_msgpack = client.get(path, headers=MSGPACK)
+        assert as_msgpack.headers["content-type"] == "application/msgpack"
+        assert "Accept" in as_msgpack.headers["vary"]
+        assert "Accept" in as_json.headers["vary"]
+        assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+        assert len(as_msgpack.content) < len(as_json.content)
+
+
+def test_errors_are_negotiated_too(client: TestClient):
+    resp = client.get("/api/v1/runs/999", headers=MSGPACK)
+    assert resp.status_code == 404
+    assert msgpack.unpackb(resp.content) == {"detail": "Run not found"}
+
+
+def test_msgpack_request_bodies(client: TestClient):
+    resp = client.post(
+        "/api/v1/templates",
+        content=msgpack.packb({"name": "Vendor review", "isRecurring": False}),
+        headers={"Content-Type": "application/msgpack", **MSGPACK},
+    )
+    assert resp.status_code == 201
+    assert msgpack.unpackb(resp.content)["name"] == "Vendor review"
+
+    # Native MessagePack timestamps are accepted where the API takes datetimes
+    template = _template(client)
+    run = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Oct"}).json()
+    completed = datetime(2026, 10, 1, 12, 30, tzinfo=UTC)
+    resp = client.patch(
+        f"/api/v1/runs/{run['id']}/steps/{run['steps'][0]['id']}",
+        content=msgpack.packb({"status": "done", "completed_at": completed}, datetime=True),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["completed_at"].startswith("2026-10-01T12:30:00")
+
+
+def test_malformed_msgpack_body_is_rejected(client: TestClient):
+    resp = client.post(
+        "/api/v1/templates", content=b"\xc1", headers={"Content-Type": "application/msgpack"}
+    )
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("application/msgpack", True),
+        ("application/x-msgpack, application/json", True),
+        ("application/json, application/msgpack;q=0.5", False),
+        ("application/msgpack;q=0", False),
+        ("*/*", False),
+        ("", False),
+    ],
+)
+def test_accept_ranking(accept: str, expected: bool):
+    assert accepts_msgpack(accept) is expected
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Run, RunStep, StepFieldValue
+from app.services.partitions import (
+    convert_to_partitioned,
+    ensure_future_partitions,
+    is_partitioned,
+    steps_partitioned,
+)
+
+
+@pytest.fixture(autouse=True)
+def postgres_only(session: Session):
+    if session.get_bind().dialect.name != "postgresql":
+        pytest.skip("Partitioning is Postgres only")
+
+
+def _seed(client: TestClient, template_id: int, name: str) -> dict:
+    run = client.post(f"/api/v1/templates/{template_id}/runs", json={"name": name}).json()
+    field_def_id = run["steps"][0]["template_step"]["field_defs"][0]["id"]
+    client.post(
+        f"/api/v1/runs/{run['id']}/steps/{run['steps'][0]['id']}/fields",
+        json={"values": [{"field_def_id": field_def_id, "value": "ok"}]},
+    )
+    return run
+
+
+def _count(session: Session, model, *where) -> int:
+    return session.scalar(select(func.count()).select_from(model).where(*where))
+
+
+def _template(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Close books"}).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps", json={"title": "Reconcile"}
+    ).json()
+    client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "notes", "label": "Notes", "type": "text"},
+    )
+    return template
+
+
+def test_conversion_keeps_cascades_and_triggers(client: TestClient, session: Session):
+    template = _template(client)
+    before = _seed(client, template["id"], "before")
+
+    convert_to_partitioned(session.connection(), months_ahead=1)
+    session.commit()
+    assert is_partitioned(session.connection(), "runs")
+    assert is_partitioned(session.connection(), "run_steps")
+    assert steps_partitioned(session.connection())
+
+    after = _seed(client, template["id"], "after")
+    for run in (before, after):
+        assert client.get(f"/api/v1/runs/{run['id']}").json()["steps"][0]["field_values"]
+
+    # Sync change-log triggers were re-created on the rebuilt tables
+    page = client.get("/api/v1/sync").json()
+    assert {row["id"] for row in page["changes"]["runs"]} == {before["id"], after["id"]}
+
+    # Composite foreign keys still cascade to steps and field values
+    session.execute(delete(Run).where(Run.id == before["id"]))
+    session.commit()
+    assert _count(session, RunStep, RunStep.run_id == before["id"]) == 0
+    assert _count(session, StepFieldValue) == 1
+
+    # Step order stays unique within a partition
+    step = session.get(RunStep, after["steps"][0]["id"])
+    session.add(RunStep(run_id=after["id"], template_step_id=step.template_step_id, order_index=1))
+    with pytest.raises(Exception, match="unique"):
+        session.commit()
+    session.rollback()
+
+
+def test_new_partition_takes_rows_from_default(client: TestClient, session: Session):
+    # Partitions only for an earlier month, so new runs land in the default partition
+    convert_to_partitioned(session.connection(), months_ahead=0, now=datetime(2025, 6, 1))
+    session.commit()
+    template = _template(client)
+    run = _seed(client, template["id"], "late")
+    month = datetime.utcnow().strftime("%Y_%m")
+    assert _count(session, Run, text("tableoid = 'runs_default'::regclass")) == 1
+
+    created = ensure_future_partitions(session.connection(), months_ahead=0)
+    session.commit()
+
+    assert created == [f"runs_p{month}", f"run_steps_p{month}"]
+    assert _count(session, Run, text(f"tableoid = 'runs_p{month}'::regclass")) == 1
+    assert _count(session, RunStep, text(f"tableoid = 'run_steps_p{month}'::regclass")) == 1
+    assert _count(session, Run, text("tableoid = 'runs_default'::regclass")) == 0
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["steps"][0]["field_values"]
+
+    session.execute(delete(Run).where(Run.id == run["id"]))
+    session.commit()
+    assert _count(session, RunStep) == 0
+    assert _count(session, StepFieldValue) == 0
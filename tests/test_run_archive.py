@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Run, RunArchive, RunStep, StepFieldValue
+from app.services.archive import archive_finished_runs
+from app.services.run_documents import invalidate
+
+
+def _seed(client: TestClient) -> tuple[dict, dict]:
+    template = client.post("/api/v1/templates", json={"name": "Close books"}).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps", json={"title": "Reconcile"}
+    ).json()
+    field = client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "amount", "label": "Amount", "type": "text"},
+    ).json()
+
+    runs = {}
+    for name in ("old-done", "old-open", "recent-done"):
+        run = client.post(
+            f"/api/v1/templates/{template['id']}/runs",
+            json={
+                "name": name,
+                "variables": [{"key": "client", "label": "Client", "value": "Acme"}],
+            },
+        ).json()
+        client.post(
+            f"/api/v1/runs/{run['id']}/steps/{run['steps'][0]['id']}/fields",
+            json={"values": [{"field_def_id": field["id"], "value": "42"}]},
+        )
+        runs[name] = run
+    for name in ("old-done", "recent-done"):
+        client.patch(f"/api/v1/runs/{runs[name]['id']}", json={"status": "done"})
+    return template, runs
+
+
+def _age(session: Session, run_id: int, days: int) -> None:
+    run = session.get(Run, run_id)
+    run.created_at = run.updated_at = datetime.utcnow() - timedelta(days=days)
+    # Written behind the API's back, so drop the cached detail the API would have refreshed
+    invalidate(session, [run_id])
+    session.commit()
+
+
+def test_archive_moves_only_old_finished_runs(client: TestClient, session: Session):
+    _, runs = _seed(client)
+    _age(session, runs["old-done"]["id"], 120)
+    _age(session, runs["old-open"]["id"], 120)
+    before = client.get(f"/api/v1/runs/{runs['old-done']['id']}").json()
+
+    assert archive_finished_runs(session, older_than_days=90, batch_size=1) == 1
+
+    old_id = runs["old-done"]["id"]
+    assert session.get(Run, old_id) is None
+    steps_left = select(func.count()).select_from(RunStep).where(RunStep.run_id == old_id)
+    assert session.scalar(steps_left) == 0
+    assert session.scalar(select(func.count()).select_from(StepFieldValue)) == 2
+    assert session.get(RunArchive, old_id).status == "done"
+
+    # Detail transparently falls back to the archived snapshot
+    resp = client.get(f"/api/v1/runs/{old_id}")
+    assert resp.status_code == 200
+    assert resp.json() == before
+
+    # Listing is hot-only unless archived runs are requested
+    hot = {run["name"] for run in client.get("/api/v1/runs").json()}
+    assert hot == {"old-open", "recent-done"}
+    everything = client.get(
+        "/api/v1/runs", params={"include_archived": True, "status": "done", "var.client": "Acme"}
+    ).json()
+    assert {run["name"] for run in everything} == {"old-done", "recent-done"}
+    assert all(run["template"]["name"] == "Close books" for run in everything)
+
+
+def test_delete_archived_run(client: TestClient, session: Session):
+    _, runs = _seed(client)
+    run_id = runs["old-done"]["id"]
+    _age(session, run_id, 120)
+    archive_finished_runs(session, older_than_days=90, batch_size=10)
+
+    assert client.delete(f"/api/v1/runs/{run_id}").status_code == 204
+    assert client.get(f"/api/v1/runs/{run_id}").status_code == 404
+    assert client.delete(f"/api/v1/runs/{run_id}").status_code == 404
+
+
+def test_list_archived_runs_filters_and_pages(client: TestClient, session: Session):
+    _, runs = _seed(client)
+    for name, days in (("old-done", 120), ("recent-done", 100)):
+        _age(session, runs[name]["id"], days)
+    archive_finished_runs(session, older_than_days=90, batch_size=10)
+
+    def archived(**params):
+        resp = client.get("/api/v1/runs", params={"include_archived": True, **params})
+        assert resp.status_code == 200
+        return [run["name"] for run in resp.json() if run["name"] != "old-open"]
+
+    cutoff = (datetime.utcnow() - timedelta(days=110)).isoformat()
+    assert archived(created_before=cutoff) == ["old-done"]
+    assert archived(created_after=cutoff) == ["recent-done"]
+    assert archived(**{"var.client": "Globex"}) == []
+
+    assert archived(archived_limit=1) == ["old-done"]
+    assert archived(archived_limit=1, archived_after=runs["old-done"]["id"]) == ["recent-done"]
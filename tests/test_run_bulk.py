@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Run, RunArchive, RunStep, StepFieldValue
+from app.services.run_documents import invalidate
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Force several chunks per request
+    monkeypatch.setattr(get_settings(), "bulk_chunk_size", 2)
+
+
+def _seed(client: TestClient, count: int = 5) -> tuple[dict, list[dict]]:
+    template = client.post("/api/v1/templates", json={"name": "Onboarding"}).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps", json={"title": "Kickoff"}
+    ).json()
+    field = client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "owner", "label": "Owner", "type": "text"},
+    ).json()
+    runs = []
+    for index in range(count):
+        run = client.post(
+            f"/api/v1/templates/{template['id']}/runs", json={"name": f"run {index}"}
+        ).json()
+        client.post(
+            f"/api/v1/runs/{run['id']}/steps/{run['steps'][0]['id']}/fields",
+            json={"values": [{"field_def_id": field["id"], "value": "me"}]},
+        )
+        runs.append(run)
+    return template, runs
+
+
+def _count(session: Session, model) -> int:
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_bulk_delete_by_ids_removes_children(client: TestClient, session: Session):
+    _, runs = _seed(client)
+    ids = [run["id"] for run in runs[:3]]
+
+    resp = client.post("/api/v1/runs:bulk", json={"action": "delete", "run_ids": ids + [999]})
+
+    assert resp.status_code == 200
+    assert resp.json() == {"action": "delete", "affected": 3}
+    assert _count(session, Run) == 2
+    assert _count(session, RunStep) == 2
+    assert _count(session, StepFieldValue) == 2
+
+
+def test_bulk_set_status_by_filter(client: TestClient, session: Session):
+    template, runs = _seed(client)
+    client.patch(f"/api/v1/runs/{runs[0]['id']}", json={"status": "done"})
+
+    resp = client.post(
+        "/api/v1/runs:bulk",
+        json={
+            "action": "set_status",
+            "status": "archived",
+            "filter": {"template_id": template["id"], "status": "not_started"},
+        },
+    )
+
+    assert resp.json() == {"action": "set_status", "affected": 4}
+    statuses = [run["status"] for run in client.get("/api/v1/runs").json()]
+    assert sorted(statuses) == ["archived"] * 4 + ["done"]
+
+
+def test_bulk_set_status_done_stamps_completion(client: TestClient, session: Session):
+    _, runs = _seed(client, count=2)
+    ids = [run["id"] for run in runs]
+
+    resp = client.post(
+        "/api/v1/runs:bulk", json={"action": "set_status", "status": "done", "run_ids": ids}
+    )
+
+    assert resp.json() == {"action": "set_status", "affected": 2}
+    for run_id in ids:
+        run = client.get(f"/api/v1/runs/{run_id}").json()
+        assert run["completed"] is True
+        assert run["completed_at"] is not None
+
+
+def test_bulk_archive_older_than(client: TestClient, session: Session):
+    _, runs = _seed(client)
+    old = session.get(Run, runs[1]["id"])
+    old.created_at = old.updated_at = datetime.utcnow() - timedelta(days=30)
+    session.commit()
+
+    resp = client.post(
+        "/api/v1/runs:bulk", json={"action": "archive", "filter": {"older_than_days": 7}}
+    )
+
+    assert resp.json() == {"action": "archive", "affected": 1}
+    assert session.get(RunArchive, runs[1]["id"]) is not None
+    assert client.get(f"/api/v1/runs/{runs[1]['id']}").json()["name"] == "run 1"
+    assert _count(session, Run) == 4
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"action": "delete"},
+        {"action": "delete", "run_ids": [1], "filter": {"status": "done"}},
+        {"action": "delete", "filter": {}},
+        {"action": "set_status", "run_ids": [1]},
+        {"action": "delete", "status": "done", "run_ids": [1]},
+        {"action": "set_status", "status": "bogus", "run_ids": [1]},
+    ],
+)
+def test_bulk_rejects_ambiguous_requests(client: TestClient, payload: dict):
+    assert client.post("/api/v1/runs:bulk", json=payload).status_code == 422
+
+
+def test_steps_older_than_their_run_are_loaded_and_archived(
+    client: TestClient, session: Session
+):
+    _, runs = _seed(client, count=1)
+    run_id = runs[0]["id"]
+    # Imported or legacy rows: the run's created_at is later than its step's
+    session.get(Run, run_id).created_at = datetime.utcnow() + timedelta(hours=1)
+    session.commit()
+    invalidate(session, [run_id])
+
+    detail = client.get(f"/api/v1/runs/{run_id}").json()
+    assert [len(step["field_values"]) for step in detail["steps"]] == [1]
+    sparse = client.get(f"/api/v1/runs/{run_id}", params={"fields": "name,steps.id"}).json()
+    assert [step["id"] for step in sparse["steps"]] == [runs[0]["steps"][0]["id"]]
+
+    resp = client.post("/api/v1/runs:bulk", json={"action": "archive", "run_ids": [run_id]})
+    assert resp.json() == {"action": "archive", "affected": 1}
+    assert session.scalar(select(func.count()).select_from(RunStep)) == 0
+    assert session.scalar(select(func.count()).select_from(StepFieldValue)) == 0
+    assert client.get(f"/api/v1/runs/{run_id}").json()["steps"] == detail["steps"]
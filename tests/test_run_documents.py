@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import Run, RunDocument
+from app.services import run_documents
+from app.services.run_documents import DocumentCache, get_document_cache, invalidate
+from app.services.run_loader import render_run_detail
+
+
+def _run(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Close books"}).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps", json={"title": "Reconcile"}
+    ).json()
+    client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "notes", "label": "Notes", "type": "text"},
+    )
+    return client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Oct"}).json()
+
+
+def test_repeated_reads_are_served_from_the_cache(client: TestClient, statements):
+    run = _run(client)
+    first = client.get(f"/api/v1/runs/{run['id']}")
+
+    with statements() as executed:
+        second = client.get(f"/api/v1/runs/{run['id']}")
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert executed == []
+
+
+def test_writes_refresh_the_cached_document(client: TestClient, statements):
+    run = _run(client)
+    run_step = run["steps"][0]
+    field_def = run_step["template_step"]["field_defs"][0]
+    client.get(f"/api/v1/runs/{run['id']}")
+
+    updated = client.patch(f"/api/v1/runs/{run['id']}", json={"status": "in_progress"})
+    assert updated.json()["status"] == "in_progress"
+    client.patch(f"/api/v1/runs/{run['id']}/steps/{run_step['id']}", json={"status": "done"})
+    client.post(
+        f"/api/v1/runs/{run['id']}/steps/{run_step['id']}/fields",
+        json={"values": [{"field_def_id": field_def["id"], "value": "tied out"}]},
+    )
+
+    with statements() as executed:
+        detail = client.get(f"/api/v1/runs/{run['id']}").json()
+    assert executed == []
+    assert detail["status"] == "in_progress"
+    assert detail["steps"][0]["status"] == "done"
+    assert detail["steps"][0]["field_values"][0]["value"] == "tied out"
+
+
+def test_deleted_and_bulk_updated_runs_are_not_served_stale(client: TestClient):
+    run, other = _run(client), _run(client)
+    client.get(f"/api/v1/runs/{run['id']}")
+    client.get(f"/api/v1/runs/{other['id']}")
+
+    client.post(
+        "/api/v1/runs:bulk",
+        json={"action": "set_status", "status": "done", "run_ids": [other["id"]]},
+    )
+    assert client.get(f"/api/v1/runs/{other['id']}").json()["status"] == "done"
+
+    assert client.delete(f"/api/v1/runs/{run['id']}").status_code == 204
+    assert client.get(f"/api/v1/runs/{run['id']}").status_code == 404
+
+
+def test_deleted_template_steps_show_as_detached(client: TestClient):
+    run = _run(client)
+    client.get(f"/api/v1/runs/{run['id']}")
+
+    step_id = run["steps"][0]["template_step_id"]
+    assert client.delete(f"/api/v1/template-steps/{step_id}").status_code == 204
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["steps"][0]["template_step_id"] is None
+
+
+def test_reads_racing_a_change_do_not_cache_their_render(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(get_settings(), "run_document_store", True)
+    run = _run(client)
+
+    def render_then_change(db: Session, run_id: int, **kwargs):
+        rendered = render_run_detail(db, run_id, **kwargs)
+        # A set-based change commits and drops the document while the read renders
+        db.execute(
+            update(Run)
+            .where(Run.id == run_id)
+            .values(status="done", version=Run.version + 1)
+        )
+        invalidate(db, [run_id])
+        db.commit()
+        return rendered
+
+    monkeypatch.setattr(run_documents, "render_run_detail", render_then_change)
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["status"] == "not_started"
+    assert session.get(RunDocument, run["id"]) is None
+
+    monkeypatch.setattr(run_documents, "render_run_detail", render_run_detail)
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["status"] == "done"
+
+
+def test_shared_store_survives_a_cold_process_cache(
+    client: TestClient, session: Session, statements, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(get_settings(), "run_document_store", True)
+    run = _run(client)
+    document = client.get(f"/api/v1/runs/{run['id']}").content
+    stored = select(RunDocument.document).where(RunDocument.run_id == run["id"])
+    assert session.scalar(stored) == document
+
+    # Another process: empty LRU, one primary-key read of run_documents
+    get_document_cache().clear()
+    with statements() as executed:
+        assert client.get(f"/api/v1/runs/{run['id']}").content == document
+    assert len(executed) == 1
+
+    client.patch(f"/api/v1/runs/{run['id']}", json={"name": "Renamed"})
+    get_document_cache().clear()
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["name"] == "Renamed"
+
+    client.delete(f"/api/v1/runs/{run['id']}")
+    assert session.get(RunDocument, run["id"]) is None
+
+
+def test_stored_documents_expire(
+    client: TestClient, session: Session, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(get_settings(), "run_document_store", True)
+    run = _run(client)
+    document = client.get(f"/api/v1/runs/{run['id']}").content
+    stored = session.get(RunDocument, run["id"])
+    stored.document = b"stale"
+    stored.rendered_at = datetime.utcnow() - timedelta(hours=2)
+    session.commit()
+
+    get_document_cache().clear()
+    assert client.get(f"/api/v1/runs/{run['id']}").content == document
+    session.expire_all()
+    stored = session.get(RunDocument, run["id"])
+    assert stored.document == document
+    assert stored.rendered_at > datetime.utcnow() - timedelta(minutes=1)
+
+
+class TestDocumentCache:
+    def test_evicts_least_recently_used(self):
+        cache = DocumentCache(max_size=2, ttl_seconds=60)
+        cache.put(1, b"a")
+        cache.put(2, b"b")
+        cache.get(1)
+        cache.put(3, b"c")
+        assert (cache.get(1), cache.get(2), cache.get(3)) == (b"a", None, b"c")
+
+    def test_fill_does_not_replace_a_newer_entry(self):
+        cache = DocumentCache(max_size=2, ttl_seconds=60)
+        cache.put(1, b"new")
+        cache.put(1, b"old", replace=False)
+        assert cache.get(1) == b"new"
+
+    def test_fill_after_a_write_is_dropped(self):
+        cache = DocumentCache(max_size=2, ttl_seconds=60)
+        writes = cache.writes
+        cache.discard([1])
+        cache.put(1, b"old", replace=False, since=writes)
+        assert cache.get(1) is None
+
+    def test_entries_expire(self):
+        cache = DocumentCache(max_size=2, ttl_seconds=-1)
+        cache.put(1, b"a")
+        assert cache.get(1) is None
+        assert len(cache) == 0
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+
+def _run(client: TestClient, steps: int = 3) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Close"}).json()
+    for index in range(steps):
+        client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": f"Step {index}"})
+    return client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Oct"}).json()
+
+
+def test_completes_a_section_in_one_update(client: TestClient, statements):
+    run = _run(client)
+    first, second, third = (step["id"] for step in run["steps"])
+    with statements() as executed:
+        resp = client.patch(
+            f"/api/v1/runs/{run['id']}/steps",
+            json=[
+                {"run_step_id": first, "status": "done"},
+                {"run_step_id": second, "status": "done", "completed_at": "2026-10-01T09:00:00"},
+                {"run_step_id": third, "notes": "Waiting on bank"},
+            ],
+        )
+
+    assert resp.status_code == 200
+    steps = {step["id"]: step for step in resp.json()["steps"]}
+    assert steps[first]["status"] == "done" and steps[first]["completed_at"] is not None
+    assert steps[second]["completed_at"] == "2026-10-01T09:00:00"
+    assert steps[third] | {"notes": None, "version": 1} == run["steps"][2] | {
+        "updated_at": steps[third]["updated_at"]
+    }
+    assert steps[third]["notes"] == "Waiting on bank" and steps[third]["version"] == 2
+    updates = [s for s in executed if "UPDATE run_steps" in s]
+    assert len(updates) == 1
+
+    # Clearing a field is a change too; untouched fields keep their values
+    resp = client.patch(
+        f"/api/v1/runs/{run['id']}/steps", json=[{"run_step_id": third, "notes": None}]
+    )
+    third_step = resp.json()["steps"][2]
+    assert third_step["notes"] is None and third_step["status"] == "not_started"
+
+
+def test_all_or_nothing(client: TestClient):
+    run = _run(client, steps=2)
+    other = _run(client, steps=1)
+    first, second = (step["id"] for step in run["steps"])
+    url = f"/api/v1/runs/{run['id']}/steps"
+
+    stray = client.patch(
+        url,
+        json=[
+            {"run_step_id": first, "status": "done"},
+            {"run_step_id": other["steps"][0]["id"], "status": "done"},
+        ],
+    )
+    assert stray.status_code == 404
+    assert stray.json()["detail"] == f"Steps not in run: {other['steps'][0]['id']}"
+
+    stale = client.patch(
+        url,
+        json=[
+            {"run_step_id": first, "status": "done", "version": 1},
+            {"run_step_id": second, "status": "done", "version": 7},
+        ],
+    )
+    assert stale.status_code == 409
+    steps = client.get(f"/api/v1/runs/{run['id']}").json()["steps"]
+    assert [step["status"] for step in steps] == ["not_started", "not_started"]
+
+    assert client.patch(url, json=[]).status_code == 422
+    duplicate = [{"run_step_id": first, "notes": "a"}, {"run_step_id": first, "notes": "b"}]
+    assert client.patch(url, json=duplicate).status_code == 422
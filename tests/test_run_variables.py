@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models import Run
+from app.services.run_variables import patch_variables
+
+
+def _run(client: TestClient, variables) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Onboarding"}).json()
+    return client.post(
+        f"/api/v1/templates/{template['id']}/runs", json={"name": "Acme", "variables": variables}
+    ).json()
+
+
+def test_set_and_unset_keys(client: TestClient):
+    run = _run(
+        client,
+        [
+            {"key": "client", "label": "Client", "value": "Acme"},
+            {"key": "region", "label": "Region", "value": "EU"},
+            {"key": "owner", "label": "Owner", "value": "sam"},
+        ],
+    )
+
+    resp = client.patch(
+        f"/api/v1/runs/{run['id']}/variables",
+        json={"set": {"region": "US", "seats": 12, "tags": ["a", "b"]}, "unset": ["owner", "nope"]},
+    )
+    assert resp.status_code == 200
+    # Existing entries keep their place and label; new keys follow in request order
+    expected = [
+        {"key": "client", "label": "Client", "value": "Acme"},
+        {"key": "region", "label": "Region", "value": "US"},
+        {"key": "seats", "value": 12},
+        {"key": "tags", "value": ["a", "b"]},
+    ]
+    assert resp.json()["variables"] == expected
+    assert client.get(f"/api/v1/runs/{run['id']}").json()["variables"] == expected
+    assert [r["id"] for r in client.get("/api/v1/runs", params={"var.region": "US"}).json()] == [
+        run["id"]
+    ]
+
+
+def test_patches_do_not_read_the_row(client: TestClient, session: Session, statements):
+    run = _run(client, None)
+    with statements() as executed:
+        first = client.patch(f"/api/v1/runs/{run['id']}/variables", json={"set": {"a": "1"}})
+    assert first.json()["variables"] == [{"key": "a", "value": "1"}]
+    writes = [s for s in executed if s.upper().startswith("UPDATE RUNS")]
+    assert len(writes) == 1
+
+    # A concurrent writer changed another key in between: both changes survive
+    session.execute(
+        update(Run)
+        .where(Run.id == run["id"])
+        .values(variables=[{"key": "a", "value": "1"}, {"key": "b", "value": "2"}])
+    )
+    session.commit()
+    second = client.patch(
+        f"/api/v1/runs/{run['id']}/variables", json={"set": {"a": True}, "unset": ["missing"]}
+    )
+    assert second.json()["variables"] == [{"key": "a", "value": True}, {"key": "b", "value": "2"}]
+
+
+def test_concurrent_patches_to_different_keys_both_survive(client: TestClient, session: Session):
+    if session.get_bind().dialect.name != "postgresql":
+        pytest.skip("Needs concurrent transactions (Postgres)")
+    run = _run(client, [{"key": "a", "value": "0"}, {"key": "b", "value": "0"}])
+    first, second = Session(session.get_bind()), Session(session.get_bind())
+
+    # The first patch holds the row lock until it commits; the second waits for it
+    patch_variables(first, run["id"], {"a": "1"}, [])
+
+    def patch_second():
+        patch_variables(second, run["id"], {"b": "2"}, [])
+        second.commit()
+
+    waiter = threading.Thread(target=patch_second)
+    waiter.start()
+    time.sleep(0.2)
+    assert waiter.is_alive()
+    first.commit()
+    waiter.join(timeout=5)
+    first.close()
+    second.close()
+
+    session.expire_all()
+    assert session.get(Run, run["id"]).variables == [
+        {"key": "a", "value": "1"},
+        {"key": "b", "value": "2"},
+    ]
+
+
+def test_unset_everything_and_errors(client: TestClient):
+    run = _run(client, [{"key": "a", "value": None}])
+    resp = client.patch(f"/api/v1/runs/{run['id']}/variables", json={"unset": ["a"]})
+    assert resp.json()["variables"] == []
+
+    conflict = client.patch(
+        f"/api/v1/runs/{run['id']}/variables", json={"set": {"a": 1}, "unset": ["a"]}
+    )
+    assert conflict.status_code == 422
+    missing = client.patch("/api/v1/runs/999/variables", json={"set": {"a": 1}})
+    assert missing.status_code == 404
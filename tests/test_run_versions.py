@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+
+def _run(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Audit"}).json()
+    client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": "Collect"})
+    return client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Q3"}).json()
+
+
+def test_if_match_rejects_stale_run_updates(client: TestClient):
+    run = _run(client)
+    assert run["version"] == 1
+    url = f"/api/v1/runs/{run['id']}"
+
+    first = client.patch(url, json={"name": "Q3 audit"}, headers={"If-Match": '"1"'})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+
+    # A second editor still holding version 1 loses instead of overwriting
+    stale = client.patch(url, json={"name": "Q3 review"}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 409
+    assert client.get(url).json()["name"] == "Q3 audit"
+
+    # Without If-Match the update applies to whatever is current
+    assert client.patch(url, json={"status": "in_progress"}).json()["version"] == 3
+    assert client.patch(url, json={}, headers={"If-Match": "*"}).status_code == 200
+    assert client.patch(url, json={}, headers={"If-Match": "latest"}).status_code == 400
+    assert client.patch("/api/v1/runs/999", json={}, headers={"If-Match": '"1"'}).status_code == 404
+
+
+def test_if_match_on_steps_and_variables(client: TestClient):
+    run = _run(client)
+    step = run["steps"][0]
+    step_url = f"/api/v1/runs/{run['id']}/steps/{step['id']}"
+
+    done = client.patch(step_url, json={"status": "done"}, headers={"If-Match": 'W/"1"'})
+    assert done.status_code == 200
+    assert done.json()["version"] == 2
+    assert done.json()["completed_at"] is not None
+    stale = client.patch(step_url, json={"notes": "late"}, headers={"If-Match": '"1"'})
+    assert stale.status_code == 409
+    assert client.patch(step_url, json={"notes": "ok"}, headers={"If-Match": '"1", "2"'}).json()[
+        "completed_at"
+    ] == done.json()["completed_at"]
+
+    variables_url = f"/api/v1/runs/{run['id']}/variables"
+    assert client.patch(
+        variables_url, json={"set": {"a": 1}}, headers={"If-Match": '"2"'}
+    ).status_code == 409
+    patched = client.patch(variables_url, json={"set": {"a": 1}}, headers={"If-Match": '"1"'})
+    assert patched.json()["version"] == 2
+
+
+def test_bulk_status_changes_bump_versions(client: TestClient):
+    run = _run(client)
+    client.post(
+        "/api/v1/runs:bulk", json={"action": "set_status", "status": "done", "run_ids": [run["id"]]}
+    )
+    resp = client.patch(
+        f"/api/v1/runs/{run['id']}", json={"name": "x"}, headers={"If-Match": '"1"'}
+    )
+    assert resp.status_code == 409
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import RecurringSchedule, Run, RunStep, Template
+from app.services.scheduler import Scheduler
+
+
+def _recurring_template(client: TestClient, session: Session, interval: str, age: timedelta) -> int:
+    template = client.post(
+        "/api/v1/templates",
+        json={
+            "name": "Pricing check",
+            "isRecurring": True,
+            "recurrenceInterval": interval,
+            "variables": [{"key": "region", "label": "Region", "value": "EU"}],
+        },
+    ).json()
+    for title in ("Open page", "Compare"):
+        client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": title})
+    session.get(Template, template["id"]).created_at = datetime.utcnow() - age
+    session.commit()
+    return template["id"]
+
+
+def _runs(session: Session, template_id: int) -> list[Run]:
+    return session.scalars(
+        select(Run).where(Run.template_id == template_id).order_by(Run.scheduled_for)
+    ).all()
+
+
+def test_tick_catches_up_missed_intervals_once(client: TestClient, session: Session):
+    template_id = _recurring_template(client, session, "daily", timedelta(days=3, hours=12))
+    created_at = session.get(Template, template_id).created_at
+    scheduler = Scheduler(batch_size=10, max_catch_up=31)
+    now = datetime.utcnow()
+
+    assert scheduler.tick(session, now) == 3
+    assert scheduler.tick(session, now) == 0
+
+    runs = _runs(session, template_id)
+    assert [run.scheduled_for for run in runs] == [
+        created_at + timedelta(days=d) for d in (1, 2, 3)
+    ]
+    assert runs[0].variables == [{"key": "region", "label": "Region", "value": "EU"}]
+    assert session.scalar(select(func.count()).select_from(RunStep)) == 6
+    assert session.get(RecurringSchedule, template_id).next_due_at == created_at + timedelta(days=4)
+    next_due = created_at + timedelta(days=4)
+    assert scheduler.seconds_until_due(now, 86400) == (next_due - now).total_seconds()
+
+    # The API serves scheduled runs like any other run
+    detail = client.get(f"/api/v1/runs/{runs[0].id}").json()
+    assert [step["template_step"]["title"] for step in detail["steps"]] == ["Open page", "Compare"]
+
+
+def test_tick_caps_catch_up(client: TestClient, session: Session):
+    template_id = _recurring_template(client, session, "daily", timedelta(days=10, hours=1))
+    now = datetime.utcnow()
+
+    assert Scheduler(batch_size=1, max_catch_up=2).tick(session, now) == 2
+
+    runs = _runs(session, template_id)
+    assert [run.scheduled_for.date() for run in runs] == [
+        (now - timedelta(days=1)).date(),
+        now.date(),
+    ]
+
+
+def test_schedule_starts_after_latest_run(client: TestClient, session: Session):
+    template_id = _recurring_template(client, session, "weekly", timedelta(days=30))
+    client.post(f"/api/v1/templates/{template_id}/runs", json={"name": "manual"})
+
+    assert Scheduler(batch_size=10, max_catch_up=31).tick(session) == 0
+    next_due = session.get(RecurringSchedule, template_id).next_due_at
+    assert timedelta(days=6) < next_due - datetime.utcnow() <= timedelta(days=7)
+
+
+def test_schedules_follow_template_changes(client: TestClient, session: Session):
+    template_id = _recurring_template(client, session, "daily", timedelta(hours=1))
+    scheduler = Scheduler(batch_size=10, max_catch_up=31)
+    scheduler.tick(session)
+    assert session.get(RecurringSchedule, template_id) is not None
+
+    client.patch(f"/api/v1/templates/{template_id}", json={"isRecurring": False})
+    scheduler.tick(session)
+    session.expire_all()
+    assert session.get(RecurringSchedule, template_id) is None
+    assert scheduler.seconds_until_due(datetime.utcnow(), 60) == 60
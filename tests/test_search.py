@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1 import jobs as jobs_api
+from app.services.search import _postgres_hits
+
+
+def _create_template(client: TestClient, name: str, description: str = "", steps=()) -> dict:
+    template = client.post(
+        "/api/v1/templates", json={"name": name, "description": description}
+    ).json()
+    for title, step_description in steps:
+        resp = client.post(
+            f"/api/v1/templates/{template['id']}/steps",
+            json={"title": title, "description": step_description},
+        )
+        assert resp.status_code == 201
+    return template
+
+
+def _search(client: TestClient, **params) -> dict:
+    resp = client.get("/api/v1/search", params=params)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_search_matches_template_fields_and_steps(client: TestClient):
+    onboarding = _create_template(
+        client, "Client Onboarding", "Welcome new customers", [("Collect invoices", "From finance")]
+    )
+    webinar = _create_template(client, "Webinar follow-up", "Send the invoice recap")
+    _create_template(client, "Unrelated", "Nothing here")
+
+    body = _search(client, q="invoice")
+    assert body["total"] == 2
+    assert {hit["id"] for hit in body["results"]} == {onboarding["id"], webinar["id"]}
+    assert all(hit["kind"] == "template" for hit in body["results"])
+
+    # Name matches outrank description matches
+    body = _search(client, q="onboarding")
+    assert body["results"][0]["id"] == onboarding["id"]
+
+
+def test_search_tracks_step_and_template_changes(client: TestClient):
+    template = _create_template(client, "Release checklist", steps=[("Tag build", "")])
+    step_id = client.get(f"/api/v1/templates/{template['id']}").json()["steps"][0]["id"]
+
+    client.patch(f"/api/v1/template-steps/{step_id}", json={"title": "Publish changelog"})
+    assert _search(client, q="tag")["total"] == 0
+    assert _search(client, q="changelog")["total"] == 1
+
+    client.patch(f"/api/v1/templates/{template['id']}", json={"name": "Launch checklist"})
+    assert _search(client, q="release")["total"] == 0
+
+    client.delete(f"/api/v1/templates/{template['id']}")
+    assert _search(client, q="launch")["total"] == 0
+
+
+def test_search_runs_paginated_and_filtered_by_kind(client: TestClient):
+    template = _create_template(client, "Monthly close")
+    for i in range(5):
+        client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": f"Close Acme {i}"})
+
+    page = _search(client, q="acme", kind="run", limit=2, offset=2)
+    assert page["total"] == 5
+    assert len(page["results"]) == 2
+    assert all(hit["kind"] == "run" for hit in page["results"])
+
+    assert _search(client, q="close", kind="template")["total"] == 1
+    assert _search(client, q="close")["total"] == 6
+
+
+def test_search_hides_runs_of_deleted_templates(client: TestClient, monkeypatch):
+    # Keep the template soft-deleted: the purge job would remove its runs
+    monkeypatch.setattr(jobs_api, "run_job", lambda job_id: None)
+    kept = _create_template(client, "Kept close")
+    deleted = _create_template(client, "Deleted close")
+    for template in (kept, deleted):
+        client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "Close Acme"})
+
+    assert client.delete(f"/api/v1/templates/{deleted['id']}").status_code == 202
+
+    hits = _search(client, q="close")["results"]
+    assert {(hit["kind"], hit["title"]) for hit in hits} == {
+        ("template", "Kept close"),
+        ("run", "Close Acme"),
+    }
+    assert _search(client, q="acme", kind="run")["total"] == 1
+
+
+def test_postgres_run_hits_exclude_deleted_templates():
+    sql = str(_postgres_hits("acme", "run").compile(dialect=postgresql.dialect()))
+    assert "runs.template_id NOT IN" in sql
+    assert "templates.deleted_at IS NOT NULL" in sql
+
+
+def test_search_ignores_query_syntax(client: TestClient):
+    _create_template(client, "Quarterly review")
+    assert _search(client, q='review" *')["total"] == 1
+    assert _search(client, q="!!!")["total"] == 0
+    assert client.get("/api/v1/search", params={"q": ""}).status_code == 422
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.v1.templates import _get_template_or_404
+from app.services.run_loader import load_run_detail
+from app.services.run_writes import update_run_step_fields
+
+
+def _seed_run(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Cached"}).json()
+    for title in ("One", "Two"):
+        step = client.post(
+            f"/api/v1/templates/{template['id']}/steps", json={"title": title}
+        ).json()
+        client.post(
+            f"/api/v1/template-steps/{step['id']}/fields",
+            json={"name": "f", "label": "F", "type": "text"},
+        )
+    return client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "r"}).json()
+
+
+def test_hot_lookups_hit_compile_cache(client: TestClient, session: Session, statements):
+    run = _seed_run(client)
+    other = _seed_run(client)
+
+    lookups = [
+        (load_run_detail, lambda r: (session, r["id"])),
+        (_get_template_or_404, lambda r: (r["template_id"], session)),
+        (
+            update_run_step_fields,
+            lambda r: (session, r["id"], r["steps"][0]["id"], {"status": "done"}),
+        ),
+    ]
+    for lookup, args in lookups:
+        lookup(*args(run))
+        session.expunge_all()
+
+        with statements() as executed:
+            lookup(*args(other))
+            session.expunge_all()
+
+        assert executed, lookup.__name__
+        assert all(executed.cache_hits), f"{lookup.__name__} recompiled a statement"
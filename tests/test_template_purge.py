@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.api.v1 import jobs as jobs_api
+from app.config import get_settings
+from app.models import (
+    Run,
+    RunArchive,
+    RunStep,
+    StepFieldDef,
+    StepFieldValue,
+    Template,
+    TemplateStep,
+)
+from app.services.archive import archive_finished_runs
+from app.services.jobs import run_job
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(get_settings(), "bulk_chunk_size", 2)
+
+
+def _seed(client: TestClient, runs: int = 5) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Quarterly audit"}).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps", json={"title": "Sample"}
+    ).json()
+    field = client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "notes", "label": "Notes", "type": "text"},
+    ).json()
+    for index in range(runs):
+        run = client.post(
+            f"/api/v1/templates/{template['id']}/runs", json={"name": f"audit {index}"}
+        ).json()
+        client.post(
+            f"/api/v1/runs/{run['id']}/steps/{run['steps'][0]['id']}/fields",
+            json={"values": [{"field_def_id": field["id"], "value": "ok"}]},
+        )
+    return template
+
+
+def _count(session: Session, model) -> int:
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_delete_template_purges_in_background(client: TestClient, session: Session):
+    template = _seed(client)
+    other = _seed(client, runs=1)
+    # One run already in cold storage is purged too
+    old = session.scalars(select(Run).where(Run.template_id == template["id"])).first()
+    old.status = "done"
+    old.created_at = old.updated_at = datetime.utcnow() - timedelta(days=200)
+    session.commit()
+    archive_finished_runs(session, older_than_days=90, batch_size=10)
+
+    resp = client.delete(f"/api/v1/templates/{template['id']}")
+
+    assert resp.status_code == 202
+    assert resp.headers["location"].endswith(f"/api/v1/jobs/{resp.json()['id']}")
+    job = client.get(resp.headers["location"]).json()
+    assert job["kind"] == "purge_template"
+    assert job["status"] == "succeeded"
+    assert job["progress"] == job["total"] == 5
+    assert job["finished_at"] is not None
+
+    session.expire_all()
+    assert session.get(Template, template["id"]) is None
+    assert _count(session, RunArchive) == 0
+    # Only the other template's rows are left
+    assert _count(session, Run) == 1
+    assert _count(session, RunStep) == 1
+    assert _count(session, StepFieldValue) == 1
+    assert _count(session, TemplateStep) == 1
+    assert _count(session, StepFieldDef) == 1
+    assert client.get(f"/api/v1/templates/{other['id']}").status_code == 200
+
+
+def test_deleted_template_is_hidden_before_purge(client: TestClient, session: Session, monkeypatch):
+    monkeypatch.setattr(jobs_api, "run_job", lambda job_id: None)
+    template = _seed(client, runs=1)
+
+    job = client.delete(f"/api/v1/templates/{template['id']}").json()
+
+    assert job["status"] == "queued"
+    assert client.get(f"/api/v1/templates/{template['id']}").status_code == 404
+    assert client.get("/api/v1/templates").json() == []
+    assert client.get("/api/v1/runs", params={"include_archived": True}).json() == []
+    assert client.get("/api/v1/runs", params={"template_id": template["id"]}).json() == []
+    renamed = client.patch(f"/api/v1/templates/{template['id']}", json={"name": "x"})
+    assert renamed.status_code == 404
+    assert (
+        client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "late"}).status_code
+        == 404
+    )
+    assert client.get("/api/v1/search", params={"q": "quarterly"}).json()["total"] == 0
+
+    run_job(job["id"])
+
+    assert client.get(f"/api/v1/jobs/{job['id']}").json()["status"] == "succeeded"
+    session.expire_all()
+    assert session.get(Template, template["id"]) is None
+    assert client.delete(f"/api/v1/templates/{template['id']}").status_code == 404
+
+
+def test_deleted_template_runs_and_steps_read_as_missing(
+    client: TestClient, session: Session, monkeypatch
+):
+    monkeypatch.setattr(jobs_api, "run_job", lambda job_id: None)
+    monkeypatch.setattr(get_settings(), "run_document_store", True)
+    template = _seed(client, runs=1)
+    run_id = session.scalar(select(Run.id))
+    # Cached in the process LRU and in run_documents
+    assert client.get(f"/api/v1/runs/{run_id}").status_code == 200
+    step = client.get(f"/api/v1/templates/{template['id']}").json()["steps"][0]
+    field = step["field_defs"][0]
+
+    assert client.delete(f"/api/v1/templates/{template['id']}").status_code == 202
+
+    assert client.get(f"/api/v1/runs/{run_id}").status_code == 404
+    assert client.get(f"/api/v1/runs/{run_id}", params={"fields": "name"}).status_code == 404
+    step_url = f"/api/v1/template-steps/{step['id']}"
+    field_url = f"/api/v1/step-fields/{field['id']}"
+    new_field = {"name": "late", "label": "Late", "type": "text"}
+    assert (
+        client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": "x"}).status_code
+        == 404
+    )
+    assert client.patch(step_url, json={"title": "x"}).status_code == 404
+    assert client.post(f"{step_url}/fields", json=new_field).status_code == 404
+    assert client.patch(field_url, json={"label": "x"}).status_code == 404
+    assert client.delete(field_url).status_code == 404
+    assert client.delete(step_url).status_code == 404
+    session.expire_all()
+    assert session.get(TemplateStep, step["id"]).title == "Sample"
+
+
+def test_get_unknown_job(client: TestClient):
+    assert client.get("/api/v1/jobs/12345").status_code == 404
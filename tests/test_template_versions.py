@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import Run, RunStep, TemplateVersion
+from app.services.template_versions import content_hash
+
+
+def _template_with_field(client: TestClient) -> tuple[dict, dict, dict]:
+    template = client.post("/api/v1/templates", json={"name": "Vendor review"}).json()
+    step = client.post(
+        f"/api/v1/templates/{template['id']}/steps", json={"title": "Collect docs"}
+    ).json()
+    field = client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "w9", "label": "W-9", "type": "text"},
+    ).json()
+    return template, step, field
+
+
+def _versions(session: Session) -> int:
+    return session.scalar(select(func.count()).select_from(TemplateVersion))
+
+
+def test_runs_keep_the_template_version_they_started_from(client: TestClient, session: Session):
+    template, step, field = _template_with_field(client)
+    first = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "first"}).json()
+
+    client.patch(f"/api/v1/template-steps/{step['id']}", json={"title": "Collect documents"})
+    client.patch(f"/api/v1/step-fields/{field['id']}", json={"label": "Form W-9"})
+    second = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "second"}).json()
+
+    old = client.get(f"/api/v1/runs/{first['id']}").json()["steps"][0]["template_step"]
+    new = client.get(f"/api/v1/runs/{second['id']}").json()["steps"][0]["template_step"]
+    assert (old["title"], old["field_defs"][0]["label"]) == ("Collect docs", "W-9")
+    assert (new["title"], new["field_defs"][0]["label"]) == ("Collect documents", "Form W-9")
+
+    # Step updates answer from the run's snapshot too
+    updated = client.patch(
+        f"/api/v1/runs/{first['id']}/steps/{first['steps'][0]['id']}", json={"status": "done"}
+    ).json()
+    assert updated["template_step"]["title"] == "Collect docs"
+    assert updated["completed_at"] is not None
+
+
+def test_identical_content_reuses_the_version(client: TestClient, session: Session):
+    template, step, _ = _template_with_field(client)
+    versions = _versions(session)
+
+    client.patch(f"/api/v1/template-steps/{step['id']}", json={"title": "Collect docs"})
+    client.patch(f"/api/v1/templates/{template['id']}", json={"name": "Vendor onboarding"})
+    assert _versions(session) == versions
+
+    client.patch(f"/api/v1/template-steps/{step['id']}", json={"title": "Changed"})
+    client.patch(f"/api/v1/template-steps/{step['id']}", json={"title": "Collect docs"})
+    assert _versions(session) == versions + 1
+
+
+def test_run_detail_reads_one_snapshot(client: TestClient, session: Session, statements):
+    template, _, _ = _template_with_field(client)
+    run = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "r"}).json()
+    assert session.get(Run, run["id"]).template_version_id is not None
+
+    with statements() as executed:
+        assert client.get(f"/api/v1/runs/{run['id']}").status_code == 200
+
+    # Run + version, run steps, field values: no template/step/field-def loads
+    assert len(executed) == 3
+    assert not any("FROM template_steps" in statement for statement in executed)
+
+
+def test_content_hash_ignores_timestamps():
+    step = {"id": 1, "title": "A", "created_at": "2026-01-01T00:00:00", "field_defs": []}
+    later = {**step, "updated_at": "2026-02-01T00:00:00"}
+    assert content_hash({"steps": [step]}) == content_hash({"steps": [later]})
+    assert content_hash({"steps": [step]}) != content_hash({"steps": [{**step, "title": "B"}]})
+
+
+def test_deleting_a_step_detaches_its_run_steps(client: TestClient, session: Session):
+    template, step, field = _template_with_field(client)
+    run = client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "r"}).json()
+    run_step_id = run["steps"][0]["id"]
+    client.post(
+        f"/api/v1/runs/{run['id']}/steps/{run_step_id}/fields",
+        json={"values": [{"field_def_id": field["id"], "value": "on file"}]},
+    )
+
+    assert client.delete(f"/api/v1/template-steps/{step['id']}").status_code == 204
+
+    # The run step stays, detached, and still renders from the run's version
+    assert session.get(RunStep, run_step_id).template_step_id is None
+    detail = client.get(f"/api/v1/runs/{run['id']}").json()
+    assert detail["steps"][0]["template_step_id"] is None
+    assert detail["steps"][0]["template_step"]["title"] == "Collect docs"
+    sparse = client.get(
+        f"/api/v1/runs/{run['id']}", params={"fields": "id,steps.template_step.title"}
+    ).json()
+    assert sparse["steps"][0]["template_step"]["title"] == "Collect docs"
@@ -35,8 +35,8 @@ def test_delete_template_with_runs_fails(client: TestClient, session: Session):
     # or 409 if handled but not allowed.
     # The user said "I got an error", implying it didn't work.
 
-    # If the fix works, this should be 204 (No Content)
-    assert delete_resp.status_code == 204
+    # Deletion is accepted and purged by a background job
+    assert delete_resp.status_code == 202
 
     # Verify runs are deleted
     runs = session.query(Run).filter(Run.template_id == template_id).all()
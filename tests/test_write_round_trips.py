@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+
+def _seed(client: TestClient) -> dict:
+    template = client.post("/api/v1/templates", json={"name": "Payroll"}).json()
+    step = client.post(f"/api/v1/templates/{template['id']}/steps", json={"title": "Export"}).json()
+    client.post(
+        f"/api/v1/template-steps/{step['id']}/fields",
+        json={"name": "total", "label": "Total", "type": "number"},
+    )
+    return client.post(f"/api/v1/templates/{template['id']}/runs", json={"name": "May"}).json()
+
+
+def test_step_update_is_one_write_and_one_render(client: TestClient, statements):
+    run = _seed(client)
+    step = run["steps"][0]
+
+    with statements() as executed:
+        resp = client.patch(
+            f"/api/v1/runs/{run['id']}/steps/{step['id']}", json={"status": "done"}
+        )
+
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] == '"2"'
+    body = resp.json()
+    assert body["status"] == "done" and body["completed_at"] is not None
+    assert body["template_step"]["field_defs"][0]["name"] == "total"
+    # UPDATE ... RETURNING, then the run document render (run, steps, field values)
+    assert executed[0].startswith("UPDATE run_steps") and "RETURNING" in executed[0]
+    assert len(executed) == 4
+
+
+def test_template_patches_only_load_what_they_return(client: TestClient, statements):
+    run = _seed(client)
+    template_id = run["template_id"]
+    step = run["steps"][0]["template_step"]
+    field = step["field_defs"][0]
+
+    with statements() as executed:
+        resp = client.patch(f"/api/v1/templates/{template_id}", json={"name": "Payroll v2"})
+    assert resp.json()["name"] == "Payroll v2"
+    assert resp.json()["steps"][0]["field_defs"][0]["id"] == field["id"]
+    # UPDATE ... RETURNING, then steps and their field definitions
+    assert len(executed) == 3
+
+    with statements() as executed:
+        resp = client.patch(f"/api/v1/step-fields/{field['id']}", json={"label": "Gross"})
+    assert resp.json()["label"] == "Gross"
+    # The template to re-snapshot comes back with the updated row
+    assert executed[0].startswith("UPDATE step_field_defs")
+    assert "SELECT template_steps.template_id" in executed[0]
+
+    assert client.patch("/api/v1/template-steps/999", json={"title": "x"}).status_code == 404
+
+
+@pytest.fixture
+def no_returning(session: Session, monkeypatch):
+    monkeypatch.setattr(session.get_bind().dialect, "update_returning", False)
+
+
+@pytest.mark.usefixtures("no_returning")
+def test_backends_without_returning_read_the_row_back(client: TestClient, session: Session):
+    run = _seed(client)
+    template_id = run["template_id"]
+
+    resp = client.patch(f"/api/v1/runs/{run['id']}", json={"name": "June"})
+    assert resp.headers["ETag"] == '"2"'
+    assert resp.json()["name"] == "June"
+    step = client.patch(
+        f"/api/v1/runs/{run['id']}/steps/{run['steps'][0]['id']}", json={"notes": "ok"}
+    )
+    assert step.json()["notes"] == "ok"
+    template = client.patch(f"/api/v1/templates/{template_id}", json={"icon": "x"}).json()
+    assert template["icon"] == "x" and len(template["steps"]) == 1
+    # Steps and fields report order-index clashes as before
+    other = client.post(f"/api/v1/templates/{template_id}/steps", json={"title": "Pay"}).json()
+    clash = client.patch(f"/api/v1/template-steps/{other['id']}", json={"order_index": 1})
+    assert clash.status_code == 409
@@ -0,0 +1,197 @@
+"""
+UNIT TESTS - Admission control
+
+Tests for route classes, limits derived from the pool and load shedding.
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import deadlines
+from app.api.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    default_limits,
+    parse_limits,
+    reserved_connections,
+)
+from app.config import Settings
+from app.main import create_app
+
+
+def _controller(limits, *, queue_size=0, queue_timeout=0.05):
+    return AdmissionController(
+        {"read": 1, "write": 1, "heavy": 1, **limits},
+        queue_size=queue_size,
+        queue_timeout=queue_timeout,
+        api_prefix="/api/v1",
+    )
+
+
+async def _requests(controller, count, scope_extra=None):
+    """Send ``count`` GETs through the middleware while the app holds them all."""
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = AdmissionMiddleware(app, controller)
+
+    async def request():
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        scope = {"type": "http", "method": "GET", "path": "/api/v1/runs", "headers": []}
+        scope.update(scope_extra or {})
+        await middleware(scope, receive, send)
+        return messages[0]
+
+    tasks = [asyncio.create_task(request()) for _ in range(count)]
+    await asyncio.sleep(0.2)
+    release.set()
+    return await asyncio.gather(*tasks)
+
+
+class TestLimits:
+    """Slots follow the pool size unless configured."""
+
+    def test_defaults_split_the_pool(self):
+        """Default 10 + 5 connections: 10 reads, 4 writes, 1 heavy."""
+        assert default_limits(15) == {"read": 10, "write": 4, "heavy": 1}
+        assert default_limits(1) == {"read": 1, "write": 1, "heavy": 1}
+
+    def test_settings_override_some_classes(self):
+        """ADMISSION_LIMITS replaces only the classes it names."""
+        settings = Settings(
+            db_pool_size=22,
+            db_max_overflow=0,
+            idempotency_purge_interval_seconds=3600,
+            admission_limits="heavy=3",
+        )
+        controller = AdmissionController.from_settings(settings)
+        assert {name: gate.limit for name, gate in controller.gates.items()} == {
+            "read": 12,
+            "write": 6,
+            "heavy": 3,
+        }
+
+    def test_background_work_keeps_connections(self):
+        """Each in-process periodic task, and jobs started by requests, hold back a connection."""
+        quiet = Settings(
+            archive_interval_seconds=0,
+            scheduler_interval_seconds=0,
+            job_worker_interval_seconds=0,
+            idempotency_purge_interval_seconds=0,
+        )
+        busy = Settings(
+            archive_interval_seconds=60,
+            scheduler_interval_seconds=60,
+            job_worker_interval_seconds=5,
+            idempotency_purge_interval_seconds=3600,
+        )
+        assert reserved_connections(quiet) == 1
+        assert reserved_connections(busy) == 5
+        controller = AdmissionController.from_settings(
+            busy.model_copy(update={"db_pool_size": 10, "db_max_overflow": 5})
+        )
+        assert sum(gate.limit for gate in controller.gates.values()) == 10
+
+    def test_transaction_pooling_needs_explicit_limits(self):
+        """NullPool has no size to split, so every class must be configured."""
+        settings = Settings(db_pooling_mode="transaction", admission_limits="read=10,write=4")
+        with pytest.raises(ValueError, match="ADMISSION_LIMITS"):
+            AdmissionController.from_settings(settings)
+
+        settings = settings.model_copy(update={"admission_limits": "read=10,write=4,heavy=1"})
+        controller = AdmissionController.from_settings(settings)
+        assert controller.gates["heavy"].limit == 1
+
+    @pytest.mark.parametrize("value", ["reads=2", "read=0", "read=x"])
+    def test_invalid_limits(self, value):
+        """Unknown classes and non-positive numbers are configuration errors."""
+        with pytest.raises(ValueError):
+            parse_limits(value)
+
+
+class TestRouteClasses:
+    """Requests are classed by method and path."""
+
+    @pytest.mark.parametrize(
+        ("method", "path", "expected"),
+        [
+            ("GET", "/api/v1/runs/1", "read"),
+            ("PATCH", "/api/v1/runs/1", "write"),
+            ("POST", "/api/v1/runs:bulk", "heavy"),
+            ("POST", "/api/v1/batch", "heavy"),
+            ("GET", "/api/v1/sync", "heavy"),
+            ("GET", "/healthz", None),
+            ("GET", "/docs", None),
+        ],
+    )
+    def test_route_class(self, method, path, expected):
+        """Only API routes take a slot."""
+        assert _controller({}).route_class(method, path) == expected
+
+
+class TestShedding:
+    """Saturated classes answer 503 instead of queueing on the pool."""
+
+    def test_full_queue_sheds_at_once(self):
+        """With no queue, requests beyond the limit are shed immediately."""
+        controller = _controller({"read": 2})
+        starts = asyncio.run(_requests(controller, 3))
+
+        assert sorted(start["status"] for start in starts) == [200, 200, 503]
+        shed = next(start for start in starts if start["status"] == 503)
+        assert (b"retry-after", b"1") in shed["headers"]
+        assert controller.snapshot()["read"] == {
+            "limit": 2,
+            "in_flight": 0,
+            "queued": 0,
+            "admitted": 2,
+            "shed_queue_full": 1,
+            "shed_timeout": 0,
+        }
+
+    def test_queued_requests_give_up_after_the_timeout(self):
+        """Waiting requests are shed when no slot frees up within the deadline."""
+        controller = _controller({"read": 1}, queue_size=1, queue_timeout=0.05)
+        starts = asyncio.run(_requests(controller, 3))
+
+        assert sorted(start["status"] for start in starts) == [200, 503, 503]
+        snapshot = controller.snapshot()["read"]
+        assert snapshot["shed_timeout"] == 1 and snapshot["shed_queue_full"] == 1
+
+    def test_queued_requests_get_a_freed_slot(self):
+        """A request waiting less than the deadline is admitted."""
+        controller = _controller({"read": 1}, queue_size=5, queue_timeout=5)
+        starts = asyncio.run(_requests(controller, 3))
+
+        assert [start["status"] for start in starts] == [200, 200, 200]
+        assert controller.snapshot()["read"]["admitted"] == 3
+
+    def test_queue_wait_ends_at_the_deadline(self):
+        """A request is not kept queued past its deadline."""
+        controller = _controller({"read": 1}, queue_size=5, queue_timeout=5)
+        deadline = {deadlines.SCOPE_KEY: time.monotonic() + 0.05}
+        starts = asyncio.run(_requests(controller, 2, deadline))
+
+        assert sorted(start["status"] for start in starts) == [200, 503]
+        assert controller.snapshot()["read"]["shed_timeout"] == 1
+
+    def test_metrics_endpoint(self):
+        """GET /metrics reports the counters of every class."""
+        with TestClient(create_app()) as client:
+            resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert set(resp.json()["admission"]) == {"read", "write", "heavy"}
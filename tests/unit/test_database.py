@@ -0,0 +1,91 @@
+"""
+UNIT TESTS - Engine lifecycle
+
+Tests for lazy engine creation and pool warm-up.
+"""
+
+import subprocess
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app import database
+from app.config import Settings
+
+
+class TestLazyEngine:
+    """The engine is only built when something needs a connection."""
+
+    def test_import_does_not_build_engine(self):
+        """Importing the app must not import a DB driver or create an engine."""
+        code = (
+            "import sys, app.main, app.database as d;"
+            "assert d._engine is None;"
+            "assert 'psycopg' not in sys.modules"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_configured_engine_is_not_disposed(self):
+        """Engines installed by callers survive dispose_engine()."""
+        engine = create_engine("sqlite+pysqlite:///:memory:")
+        database.configure_engine(engine)
+        try:
+            database.dispose_engine()
+            assert database.get_engine() is engine
+        finally:
+            database.configure_engine(None)
+
+
+class TestWarmPool:
+    """Pool warm-up opens real connections before readiness."""
+
+    def test_warm_pool_fills_pool(self, tmp_path):
+        """Should leave the requested number of idle connections in the pool."""
+        engine = create_engine(
+            f"sqlite+pysqlite:///{tmp_path / 'warm.db'}", poolclass=QueuePool, pool_size=3
+        )
+        try:
+            assert database.warm_pool(engine, 3) == 3
+            assert engine.pool.checkedin() == 3
+        finally:
+            engine.dispose()
+
+
+class TestEngineOptions:
+    """Connection settings map onto create_engine() arguments."""
+
+    PG_URL = "postgresql+psycopg://u:p@localhost/db"
+
+    def test_session_mode_applies_pool_tuning(self):
+        """Session mode keeps a QueuePool with every tuning knob applied."""
+        settings = Settings(
+            database_url=self.PG_URL,
+            db_pool_recycle=300,
+            db_pool_timeout=2.5,
+            db_pool_use_lifo=True,
+            db_pool_pre_ping=True,
+            db_prepare_threshold=3,
+        )
+        options = database.engine_options(settings)
+        assert "poolclass" not in options
+        assert options["pool_recycle"] == 300
+        assert options["pool_timeout"] == 2.5
+        assert options["pool_use_lifo"] is True
+        assert options["pool_pre_ping"] is True
+        assert options["connect_args"] == {"prepare_threshold": 3}
+
+    def test_transaction_mode_disables_prepares(self):
+        """Transaction mode uses NullPool and never prepares server-side."""
+        settings = Settings(
+            database_url=self.PG_URL, db_pooling_mode="transaction", db_prepare_threshold=3
+        )
+        options = database.engine_options(settings)
+        assert options["poolclass"] is NullPool
+        assert "pool_size" not in options
+        assert options["connect_args"] == {"prepare_threshold": None}
+
+    def test_non_psycopg_driver_gets_no_connect_args(self):
+        """psycopg-only arguments are not passed to other drivers."""
+        settings = Settings(database_url="sqlite+pysqlite:///x.db", db_pooling_mode="transaction")
+        assert "connect_args" not in database.engine_options(settings)
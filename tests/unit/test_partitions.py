@@ -0,0 +1,33 @@
+"""
+UNIT TESTS - Partition helpers
+
+Tests for month arithmetic and partition naming used by partition maintenance.
+"""
+
+from datetime import date
+
+from app.services.partitions import _partition_month, add_months, month_start, partition_name
+
+
+class TestMonthArithmetic:
+    """Month boundaries drive partition bounds."""
+
+    def test_month_start(self):
+        assert month_start(date(2026, 10, 19)) == date(2026, 10, 1)
+
+    def test_add_months_crosses_years(self):
+        assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+        assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+class TestPartitionNames:
+    """Partition names round-trip to their month."""
+
+    def test_name_round_trip(self):
+        name = partition_name("run_steps", date(2027, 2, 1))
+        assert name == "run_steps_p2027_02"
+        assert _partition_month("run_steps", name) == date(2027, 2, 1)
+
+    def test_other_tables_and_default_are_not_months(self):
+        assert _partition_month("runs", "run_steps_p2027_02") is None
+        assert _partition_month("runs", "runs_default") is None